@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+"""
+券商API调用记录与确定性回放
+"持仓不一致"之类的对账问题只在实盘出现。这里把一次运行中每个券商API调用的
+参数和返回值(或异常)按顺序写入只追加的二进制日志，离线时按原顺序喂回未修改的策略，
+不等待、不联网，全速复现、剖析和回归测试生产会话。
+
+记录来源:
+    实盘: 网格策略开启 enable_api_record 后输出 APIREC 日志行(平台沙箱不能写文件)，
+          用 import 子命令导入二进制日志
+    离线: ApiRecorder 作为 load_strategy 的 counter 包装任意券商对象(如SimBroker)直接写日志
+
+二进制日志格式(只追加，可多次会话追加到同一文件):
+    MAGIC(8字节) | 帧...
+    帧 = varint(长度) | 类型(1字节) | 内容
+        0 名称定义  varint(编号) 字符串
+        1 调用      varint(名称编号) 值(位置参数) 值(关键字参数) 值(返回值) 值(异常信息或None)
+        2 标记      varint(名称编号) 值(附加数据)          @init 会话开始(标的和参数)，@tick 一次handle_data
+    值编码: 1字节类型标记 + 内容；整数zigzag varint，浮点8字节，字符串varint长度+UTF-8，
+    时间为微秒时间戳，Contract、平台枚举、列表、字典分别带标记。末尾不完整的帧(写入中断)被忽略。
+
+用法:
+    python tools/api_replay.py import live.log session.apirec
+    python tools/api_replay.py show session.apirec
+    python tools/api_replay.py replay strategies/grid_strategy/grid_trading_v5.3.quant session.apirec
+
+    with ApiRecorder('session.apirec') as recorder:
+        strategy = load_strategy(path, broker, counter=recorder)
+        recorder.attach(strategy)
+        ...
+    result = replay(path, 'session.apirec')      # 调用顺序或参数与记录不符时抛出 ReplayDivergence
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import contextlib
+import datetime
+import io
+import json
+import os
+import struct
+
+from quant_runtime import API_FUNCTIONS, ENUMS, Contract, load_strategy, skip_sleep
+
+MAGIC = b'APIREC01'
+LINE_TAG = 'APIREC|v1|'
+FRAME_NAME, FRAME_CALL, FRAME_MARK = 0, 1, 2
+INIT_MARK, TICK_MARK = '@init', '@tick'
+EPOCH = datetime.datetime(1970, 1, 1)
+UNRECORDED = ('declare_trig_symbol',)      # 交易标的由会话头给出
+
+
+class ReplayDivergence(Exception):
+    """回放时策略的API调用与记录不一致"""
+
+
+# ========== 值编码 ==========
+
+def _write_varint(out, value):
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _write_str(out, text):
+    raw = text.encode('utf-8')
+    _write_varint(out, len(raw))
+    out += raw
+
+
+def _read_str(data, pos):
+    size, pos = _read_varint(data, pos)
+    return data[pos:pos + size].decode('utf-8'), pos + size
+
+
+def encode_value(out, value):
+    """按类型标记把值追加到bytearray"""
+    if value is None:
+        out.append(0x4E)                                    # N
+    elif value is True or value is False:
+        out.append(0x54 if value else 0x46)                 # T / F
+    elif isinstance(value, int):
+        out.append(0x69)                                    # i
+        _write_varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+    elif isinstance(value, float):
+        out.append(0x66)                                    # f
+        out += struct.pack('<d', value)
+    elif isinstance(value, Contract):
+        out.append(0x63)                                    # c
+        _write_str(out, str(value))
+    elif isinstance(value, str):
+        out.append(0x73)                                    # s
+        _write_str(out, value)
+    elif isinstance(value, datetime.datetime):
+        out.append(0x64)                                    # d
+        micros = (value.replace(tzinfo=None) - EPOCH) // datetime.timedelta(microseconds=1)
+        _write_varint(out, micros * 2 if micros >= 0 else -micros * 2 - 1)
+    elif isinstance(value, (list, tuple, set)):
+        out.append(0x6C)                                    # l
+        _write_varint(out, len(value))
+        for item in value:
+            encode_value(out, item)
+    elif isinstance(value, dict):
+        out.append(0x6D)                                    # m
+        _write_varint(out, len(value))
+        for key, item in value.items():
+            encode_value(out, key)
+            encode_value(out, item)
+    else:
+        out.append(0x72)                                    # r 未知类型按文本保存
+        _write_str(out, str(value))
+
+
+def decode_value(data, pos):
+    tag = data[pos]
+    pos += 1
+    if tag == 0x4E:
+        return None, pos
+    if tag in (0x54, 0x46):
+        return tag == 0x54, pos
+    if tag in (0x69, 0x64):
+        raw, pos = _read_varint(data, pos)
+        number = raw // 2 if not raw & 1 else -(raw + 1) // 2
+        return (number if tag == 0x69 else EPOCH + datetime.timedelta(microseconds=number)), pos
+    if tag == 0x66:
+        return struct.unpack_from('<d', data, pos)[0], pos + 8
+    if tag in (0x73, 0x72):
+        return _read_str(data, pos)
+    if tag == 0x63:
+        text, pos = _read_str(data, pos)
+        return Contract(text), pos
+    if tag == 0x6C:
+        count, pos = _read_varint(data, pos)
+        items = []
+        for _ in range(count):
+            item, pos = decode_value(data, pos)
+            items.append(item)
+        return items, pos
+    if tag == 0x6D:
+        count, pos = _read_varint(data, pos)
+        mapping = {}
+        for _ in range(count):
+            key, pos = decode_value(data, pos)
+            mapping[key], pos = decode_value(data, pos)
+        return mapping, pos
+    raise ValueError(f"未知的值类型标记: {tag:#x}")
+
+
+def _encoded(value):
+    out = bytearray()
+    encode_value(out, value)
+    return bytes(out)
+
+
+# ========== 日志读写 ==========
+
+class ApiLogWriter:
+    """只追加的二进制API日志；追加到已有文件时先读取名称表"""
+
+    def __init__(self, path):
+        self.path = path
+        self.names = {}
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            valid_size = len(MAGIC)
+            for kind, ident, _, valid_size in _iter_frames(path):
+                if kind == FRAME_NAME:
+                    self.names[ident[1]] = ident[0]
+            with open(path, 'r+b') as f:        # 丢弃末尾不完整的帧
+                f.truncate(valid_size)
+        self._file = open(path, 'ab')
+        if not exists:
+            self._file.write(MAGIC)
+
+    def _frame(self, body):
+        out = bytearray()
+        _write_varint(out, len(body))
+        self._file.write(bytes(out) + bytes(body))
+
+    def _name_id(self, name):
+        if name not in self.names:
+            self.names[name] = len(self.names)
+            body = bytearray([FRAME_NAME])
+            _write_varint(body, self.names[name])
+            _write_str(body, name)
+            self._frame(body)
+        return self.names[name]
+
+    def call(self, name, args, kwargs, result, error=None):
+        body = bytearray([FRAME_CALL])
+        _write_varint(body, self._name_id(name))
+        for value in (list(args), dict(kwargs), result, error):
+            encode_value(body, value)
+        self._frame(body)
+
+    def mark(self, name, payload=None):
+        body = bytearray([FRAME_MARK])
+        _write_varint(body, self._name_id(name))
+        encode_value(body, payload)
+        self._frame(body)
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _iter_frames(path):
+    """逐帧读取: (类型, 名称编号或名称定义, 内容, 帧结束位置)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"不是API记录文件: {path}")
+    pos = len(MAGIC)
+    while pos < len(data):
+        try:
+            size, start = _read_varint(data, pos)
+        except IndexError:
+            return
+        if start + size > len(data):
+            return
+        body = data[start:start + size]
+        kind = body[0]
+        ident, offset = _read_varint(body, 1)
+        if kind == FRAME_NAME:
+            name, _ = _read_str(body, offset)
+            yield kind, (ident, name), None, start + size
+        else:
+            yield kind, ident, (body, offset), start + size
+        pos = start + size
+
+
+def read_log(path):
+    """
+    按顺序读取日志记录。
+
+    Yields:
+        ('call', 名称, 位置参数, 关键字参数, 返回值, 异常信息, 原始参数编码) 或 ('mark', 名称, 附加数据)
+    """
+    names = {}
+    for kind, ident, content, _ in _iter_frames(path):
+        if kind == FRAME_NAME:
+            names[ident[0]] = ident[1]
+            continue
+        body, pos = content
+        if kind == FRAME_MARK:
+            payload, _ = decode_value(body, pos)
+            yield 'mark', names[ident], payload
+            continue
+        start = pos
+        args, pos = decode_value(body, pos)
+        kwargs, pos = decode_value(body, pos)
+        signature = bytes(body[start:pos])
+        result, pos = decode_value(body, pos)
+        error, _ = decode_value(body, pos)
+        yield 'call', names[ident], args, kwargs, result, error, signature
+
+
+# ========== 离线记录 ==========
+
+class ApiRecorder(ApiLogWriter):
+    """包装券商API并记录每次调用，接口兼容 CallCounter(作为 load_strategy 的 counter)"""
+
+    def __init__(self, path, params=None):
+        super().__init__(path)
+        self.params = dict(params or {})
+        self.symbol = None
+
+    def wrap(self, name, func):
+        if name in UNRECORDED:
+            def unrecorded(*args, **kwargs):
+                result = func(*args, **kwargs)
+                self.symbol = str(result)
+                return result
+            unrecorded.__name__ = name
+            return unrecorded
+
+        def recorded(*args, **kwargs):
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                self.call(name, args, kwargs, None, str(e))
+                raise
+            self.call(name, args, kwargs, result)
+            return result
+        recorded.__name__ = name
+        return recorded
+
+    def attach(self, strategy):
+        """initialize前写入会话头，每次handle_data前写入运行标记"""
+        initialize, handle_data = strategy.initialize, strategy.handle_data
+        show_variable = getattr(strategy, '__quant_namespace__', {}).get('show_variable')
+        params = dict(getattr(show_variable, 'overrides', {}), **self.params)
+
+        def recorded_initialize(*args, **kwargs):
+            self.mark(INIT_MARK, {'symbol': self.symbol, 'params': params})
+            return initialize(*args, **kwargs)
+
+        def recorded_handle_data(*args, **kwargs):
+            self.mark(TICK_MARK)
+            return handle_data(*args, **kwargs)
+        strategy.initialize = recorded_initialize
+        strategy.handle_data = recorded_handle_data
+        return strategy
+
+
+# ========== 实盘日志导入 ==========
+
+def _from_json(value):
+    """还原网格策略 _api_record_encode 的类型标记"""
+    if isinstance(value, list):
+        return [_from_json(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if '$m' in value:
+        return {_from_json(k): _from_json(v) for k, v in value['$m']}
+    if '$dt' in value:
+        return datetime.datetime.strptime(value['$dt'], '%Y-%m-%d %H:%M:%S.%f')
+    if '$c' in value:
+        return Contract(value['$c'])
+    if '$e' in value:
+        enum_name, _, member = value['$e'].partition('.')
+        enum = ENUMS.get(enum_name)
+        return getattr(enum, member, member) if enum else member
+    if '$r' in value:
+        return value['$r']
+    return {k: _from_json(v) for k, v in value.items()}
+
+
+def import_log(lines, path):
+    """
+    把平台日志中的 APIREC 行追加到二进制日志。序号不连续(日志缺行)时报错，避免生成无法回放的记录。
+
+    Returns:
+        dict: {'sessions', 'calls', 'ticks'}
+    """
+    counts = {'sessions': 0, 'calls': 0, 'ticks': 0}
+    expected = None
+    with ApiLogWriter(path) as writer:
+        for line in lines:
+            start = line.find(LINE_TAG)
+            if start < 0:
+                continue
+            parts = line[start + len(LINE_TAG):].rstrip('\r\n').split('|', 2)
+            if len(parts) != 3:
+                continue
+            seq, name, text = int(parts[0]), parts[1], parts[2]
+            payload = _from_json(json.loads(text))
+            if name == INIT_MARK:
+                expected = seq
+                counts['sessions'] += 1
+            elif expected is None:
+                raise ValueError(f"第{seq}条记录之前缺少会话头 {INIT_MARK}")
+            if seq != expected:
+                raise ValueError(f"APIREC序号不连续: 期望{expected}，实际{seq}(平台日志缺行)")
+            expected = seq + 1
+            if name in (INIT_MARK, TICK_MARK):
+                writer.mark(name, payload)
+                counts['ticks'] += name == TICK_MARK
+            else:
+                args, kwargs, result, error = payload
+                writer.call(name, args, kwargs, result, error)
+                counts['calls'] += 1
+    return counts
+
+
+# ========== 回放 ==========
+
+def read_sessions(path):
+    """按 @init 切分会话: [{'symbol', 'params', 'init': [调用], 'ticks': [[调用], ...]}]"""
+    sessions = []
+    current = None
+    for record in read_log(path):
+        if record[0] == 'mark':
+            if record[1] == INIT_MARK:
+                payload = record[2] or {}
+                current = {'symbol': payload.get('symbol'), 'params': payload.get('params') or {},
+                           'init': [], 'ticks': []}
+                sessions.append(current)
+            elif current is not None:
+                current['ticks'].append([])
+        elif current is not None:
+            (current['ticks'][-1] if current['ticks'] else current['init']).append(record)
+    return sessions
+
+
+class ReplayBroker:
+    """按记录顺序返回API结果的券商替身；调用名或参数不符时记录并抛出 ReplayDivergence"""
+
+    def __init__(self, session, strict_args=True):
+        self.session = session
+        self.symbol = Contract(session['symbol'] or 'US.SPY')
+        self.strict_args = strict_args
+        self.divergence = None
+        self.calls = 0
+        self._queue = []
+        self._pos = 0
+        self._where = INIT_MARK
+
+    def begin(self, where, records):
+        self._where = where
+        self._queue = records
+        self._pos = 0
+
+    def finish(self):
+        """本段(initialize或一次handle_data)结束：记录中还有未被调用的API也视为分歧"""
+        if self.divergence is None and self._pos < len(self._queue):
+            record = self._queue[self._pos]
+            self.divergence = ReplayDivergence(
+                f"{self._where}: 策略少调用了 {len(self._queue) - self._pos} 次API，下一条记录为 {record[1]}")
+        if self.divergence is not None:
+            raise self.divergence
+
+    def declare_trig_symbol(self):
+        return self.symbol
+
+    def _replay(self, name, args, kwargs):
+        if self.divergence is not None:
+            raise self.divergence
+        if self._pos >= len(self._queue):
+            self.divergence = ReplayDivergence(f"{self._where}: 记录已用完，策略多调用了 {name}")
+            raise self.divergence
+        record = self._queue[self._pos]
+        _, recorded_name, _, _, result, error, signature = record
+        if recorded_name != name:
+            self.divergence = ReplayDivergence(
+                f"{self._where} 第{self._pos + 1}次调用: 记录为 {recorded_name}，策略调用了 {name}")
+            raise self.divergence
+        if self.strict_args and _encoded(list(args)) + _encoded(dict(kwargs)) != signature:
+            self.divergence = ReplayDivergence(
+                f"{self._where} 第{self._pos + 1}次调用 {name} 参数不同: 记录 {record[2]} {record[3]}，"
+                f"实际 {list(args)} {dict(kwargs)}")
+            raise self.divergence
+        self._pos += 1
+        self.calls += 1
+        if error is not None:
+            raise RuntimeError(error)
+        return result
+
+    def __getattr__(self, name):
+        if name not in API_FUNCTIONS:
+            raise AttributeError(name)
+
+        def replayed(*args, **kwargs):
+            return self._replay(name, args, kwargs)
+        replayed.__name__ = name
+        return replayed
+
+
+def replay(strategy_path, log_path, session=-1, overrides=None, strict_args=True, quiet=True, counter=None):
+    """
+    用记录的会话回放策略文件：参数取自会话头(可用overrides覆盖)，sleep不等待。
+
+    Returns:
+        dict: {'strategy', 'broker', 'ticks', 'calls', 'output'}
+    Raises:
+        ReplayDivergence: 策略的API调用序列与记录不一致(代码改动改变了行为)
+    """
+    record = read_sessions(log_path)[session]
+    broker = ReplayBroker(record, strict_args)
+    params = dict(record['params'], enable_api_record=False)
+    params.update(overrides or {})
+    output = io.StringIO()
+    with (contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext()), skip_sleep():
+        strategy = load_strategy(strategy_path, broker, overrides=params, counter=counter)
+        if hasattr(strategy, 'trigger_symbols'):
+            strategy.trigger_symbols()
+        broker.begin(INIT_MARK, record['init'])
+        strategy.initialize()
+        broker.finish()
+        for index, calls in enumerate(record['ticks']):
+            broker.begin(f"{TICK_MARK}#{index + 1}", calls)
+            strategy.handle_data()
+            broker.finish()
+    return {'strategy': strategy, 'broker': broker, 'ticks': len(record['ticks']),
+            'calls': broker.calls, 'output': output.getvalue()}
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='券商API调用记录与回放')
+    sub = parser.add_subparsers(dest='command', required=True)
+    cmd_import = sub.add_parser('import', help='导入平台日志中的APIREC行')
+    cmd_import.add_argument('log_file')
+    cmd_import.add_argument('record_file')
+    cmd_show = sub.add_parser('show', help='查看记录文件中的会话')
+    cmd_show.add_argument('record_file')
+    cmd_replay = sub.add_parser('replay', help='用记录回放策略')
+    cmd_replay.add_argument('strategy')
+    cmd_replay.add_argument('record_file')
+    cmd_replay.add_argument('--session', type=int, default=-1, help='会话序号(默认最后一个)')
+    cmd_replay.add_argument('--loose', action='store_true', help='只校验调用顺序，不校验参数')
+    cmd_replay.add_argument('--verbose', action='store_true', help='显示策略输出')
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        with open(args.log_file, 'r', encoding='utf-8') as f:
+            summary = import_log(f, args.record_file)
+        print(f"📥 导入 {summary['sessions']} 个会话，{summary['ticks']} 次运行，{summary['calls']} 次API调用 "
+              f"-> {args.record_file} ({os.path.getsize(args.record_file):,} 字节)")
+    elif args.command == 'show':
+        for number, item in enumerate(read_sessions(args.record_file)):
+            calls = len(item['init']) + sum(len(tick) for tick in item['ticks'])
+            names = {}
+            for tick in [item['init']] + item['ticks']:
+                for call in tick:
+                    names[call[1]] = names.get(call[1], 0) + 1
+            print(f"📼 会话{number}: {item['symbol']} | {len(item['ticks'])} 次运行 | {calls} 次API调用")
+            for api, count in sorted(names.items(), key=lambda pair: -pair[1]):
+                print(f"   {api:<28}{count:>8}")
+    else:
+        started = time.perf_counter()
+        try:
+            outcome = replay(args.strategy, args.record_file, args.session, strict_args=not args.loose,
+                             quiet=not args.verbose)
+        except ReplayDivergence as e:
+            print(f"❌ 回放分歧: {e}")
+            raise SystemExit(1)
+        elapsed = time.perf_counter() - started
+        print(f"✅ 回放完成: {outcome['ticks']} 次运行，{outcome['calls']} 次API调用，用时 {elapsed:.2f}秒")
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+券商API调用追踪
+平台账户被限流时，需要知道是哪个策略、哪个方法在频繁调用行情/持仓/订单接口。
+ApiTracer 包装策略使用的平台API(current_price、position_*、order_*、execution_*、
+option_*、bar_*、total_cash、available_fund 等)，按函数和调用方法分别统计次数与耗时，
+并按每次 handle_data 检查调用预算，超出时告警。
+
+离线模式：用离线运行时加载未修改的策略文件，按历史或合成价格逐根K线回放，
+输出调用次数报告。实盘排查使用网格策略内置的 enable_api_trace 开关(同样的统计口径)。
+
+用法:
+    tracer = ApiTracer(budget=40)
+    strategy = load_strategy(path, broker, counter=tracer)   # 兼容 CallCounter 接口
+    tracer.attach(strategy)                                   # 以 handle_data 为单位检查预算
+    ...
+    print(tracer.format_report())
+
+    tracer, strategy, broker = replay('strategies/grid_strategy/grid_trading_v5.3.quant', closes, budget=40)
+
+    python tools/api_tracer.py strategies/grid_strategy/grid_trading_v5.3.quant --symbol US.SPY --budget 40
+    python tools/api_tracer.py strategies/dca_strategy/dca_free_stable.quant --synthetic 500
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import contextlib
+import datetime
+import io
+import sys
+import time
+
+from quant_runtime import API_FUNCTIONS, OrderSide, OrderStatus, SimBroker, load_strategy, skip_sleep
+
+TRACED_PREFIXES = ('current_price', 'position_', 'get_position_symbol', 'order_', 'request_',
+                   'execution_', 'option_', 'total_cash', 'available_fund', 'bar_')
+TRACED_API = tuple(name for name in API_FUNCTIONS if name.startswith(TRACED_PREFIXES))
+
+
+class ApiTracer:
+    """API调用计数/计时，按函数、按调用方法、按单次运行统计"""
+
+    def __init__(self, budget=0, names=TRACED_API, verbose=True):
+        self.budget = budget
+        self.names = set(names)
+        self.verbose = verbose
+        self.reset()
+
+    def reset(self):
+        self.stats = {}             # API名 -> {'count', 'total', 'max'}
+        self.callers = {}           # (调用方法, API名) -> 次数
+        self.tick_calls = []        # 每次 handle_data 的调用次数
+        self.warnings = []          # 超预算的运行: {'tick', 'calls', 'top'}
+        self._tick = None           # 当前运行内 (调用方法, API名) -> 次数；None表示不在运行中
+
+    @property
+    def counts(self):
+        return {name: stats['count'] for name, stats in self.stats.items()}
+
+    def total(self, names=None):
+        if names is None:
+            return sum(stats['count'] for stats in self.stats.values())
+        return sum(self.stats[n]['count'] for n in names if n in self.stats)
+
+    def wrap(self, name, func):
+        """返回name的追踪包装；不在追踪列表中的API原样返回"""
+        if name not in self.names:
+            return func
+
+        def traced(*args, **kwargs):
+            key = (sys._getframe(1).f_code.co_name, name)
+            self.callers[key] = self.callers.get(key, 0) + 1
+            if self._tick is not None:
+                self._tick[key] = self._tick.get(key, 0) + 1
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                stats = self.stats.get(name)
+                if stats is None:
+                    stats = {'count': 0, 'total': 0.0, 'max': 0.0}
+                    self.stats[name] = stats
+                stats['count'] += 1
+                stats['total'] += elapsed
+                if elapsed > stats['max']:
+                    stats['max'] = elapsed
+        traced.__name__ = name
+        return traced
+
+    def begin_tick(self):
+        self._tick = {}
+
+    def end_tick(self):
+        """结束一次运行并检查预算，返回本次调用次数"""
+        tick, self._tick = self._tick or {}, None
+        calls = sum(tick.values())
+        self.tick_calls.append(calls)
+        if self.budget and calls > self.budget:
+            top = sorted(tick.items(), key=lambda item: -item[1])[:5]
+            self.warnings.append({'tick': len(self.tick_calls), 'calls': calls, 'top': top})
+            if self.verbose:
+                detail = ', '.join(f"{caller}.{name}×{count}" for (caller, name), count in top)
+                print(f"⚠️ [API预算] 第{len(self.tick_calls)}次运行调用 {calls} 次，超过预算 {self.budget}: {detail}")
+        return calls
+
+    def attach(self, strategy):
+        """包装实例的handle_data，每次调用作为一次运行统计"""
+        handle_data = strategy.handle_data
+
+        def traced_handle_data(*args, **kwargs):
+            self.begin_tick()
+            try:
+                return handle_data(*args, **kwargs)
+            finally:
+                self.end_tick()
+        strategy.handle_data = traced_handle_data
+        return strategy
+
+    def report(self):
+        """汇总: 按函数(次数/平均/最大毫秒)、按调用方法、单次运行调用分布和超预算次数"""
+        functions = {name: {'count': stats['count'],
+                            'mean_ms': stats['total'] / stats['count'] * 1000,
+                            'max_ms': stats['max'] * 1000}
+                     for name, stats in self.stats.items()}
+        ticks = sorted(self.tick_calls)
+        return {
+            'total': self.total(),
+            'functions': dict(sorted(functions.items(), key=lambda item: -item[1]['count'])),
+            'callers': dict(sorted(self.callers.items(), key=lambda item: -item[1])),
+            'ticks': len(ticks),
+            'mean_tick_calls': sum(ticks) / len(ticks) if ticks else 0.0,
+            'p95_tick_calls': ticks[min(len(ticks) - 1, int(len(ticks) * 0.95))] if ticks else 0,
+            'max_tick_calls': ticks[-1] if ticks else 0,
+            'over_budget_ticks': len(self.warnings),
+            'budget': self.budget,
+        }
+
+    def format_report(self):
+        summary = self.report()
+        lines = [f"[API追踪] {summary['ticks']} 次运行，API调用 {summary['total']} 次 | 单次平均 "
+                 f"{summary['mean_tick_calls']:.1f} p95 {summary['p95_tick_calls']} 最大 {summary['max_tick_calls']}"
+                 f" | 超预算({summary['budget'] or '未设置'}) {summary['over_budget_ticks']} 次",
+                 f"{'API':<28}{'次数':>8}{'平均(ms)':>12}{'最大(ms)':>12}"]
+        for name, row in summary['functions'].items():
+            lines.append(f"{name:<28}{row['count']:>8}{row['mean_ms']:>12.4f}{row['max_ms']:>12.4f}")
+        lines.append(f"{'调用方法 -> API':<44}{'次数':>8}")
+        for (caller, name), count in summary['callers'].items():
+            lines.append(f"{caller + ' -> ' + name:<46}{count:>8}")
+        return '\n'.join(lines)
+
+
+def _fill_crossed_limits(broker, price):
+    """价格穿越挂单价的限价单按挂单价成交，模拟实盘的订单状态变化"""
+    for order_id, order in broker.orders.items():
+        if order['type'] != 'LIMIT' or order['status'] != OrderStatus.SUBMITTED:
+            continue
+        if (order['side'] == OrderSide.BUY and price <= order['price']) or \
+                (order['side'] == OrderSide.SELL and price >= order['price']):
+            broker.fill_order(order_id)
+
+
+def replay(path, closes, overrides=None, budget=0, bar_minutes=None, symbol='US.SPY', cash=100000.0,
+           start_time=None, quiet=True):
+    """
+    离线回放策略文件并追踪API调用。
+
+    Args:
+        closes: 逐根K线收盘价，每根调用一次handle_data
+        bar_minutes: K线间隔分钟数，None为日线(跳过周末)
+        quiet: 屏蔽策略自身输出(超预算告警记录在tracer.warnings中)
+
+    Returns:
+        (ApiTracer, 策略实例, SimBroker)
+    """
+    broker = SimBroker(symbol, cash, start_time or datetime.datetime(2025, 1, 6, 10, 0))
+    series = broker.bars.setdefault((broker.symbol, None), [])
+    tracer = ApiTracer(budget, verbose=not quiet)
+    # 只统计调用次数，关闭策略内的耗时统计(避免退出时输出)
+    settings = dict({'enable_profiling': False}, **(overrides or {}))
+
+    def push(price):
+        series.append({'open': price, 'high': price, 'low': price, 'close': price, 'volume': 0})
+        broker.prices[broker.symbol] = price
+        _fill_crossed_limits(broker, price)
+
+    output = io.StringIO() if quiet else None
+    # 策略下单后会sleep等待撮合，回放时跳过
+    with (contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext()), skip_sleep():
+        push(closes[0])
+        strategy = load_strategy(path, broker, overrides=settings, counter=tracer)
+        tracer.attach(strategy)
+        if hasattr(strategy, 'trigger_symbols'):
+            strategy.trigger_symbols()
+        strategy.initialize()
+        for index, price in enumerate(closes):
+            if index:
+                if bar_minutes:
+                    broker.advance(minutes=bar_minutes)
+                else:
+                    broker.advance(days=3 if broker.now.weekday() == 4 else 1)
+                push(price)
+            strategy.handle_data()
+    return tracer, strategy, broker
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from price_store import DEFAULT_ROOT, PriceStore
+
+    parser = argparse.ArgumentParser(description='离线回放策略并统计券商API调用')
+    parser.add_argument('strategy', help='.quant/.moo 策略文件')
+    parser.add_argument('--symbol', default='US.SPY')
+    parser.add_argument('--root', default=DEFAULT_ROOT, help='价格库根目录')
+    parser.add_argument('--synthetic', type=int, metavar='DAYS', help='不读价格库，使用指定天数的GBM合成路径')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--bar-minutes', type=int, help='K线间隔分钟数(默认日线)')
+    parser.add_argument('--budget', type=int, default=0, help='单次运行API调用预算(0=不检查)')
+    parser.add_argument('--cash', type=float, default=100000.0)
+    parser.add_argument('--verbose', action='store_true', help='显示策略输出')
+    args = parser.parse_args()
+
+    if args.synthetic:
+        from path_generator import generate_paths
+        with generate_paths('gbm', 1, args.synthetic, s0=100.0, seed=args.seed) as paths:
+            prices = paths.row(0).tolist()
+    else:
+        with PriceStore(args.root).load(args.symbol, 'M{0}'.format(args.bar_minutes) if args.bar_minutes else 'D1') as bars:
+            prices = bars.close.tolist()
+
+    result, _, _ = replay(args.strategy, prices, budget=args.budget, bar_minutes=args.bar_minutes,
+                       symbol=args.symbol, cash=args.cash, quiet=not args.verbose)
+    print(result.format_report())
+    for warning in result.warnings[:10]:
+        detail = ', '.join(f"{caller}.{name}×{count}" for (caller, name), count in warning['top'])
+        print(f"⚠️ 第{warning['tick']}次运行 {warning['calls']} 次: {detail}")
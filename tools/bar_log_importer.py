@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+日内K线日志导入工具
+解析 pricedata_collector.moo 仅记录模式输出的 PBARS 日志行，写入本地价格库。
+
+日志行格式:
+    PBARS|v1|标的|K线类型|日期|开始分钟,开,高,低,收,量;...
+    开始分钟为K线开始时间距当日00:00的分钟数(570 = 09:30)
+
+用法:
+    python tools/bar_log_importer.py collector.log
+    python tools/bar_log_importer.py collector.log --root data/price_store
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+from price_store import DEFAULT_ROOT, to_ts, write_bars
+
+LINE_TAG = 'PBARS|v1|'
+
+
+def parse_bar_log(lines):
+    """
+    解析日志行(平台可能在行首加时间前缀，从PBARS标记处开始解析)。
+
+    Returns:
+        dict: {(标的, K线类型): [{'ts', 'open', 'high', 'low', 'close', 'volume'}]}
+    """
+    series = {}
+    for line in lines:
+        start = line.find(LINE_TAG)
+        if start < 0:
+            continue
+        parts = line[start:].rstrip('\r\n').split('|', 5)
+        if len(parts) != 6:
+            continue
+        _, _, symbol, bar_type, date, payload = parts
+        day_ts = to_ts(date)
+        bars = series.setdefault((symbol, bar_type), [])
+        for item in payload.split(';'):
+            fields = item.split(',')
+            if len(fields) != 6:
+                continue
+            bars.append({
+                'ts': day_ts + int(fields[0]) * 60,
+                'open': float(fields[1]), 'high': float(fields[2]),
+                'low': float(fields[3]), 'close': float(fields[4]),
+                'volume': float(fields[5]),
+            })
+    return series
+
+
+def import_bar_log(lines, root=DEFAULT_ROOT):
+    """解析并写入价格库(与已有K线按时间戳合并)，返回 {(标的, K线类型): (新解析数, 总行数)}"""
+    summary = {}
+    for (symbol, bar_type), bars in parse_bar_log(lines).items():
+        summary[(symbol, bar_type)] = (len(bars), write_bars(root, symbol, bar_type, bars))
+    return summary
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='日内K线日志导入')
+    parser.add_argument('log_files', nargs='+')
+    parser.add_argument('--root', default=DEFAULT_ROOT, help='价格库根目录')
+    args = parser.parse_args()
+
+    for log_file in args.log_files:
+        with open(log_file, 'r', encoding='utf-8') as f:
+            result = import_bar_log(f, args.root)
+        for (code, kline), (parsed, rows) in sorted(result.items()):
+            print(f"📥 {log_file}: {code} {kline} 解析 {parsed} 根K线，价格库共 {rows} 根")
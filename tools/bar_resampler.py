@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+K线重采样缓存
+把价格库中的基础K线(M1/M30等)聚合为任意更粗的周期，结果按源数据版本缓存在价格库中，
+首次请求时才计算。同一策略分别在M30、H1、D1上回测时，每个周期只重采样一次。
+
+日内周期按美股交易时段对齐(09:30开盘)，与平台一致：H1为09:30~10:30、10:30~11:30...，
+H2为09:30~11:30、11:30~13:30...；D1按日、W1按周一、MN1按自然月。
+
+缓存位置:
+    <root>/<标的>/<目标周期>~<源周期>/     meta.json 记录 source_version
+
+用法:
+    cache = BarCache(PriceStore())
+    with cache.get('US.SPY', 'H1') as bars:          # 自动选择最细的可用源周期
+        closes = bars.close
+    python tools/bar_resampler.py US.SPY H1 H2 D1
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+from price_store import DEFAULT_ROOT, PriceStore, ts_to_datetime, write_bars
+
+# 周期 -> 分钟数(W1/MN1按日历单独处理)
+BAR_MINUTES = {
+    'M1': 1, 'M3': 3, 'M5': 5, 'M15': 15, 'M30': 30,
+    'H1': 60, 'H2': 120, 'H3': 180, 'H4': 240,
+    'D1': 1440, 'W1': 7 * 1440, 'MN1': 31 * 1440,
+}
+SESSION_OPEN_MINUTE = 570       # 09:30
+DAY_SECONDS = 86400
+
+
+def _bucket_function(target):
+    """返回 ts -> 目标K线开始时间戳 的函数"""
+    if target == 'D1':
+        return lambda ts: ts - ts % DAY_SECONDS
+    if target == 'W1':
+        def week(ts):
+            day = ts - ts % DAY_SECONDS
+            return day - ts_to_datetime(day).weekday() * DAY_SECONDS
+        return week
+    if target == 'MN1':
+        def month(ts):
+            dt = ts_to_datetime(ts)
+            return ts - ts % DAY_SECONDS - (dt.day - 1) * DAY_SECONDS
+        return month
+
+    step = BAR_MINUTES[target] * 60
+    session_open = SESSION_OPEN_MINUTE * 60
+
+    def intraday(ts):
+        day = ts - ts % DAY_SECONDS
+        return day + session_open + (ts - day - session_open) // step * step
+    return intraday
+
+
+def resample(ts, opens, highs, lows, closes, volumes, target):
+    """
+    单次遍历按时间有序的源K线，聚合为目标周期。
+    开=首根开盘，高=最高，低=最低，收=末根收盘，量=求和。
+
+    Returns:
+        list: [{'ts', 'open', 'high', 'low', 'close', 'volume'}]
+    """
+    bucket_of = _bucket_function(target)
+    bars = []
+    current = None
+    current_key = None
+    for i in range(len(ts)):
+        key = bucket_of(ts[i])
+        if key != current_key:
+            current_key = key
+            current = {'ts': key, 'open': opens[i], 'high': highs[i], 'low': lows[i],
+                       'close': closes[i], 'volume': volumes[i]}
+            bars.append(current)
+            continue
+        if highs[i] > current['high']:
+            current['high'] = highs[i]
+        if lows[i] < current['low']:
+            current['low'] = lows[i]
+        current['close'] = closes[i]
+        current['volume'] += volumes[i]
+    return bars
+
+
+class BarCache:
+    """按需重采样并缓存的K线服务"""
+
+    def __init__(self, store=None):
+        self.store = store or PriceStore(DEFAULT_ROOT)
+        self.resample_count = 0
+
+    def pick_source(self, symbol, target):
+        """选择比目标周期更细、且价格库中存在的最细周期(周线、月线不作为源)"""
+        candidates = [b for b in BAR_MINUTES if BAR_MINUTES[b] < BAR_MINUTES[target]
+                      and BAR_MINUTES[b] <= BAR_MINUTES['D1'] and self.store.meta(symbol, b) is not None]
+        if not candidates:
+            raise KeyError(f"价格库中没有可用于生成 {symbol} {target} 的源K线")
+        return min(candidates, key=BAR_MINUTES.get)
+
+    def cache_type(self, target, source):
+        return f"{target}~{source}"
+
+    def is_fresh(self, symbol, cache_type, source_type):
+        cached = self.store.meta(symbol, cache_type)
+        origin = self.store.meta(symbol, source_type)
+        return cached is not None and origin is not None and \
+            cached.get('source_version') == origin.get('version')
+
+    def resolve(self, symbol, target, source=None):
+        """
+        返回存有目标周期最新数据的价格库目录名。
+        价格库中直接存有目标周期且未指定源周期时直接使用；源周期本身也可以是重采样结果
+        (如 MN1 以 D1 为源、D1 又由 M1 生成)。缓存过期时重采样一次。
+        """
+        if source is None:
+            if self.store.meta(symbol, target) is not None:
+                return target
+            source = self.pick_source(symbol, target)
+        source_type = self.resolve(symbol, source)
+
+        cache_type = self.cache_type(target, source)
+        if not self.is_fresh(symbol, cache_type, source_type):
+            origin = self.store.meta(symbol, source_type)
+            with self.store.load(symbol, source_type) as base:
+                bars = resample(base.ts, base.open, base.high, base.low, base.close, base.volume, target)
+            write_bars(self.store.root, symbol, cache_type, bars, replace=True,
+                       extra_meta={'source': source_type, 'source_version': origin.get('version')})
+            self.resample_count += 1
+        return cache_type
+
+    def get(self, symbol, target, source=None, start=None, end=None):
+        """返回目标周期的BarSeries(内存映射)，首次请求或源数据更新后才重采样"""
+        return self.store.load(symbol, self.resolve(symbol, target, source), start, end)
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='K线重采样缓存')
+    parser.add_argument('symbol')
+    parser.add_argument('targets', nargs='+', help='目标周期，如 H1 H2 D1')
+    parser.add_argument('--source', help='源周期(默认自动选择最细的可用周期)')
+    parser.add_argument('--root', default=DEFAULT_ROOT, help='价格库根目录')
+    args = parser.parse_args()
+
+    bar_cache = BarCache(PriceStore(args.root))
+    for target_type in args.targets:
+        began = time.perf_counter()
+        with bar_cache.get(args.symbol, target_type, args.source) as series:
+            count = len(series)
+            first_last = (series.dates()[0], series.dates()[-1]) if count else ('-', '-')
+        elapsed = time.perf_counter() - began
+        print(f"📊 {args.symbol} {target_type}: {count} 根K线 {first_last[0]} ~ {first_last[1]} "
+              f"| 耗时 {elapsed * 1000:.1f}ms")
+    print(f"🔄 本次重采样 {bar_cache.resample_count} 次")
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+期权链本地存档
+解析 option_chain_recorder.moo 输出的 OCHAIN 日志行，把快照写入按 标的/日期 分区的
+列式压缩文件，并通过内存映射按需读取单日分区，供离线滚轮/价差引擎回放。
+
+目录结构:
+    <root>/<标的>/<YYYY-MM-DD>.ochn
+
+分区文件格式:
+    MAGIC(8字节) | 头部长度(uint32, 小端) | 头部JSON | 列块...
+    头部JSON记录行数和每列的 类型码/偏移/长度；每列单独zlib压缩，
+    数值列为array原始字节，symbol列为换行分隔的文本。
+    读取时只解压被访问的列，不加载整个存档。
+
+用法:
+    python tools/chain_archive.py import recorder.log --root data/option_chains
+    python tools/chain_archive.py show US.SPY 2025-01-02 --root data/option_chains
+
+    with ChainPartition(partition_path(root, 'US.SPY', '2025-01-02')) as part:
+        rows = part.snapshot()            # 当日最新快照
+        chain = load_chain(rows)          # 交给 option_spreads
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import bisect
+import datetime
+import json
+import math
+import mmap
+import os
+import struct
+import zlib
+from array import array
+
+MAGIC = b'OCHAIN01'
+LINE_TAG = 'OCHAIN|v1|'
+PARTITION_SUFFIX = '.ochn'
+EPOCH = datetime.datetime(1970, 1, 1)
+
+# 列名 -> 类型码('s'为文本列，其余为array类型码)
+COLUMNS = (
+    ('ts', 'q'), ('symbol', 's'), ('is_call', 'b'), ('strike', 'd'), ('dte', 'i'),
+    ('spot', 'd'), ('bid', 'd'), ('ask', 'd'), ('delta', 'd'), ('gamma', 'd'),
+    ('theta', 'd'), ('vega', 'd'), ('iv', 'd'),
+)
+# 日志合约字段顺序(代码与C/P之后)
+LINE_FIELDS = ('strike', 'dte', 'bid', 'ask', 'delta', 'gamma', 'theta', 'vega', 'iv')
+
+
+# ========== 日志解析 ==========
+
+def _to_ts(text):
+    return int((datetime.datetime.strptime(text, '%Y-%m-%d %H:%M:%S') - EPOCH).total_seconds())
+
+
+def ts_to_datetime(ts):
+    return EPOCH + datetime.timedelta(seconds=ts)
+
+
+def _float_or_none(text):
+    return float(text) if text else None
+
+
+def parse_log(lines):
+    """
+    解析日志行，合并同一快照的分片。
+    平台日志可能在行首加时间前缀，只从 OCHAIN 标记处开始解析；分片不全的快照和行头损坏的行被丢弃，
+    现价为空时记为None，单个合约的空字段不影响其余记录。
+
+    Returns:
+        list: 快照记录 [{ts, symbol, is_call, strike, dte, spot, bid, ask, delta, gamma, theta, vega, iv}]
+    """
+    snapshots = {}
+    for line in lines:
+        start = line.find(LINE_TAG)
+        if start < 0:
+            continue
+        parts = line[start:].rstrip('\r\n').split('|', 6)
+        if len(parts) != 7:
+            continue
+        _, _, underlying, stamp, spot, seq, payload = parts
+        index, _, total = seq.partition('/')
+        try:
+            key = (underlying, _to_ts(stamp))
+            header = {'spot': _float_or_none(spot), 'total': int(total), 'chunks': {}}
+            index = int(index)
+        except ValueError:
+            continue            # 损坏的行头(时间/分片序号)，整行跳过
+        entry = snapshots.setdefault(key, header)
+        entry['chunks'][index] = payload
+
+    rows = []
+    for (underlying, ts), entry in sorted(snapshots.items()):
+        if len(entry['chunks']) != entry['total']:
+            continue
+        for index in sorted(entry['chunks']):
+            for item in entry['chunks'][index].split(';'):
+                fields = item.split(',')
+                if len(fields) != 2 + len(LINE_FIELDS):
+                    continue
+                row = {'underlying': underlying, 'ts': ts, 'symbol': fields[0],
+                       'is_call': fields[1] == 'C', 'spot': entry['spot']}
+                try:
+                    for name, text in zip(LINE_FIELDS, fields[2:]):
+                        row[name] = _float_or_none(text)
+                except ValueError:
+                    continue        # 损坏的数值字段
+                # 无报价合约的报价/Greeks为空(存为NaN)；缺少行权价或到期天数的记录无法归档，跳过
+                if row['strike'] is None or row['dte'] is None:
+                    continue
+                row['dte'] = int(row['dte'])
+                rows.append(row)
+    return rows
+
+
+# ========== 分区写入 ==========
+
+def partition_path(root, underlying, date):
+    return os.path.join(root, underlying, f"{date}{PARTITION_SUFFIX}")
+
+
+def _encode_column(values, code):
+    if code == 's':
+        return '\n'.join(values).encode('utf-8')
+    if code == 'd':
+        values = [math.nan if v is None else v for v in values]
+    return array(code, values).tobytes()
+
+
+def write_partition(path, rows):
+    """按(时间, 类型, 行权价)排序后写入单个分区文件(先写临时文件再替换)"""
+    rows = sorted(rows, key=lambda r: (r['ts'], r['is_call'], r['strike'], r['dte'], r['symbol']))
+    header = {'rows': len(rows), 'columns': {}}
+    blocks = []
+    offset = 0
+    for name, code in COLUMNS:
+        block = zlib.compress(_encode_column([r[name] for r in rows], code), 6)
+        header['columns'][name] = {'type': code, 'offset': offset, 'length': len(block)}
+        blocks.append(block)
+        offset += len(block)
+
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header_bytes)))
+        f.write(header_bytes)
+        for block in blocks:
+            f.write(block)
+    os.replace(tmp_path, path)
+
+
+def append_rows(root, rows):
+    """
+    把快照记录并入存档：按 标的/日期 分组，与已有分区合并去重(同一时间同一合约保留新值)后重写。
+
+    Returns:
+        list: 写入的分区路径
+    """
+    groups = {}
+    for row in rows:
+        date = ts_to_datetime(row['ts']).strftime('%Y-%m-%d')
+        groups.setdefault((row['underlying'], date), []).append(row)
+
+    written = []
+    for (underlying, date), new_rows in sorted(groups.items()):
+        path = partition_path(root, underlying, date)
+        merged = {}
+        if os.path.exists(path):
+            with ChainPartition(path) as part:
+                for row in part.rows():
+                    merged[(row['ts'], row['symbol'])] = row
+        for row in new_rows:
+            merged[(row['ts'], row['symbol'])] = row
+        write_partition(path, list(merged.values()))
+        written.append(path)
+    return written
+
+
+# ========== 分区读取 ==========
+
+class ChainPartition:
+    """
+    单日分区的只读视图。文件通过mmap映射，列在首次访问时才解压并缓存。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"不是期权链分区文件: {path}")
+        (header_len,) = struct.unpack_from('<I', self._map, len(MAGIC))
+        data_start = len(MAGIC) + 4
+        self.header = json.loads(self._map[data_start:data_start + header_len].decode('utf-8'))
+        self._data_start = data_start + header_len
+        self._columns = {}
+        self.decoded = []           # 已解压的列名(按访问顺序)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __len__(self):
+        return self.header['rows']
+
+    def column(self, name):
+        """返回单列(数值列为array，symbol为list)，NaN表示缺失"""
+        if name not in self._columns:
+            info = self.header['columns'][name]
+            start = self._data_start + info['offset']
+            with memoryview(self._map) as view:
+                with view[start:start + info['length']] as block:
+                    raw = zlib.decompress(block)
+            if info['type'] == 's':
+                values = raw.decode('utf-8').split('\n') if raw else []
+            else:
+                values = array(info['type'])
+                values.frombytes(raw)
+            self._columns[name] = values
+            self.decoded.append(name)
+        return self._columns[name]
+
+    def timestamps(self):
+        ts = self.column('ts')
+        result = []
+        for value in ts:
+            if not result or result[-1] != value:
+                result.append(value)
+        return result
+
+    def rows(self, start=0, stop=None, columns=None):
+        """按行区间生成记录字典(缺失值还原为None)"""
+        names = columns or [name for name, _ in COLUMNS]
+        stop = len(self) if stop is None else stop
+        cols = [(name, self.column(name)) for name in names]
+        underlying = os.path.basename(os.path.dirname(self.path))
+        for i in range(start, stop):
+            row = {'underlying': underlying}
+            for name, col in cols:
+                value = col[i]
+                if name == 'is_call':
+                    value = bool(value)
+                elif isinstance(value, float) and math.isnan(value):
+                    value = None
+                row[name] = value
+            yield row
+
+    def snapshot(self, ts=None, columns=None):
+        """
+        返回不晚于ts的最近一次快照(默认当日最后一次)。
+        时间列已排序，用二分查找定位行区间。
+        """
+        ts_col = self.column('ts')
+        if not len(ts_col):
+            return []
+        if ts is None:
+            ts = ts_col[-1]
+        elif isinstance(ts, datetime.datetime):
+            ts = int((ts - EPOCH).total_seconds())
+        end = bisect.bisect_right(ts_col, ts)
+        if end == 0:
+            return []
+        snap_ts = ts_col[end - 1]
+        start = bisect.bisect_left(ts_col, snap_ts)
+        return list(self.rows(start, end, columns))
+
+
+def list_partitions(root, underlying):
+    """列出某标的所有分区日期(升序)"""
+    folder = os.path.join(root, underlying)
+    if not os.path.isdir(folder):
+        return []
+    return sorted(name[:-len(PARTITION_SUFFIX)] for name in os.listdir(folder)
+                  if name.endswith(PARTITION_SUFFIX))
+
+
+def load_snapshot(root, underlying, date, ts=None):
+    """只映射单日分区并返回快照记录，可直接交给 option_spreads.load_chain"""
+    with ChainPartition(partition_path(root, underlying, date)) as part:
+        return part.snapshot(ts)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='期权链本地存档')
+    parser.add_argument('--root', default=os.path.join('data', 'option_chains'), help='存档根目录')
+    sub = parser.add_subparsers(dest='command', required=True)
+    cmd_import = sub.add_parser('import', help='导入记录器日志')
+    cmd_import.add_argument('log_file')
+    cmd_show = sub.add_parser('show', help='查看单日分区')
+    cmd_show.add_argument('underlying')
+    cmd_show.add_argument('date', help='YYYY-MM-DD')
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        with open(args.log_file, 'r', encoding='utf-8') as f:
+            records = parse_log(f)
+        paths = append_rows(args.root, records)
+        print(f"📥 导入 {len(records)} 条合约记录，写入 {len(paths)} 个分区")
+        for p in paths:
+            print(f"   {p} ({os.path.getsize(p):,} 字节)")
+    else:
+        with ChainPartition(partition_path(args.root, args.underlying, args.date)) as partition:
+            stamps = partition.timestamps()
+            print(f"📊 {args.underlying} {args.date}: {len(partition)} 条记录，{len(stamps)} 次快照")
+            latest = partition.snapshot()
+            if latest:
+                print(f"   最新快照 {ts_to_datetime(latest[0]['ts'])} 现价 ${latest[0]['spot']:.2f}，{len(latest)} 个合约")
+                for r in latest:
+                    print(f"   {r['symbol']:<24} {'C' if r['is_call'] else 'P'} {r['strike']:>8g} "
+                          f"DTE {r['dte']:>3} {r['bid']}/{r['ask']} Δ {r['delta']}")
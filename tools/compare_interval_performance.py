@@ -6,8 +6,11 @@
 
 import json
 import math
+import os
 from datetime import datetime, timedelta
 
+from price_store import load_records
+
 class IntervalComparisonTest:
     """投资周期对比测试"""
     
@@ -17,9 +20,7 @@ class IntervalComparisonTest:
         
     def load_spy_data(self, file_path):
         """加载SPY数据"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return data
+        return load_records(file_path)
     
     def reset_state(self, interval_days, qty):
         """重置测试状态"""
@@ -240,7 +241,7 @@ class IntervalComparisonTest:
 
 def main():
     """主函数"""
-    spy_file = '/home/wuxia/projects/moomoo_custom_strategies/data/spy_price_history.json'
+    spy_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'spy_price_history.json')
     tester = IntervalComparisonTest(spy_file, initial_balance=50000)
     
     # 分析市场条件
@@ -250,7 +251,8 @@ def main():
     results = tester.compare_intervals()
     
     # 保存结果
-    output_file = '/home/wuxia/projects/moomoo_custom_strategies/data/interval_comparison_report.json'
+    output_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'interval_comparison_report.json')
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(results, f, indent=2, ensure_ascii=False)
     
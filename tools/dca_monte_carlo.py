@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+DCA策略蒙特卡洛评估引擎
+在 路径数×天数 的价格矩阵(path_generator.PathMatrix)上批量运行 dca_free_stable.quant 的
+分层回撤加仓逻辑，比较免费版/付费版、体验券和各 preset_mode 的结果分布。
+
+规则与策略 v2.8.1 回测模式一致:
+    - 运行时最高价从第0天价格开始，回撤 = (最高价 - 价格) / 最高价
+    - 免费版: 每周(5个交易日)定投，数量按免费版规则校验(10~100且为10的倍数，否则10股)
+    - 付费版: 回撤达到某层即按该层倍数加仓(每天都会触发，当天不再常规定投)，
+      回撤≥60%时只做常规定投；数量校验为1~1000
+    - 资金不足时按剩余资金买入最大整数股，不足1股则跳过
+    - 体验券: v2.8.1 的 free_version_logic 不会调用 _handle_free_tier_experience，
+      因此单独作为"免费版+体验券"场景评估(回撤≥10%时一次性2倍加仓，当天不再定投)
+    - preset_mode 在策略中只给出建议股数(保守10/平衡15/积极25)，这里按建议股数评估
+    - 层级触发次数与策略日志一致，资金不足未能成交的触发也计入
+
+每条路径的结果(现金、持仓、成本、资金耗尽日、各层触发次数)保存在按路径索引的array中。
+内核按行遍历连续存储的路径，资金已不够买入剩余路径上任何一天的1股时提前结束该路径。
+
+用法:
+    with generate_paths('gbm', 10000, 2500, s0=550.0, seed=7) as paths:
+        result = evaluate(paths, scenario(2, preset_mode=2))
+        print(summarize(result))
+
+    python tools/dca_monte_carlo.py --model regime --paths 10000 --days 2500 --s0 550
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import math
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+
+from path_generator import PathMatrix
+
+PRESET_QTY = {1: 10, 2: 15, 3: 25}
+PRESET_NAMES = {1: '保守型', 2: '平衡型', 3: '积极型'}
+FREE_LAYERS = ([5.0, 10.0, 20.0], [1.5, 2.0, 3.0])
+PAID_LAYERS = ([5.0, 10.0, 20.0, 35.0, 50.0], [1.5, 2.0, 3.0, 4.0, 5.0])
+EXTREME_DRAWDOWN_PCT = 60.0
+VOUCHER_DRAWDOWN_PCT = 10.0
+VOUCHER_MULTIPLIER = 2.0
+SPY_PRICE_ESTIMATE = 600        # 付费版智能频率中的每日成本估算
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+# ========== 场景配置 ==========
+
+def _free_qty(qty):
+    return qty if 10 <= qty <= 100 and qty % 10 == 0 else 10
+
+
+def _paid_qty(qty, effective_qty):
+    return qty if 1 <= qty <= 1000 else effective_qty
+
+
+def _interval_minutes(version_tier, interval_mode, effective_qty, balance, custom_interval_min):
+    """与 setup_tier_features 相同的投资周期选择"""
+    if interval_mode == 1:
+        if version_tier == 1:
+            return 10080
+        conservative_days = int(int(balance / (effective_qty * SPY_PRICE_ESTIMATE)) * 0.7)
+        if conservative_days >= 5:
+            return 1440
+        return 10080 if conservative_days >= 2 else 20160
+    if interval_mode == 2:
+        return 1440 if version_tier >= 2 else 10080
+    if interval_mode == 4 and version_tier >= 2:
+        return custom_interval_min
+    return 10080
+
+
+def scenario(version_tier, preset_mode=None, qty=20, voucher=False, aggressive_multiplier=1.0,
+             interval_mode=1, custom_interval_min=1440, balance=100000.0, label=None,
+             layers=None, multipliers=None):
+    """
+    构造一个评估场景(与策略参数同名)。
+
+    Args:
+        preset_mode: 给出时使用该预设的建议股数代替qty
+        voucher: 仅免费版有效，启用体验券
+        balance: 初始资金(付费版custom_balance / 免费版账户现金)
+        layers, multipliers: 替换付费版的drawdown_layers/base_multipliers(参数搜索使用)
+    """
+    if preset_mode is not None:
+        qty = PRESET_QTY[preset_mode]
+    default_layers, default_multipliers = PAID_LAYERS if version_tier == 2 else FREE_LAYERS
+    layers = list(layers or default_layers)
+    multipliers = list(multipliers or default_multipliers)
+    if len(layers) != len(multipliers):
+        raise ValueError(f"回撤层级与倍数数量不一致: {layers} / {multipliers}")
+    if layers != sorted(set(layers)):
+        raise ValueError(f"回撤层级必须严格递增: {layers}")
+    multiplier = 1.0 if version_tier == 1 else min(max(aggressive_multiplier, 1.0), 2.5)
+    interval_min = _interval_minutes(version_tier, interval_mode, qty, balance, custom_interval_min)
+
+    if version_tier == 2:
+        base_qty = _paid_qty(qty, qty)
+        add_qtys = [_paid_qty(int(qty * m * multiplier), qty) for m in multipliers]
+        voucher_qty = 0
+    else:
+        base_qty = _free_qty(qty)
+        add_qtys = []
+        voucher_qty = _free_qty(int(qty * VOUCHER_MULTIPLIER)) if voucher else 0
+
+    if label is None:
+        label = '付费版' if version_tier == 2 else ('免费版+体验券' if voucher_qty else '免费版')
+        if preset_mode is not None:
+            label += '-' + PRESET_NAMES[preset_mode]
+    return {
+        'label': label,
+        'version_tier': version_tier,
+        'qty': qty,
+        'balance': float(balance),
+        'base_qty': base_qty,
+        'interval_days': max(1, round(interval_min / 1440 * 5 / 7)),   # 日历分钟 -> 交易日
+        # 由浅到深: [(回撤阈值%, 加仓股数)]
+        'layers': list(zip(layers, add_qtys)),
+        'layer_count': len(add_qtys),
+        'extreme_pct': EXTREME_DRAWDOWN_PCT,
+        'voucher_qty': voucher_qty,
+        'voucher_pct': VOUCHER_DRAWDOWN_PCT,
+    }
+
+
+def standard_scenarios(balance=100000.0, aggressive_multiplier=1.0):
+    """免费版、免费版+体验券、付费版 × 三种预设"""
+    return [scenario(tier, preset_mode=mode, voucher=voucher, balance=balance,
+                     aggressive_multiplier=aggressive_multiplier)
+            for tier, voucher in ((1, False), (1, True), (2, False)) for mode in sorted(PRESET_QTY)]
+
+
+# ========== 评估内核 ==========
+
+def _run_path(row, config):
+    """
+    单条路径的逐日模拟。
+    各层触发价 = 最高价 × (1 - 阈值)，只在创新高时重算；大多数交易日只需比较价格与
+    最浅一层的触发价以及下次定投日。
+
+    Returns:
+        tuple: (现金, 持仓, 成本, 资金耗尽日或-1, 体验券使用日或-1, [各层触发次数])
+    """
+    prices = row.tolist()
+    n_days = len(prices)
+    cash = config['balance']
+    base_qty = config['base_qty']
+    interval = config['interval_days']
+    layer_count = config['layer_count']
+    voucher_qty = config['voucher_qty']
+    # 各层触发价系数(由浅到深)，最后一项为极端回撤保护
+    factors = [1.0 - threshold / 100.0 for threshold, _ in config['layers']]
+    factors.append(1.0 - config['extreme_pct'] / 100.0)
+    add_qtys = [add_qty for _, add_qty in config['layers']]
+    if layer_count:
+        first_factor = factors[0]
+    elif voucher_qty:
+        first_factor = 1.0 - config['voucher_pct'] / 100.0
+    else:
+        first_factor = 0.0
+
+    balance = cash
+    position = 0
+    high = prices[0]
+    floor = high * first_factor
+    levels, level_high = None, None
+    next_due = 0
+    exhausted_day = -1
+    voucher_day = -1
+    counts = [0] * layer_count
+    suffix_min = None
+
+    for day, price in enumerate(prices):
+        if price > high:
+            high = price
+            floor = high * first_factor
+
+        if price > floor:
+            if day < next_due:
+                continue
+            qty = base_qty
+        elif layer_count:
+            if level_high != high:
+                level_high = high
+                levels = [high * factor for factor in factors]
+            if price <= levels[layer_count]:
+                # 极端回撤保护：仅常规定投
+                if day < next_due:
+                    continue
+                qty = base_qty
+            else:
+                layer = 0
+                while layer + 1 < layer_count and price <= levels[layer + 1]:
+                    layer += 1
+                counts[layer] += 1
+                qty = add_qtys[layer]
+        else:
+            # 体验券只用一次，之后不再检查回撤
+            qty = voucher_qty
+            voucher_day = day
+            first_factor = floor = 0.0
+
+        required = qty * price
+        if required > cash:
+            if exhausted_day < 0:
+                exhausted_day = day
+            if price > cash:
+                # 现金已买不起剩余路径上最低价的1股时，后续不会再有任何成交
+                if suffix_min is None:
+                    suffix_min = list(accumulate(reversed(prices), min))
+                    suffix_min.reverse()
+                if day + 1 >= n_days or cash < suffix_min[day + 1]:
+                    break
+                continue
+            qty = int(cash // price)
+            required = qty * price
+        cash -= required
+        position += qty
+        next_due = day + interval
+
+    return cash, position, balance - cash, exhausted_day, voucher_day, counts
+
+
+def simulate(prices, config):
+    """在单条价格序列上运行一个场景，返回与evaluate相同字段的标量结果"""
+    cash, position, cost, exhausted_day, voucher_day, counts = _run_path(array('d', prices), config)
+    return {
+        'cash': cash, 'position': position, 'cost': cost, 'final_value': cash + position * prices[-1],
+        'exhausted_day': exhausted_day, 'voucher_day': voucher_day, 'layer_triggers': counts,
+    }
+
+
+def _evaluate_rows(matrix, config, start, stop):
+    layer_count = config['layer_count']
+    out = {
+        'cash': array('d'), 'position': array('q'), 'cost': array('d'), 'final_value': array('d'),
+        'exhausted_day': array('l'), 'voucher_day': array('l'),
+        'layer_triggers': [array('l') for _ in range(layer_count)],
+    }
+    for i in range(start, stop):
+        row = matrix.row(i)
+        cash, position, cost, exhausted_day, voucher_day, counts = _run_path(row, config)
+        out['cash'].append(cash)
+        out['position'].append(position)
+        out['cost'].append(cost)
+        out['final_value'].append(cash + position * row[-1])
+        out['exhausted_day'].append(exhausted_day)
+        out['voucher_day'].append(voucher_day)
+        for layer in range(layer_count):
+            out['layer_triggers'][layer].append(counts[layer])
+    return out
+
+
+def _evaluate_chunk(name, n_paths, n_days, config, start, stop):
+    """工作进程：附加共享矩阵并评估[start, stop)行"""
+    matrix = PathMatrix.attach(name, n_paths, n_days)
+    try:
+        return _evaluate_rows(matrix, config, start, stop)
+    finally:
+        matrix.close()
+
+
+def evaluate(matrix, config, workers=1):
+    """
+    在整个路径矩阵上运行一个场景。
+
+    Args:
+        matrix: PathMatrix
+        config: scenario() 返回的场景
+        workers: 工作进程数，>1时按行分块附加同一块共享内存
+
+    Returns:
+        dict: 按路径索引的array: cash/position/cost/final_value/exhausted_day/voucher_day，
+              layer_triggers为每层一个array；另含config、n_days
+    """
+    if workers <= 1 or matrix.n_paths < 2 * workers:
+        result = _evaluate_rows(matrix, config, 0, matrix.n_paths)
+    else:
+        chunk = math.ceil(matrix.n_paths / workers)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_evaluate_chunk, matrix.name, matrix.n_paths, matrix.n_days, config,
+                                   start, min(start + chunk, matrix.n_paths))
+                       for start in range(0, matrix.n_paths, chunk)]
+            parts = [future.result() for future in futures]
+        result = parts[0]
+        for part in parts[1:]:
+            for key, values in part.items():
+                if key == 'layer_triggers':
+                    for merged, extra in zip(result[key], values):
+                        merged.extend(extra)
+                else:
+                    result[key].extend(values)
+    result['config'] = config
+    result['n_days'] = matrix.n_days
+    return result
+
+
+# ========== 结果汇总 ==========
+
+def percentiles(values):
+    ordered = sorted(values)
+    if not ordered:
+        return {p: None for p in PERCENTILES}
+    return {p: ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] for p in PERCENTILES}
+
+
+def summarize(result):
+    """
+    汇总分布。
+
+    Returns:
+        dict: {
+            'label', 'paths',
+            'return': 总资产收益率百分位,
+            'exhausted_ratio': 出现资金不足的路径占比,
+            'exhausted_day': 资金耗尽日百分位(仅统计耗尽的路径),
+            'voucher_ratio': 使用了体验券的路径占比,
+            'layers': [{'layer', 'hit_ratio': 至少触发一次的路径占比, 'mean_triggers': 平均触发次数}]
+        }
+    """
+    config = result['config']
+    n_paths = len(result['final_value'])
+    balance = config['balance']
+    exhausted = [day for day in result['exhausted_day'] if day >= 0]
+    layers = []
+    for layer, counts in enumerate(result['layer_triggers']):
+        layers.append({
+            'layer': layer + 1,
+            'hit_ratio': sum(1 for c in counts if c) / n_paths if n_paths else 0.0,
+            'mean_triggers': sum(counts) / n_paths if n_paths else 0.0,
+        })
+    return {
+        'label': config['label'],
+        'paths': n_paths,
+        'return': percentiles([value / balance - 1.0 for value in result['final_value']]),
+        'exhausted_ratio': len(exhausted) / n_paths if n_paths else 0.0,
+        'exhausted_day': percentiles(exhausted),
+        'voucher_ratio': sum(1 for day in result['voucher_day'] if day >= 0) / n_paths if n_paths else 0.0,
+        'layers': layers,
+    }
+
+
+def compare(matrix, configs, workers=1):
+    """在同一组路径上评估多个场景，返回summarize结果列表"""
+    return [summarize(evaluate(matrix, config, workers)) for config in configs]
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    from path_generator import MODELS, generate_paths
+
+    parser = argparse.ArgumentParser(description='DCA策略蒙特卡洛评估')
+    parser.add_argument('--model', default='gbm', choices=sorted(MODELS))
+    parser.add_argument('--paths', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=2500)
+    parser.add_argument('--s0', type=float, default=550.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--balance', type=float, default=100000.0)
+    parser.add_argument('--multiplier', type=float, default=1.0, help='付费版激进乘数(1.0-2.5)')
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    began = time.perf_counter()
+    with generate_paths(args.model, args.paths, args.days, args.s0, args.seed, args.workers) as paths:
+        generated = time.perf_counter()
+        print(f"📈 {args.model}: {args.paths} 条路径 × {args.days} 天，生成耗时 {generated - began:.2f}秒")
+        for config_item in standard_scenarios(args.balance, args.multiplier):
+            started = time.perf_counter()
+            summary = summarize(evaluate(paths, config_item, args.workers))
+            elapsed = time.perf_counter() - started
+            print(f"\n🎯 {summary['label']} (评估耗时 {elapsed:.2f}秒)")
+            print("   收益率: " + ' | '.join(f"P{p}: {v:+.1%}" for p, v in summary['return'].items()))
+            if summary['exhausted_ratio']:
+                days_text = ' | '.join(f"P{p}: {v}" for p, v in summary['exhausted_day'].items())
+                print(f"   资金耗尽: {summary['exhausted_ratio']:.1%} 的路径，耗尽日 {days_text}")
+            else:
+                print("   资金耗尽: 无")
+            if config_item['voucher_qty']:
+                print(f"   体验券使用: {summary['voucher_ratio']:.1%} 的路径")
+            for info in summary['layers']:
+                print(f"   第{info['layer']}层: 触发路径 {info['hit_ratio']:.1%}，"
+                      f"平均 {info['mean_triggers']:.1f} 次/路径")
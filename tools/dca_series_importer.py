@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+DCA数据收集序列导入工具
+解析 DCA策略(v2.14.0)数据收集模式输出的 DCASER 日志行，按K线序号合并写入本地价格库，
+供长周期回测的持仓、成本和回撤分析使用，不再需要从控制台日志里抓取进度行。
+
+日志行格式:
+    DCASER|v1|标的|批次|行数|K线序号,价格,持仓,总成本,回撤%,层级;...
+    层级为回撤达到的最深一层(0=未达到第1层)
+
+存储结构(与price_store共用根目录):
+    <root>/<标的>/dca_series/
+        meta.json       行数
+        bar.bin         int64   K线序号(升序)
+        price.bin       float64 价格
+        position.bin    int64   持仓
+        cost.bin        float64 总成本
+        drawdown.bin    float64 回撤%
+        layer.bin       int8    回撤层级
+
+用法:
+    python tools/dca_series_importer.py import dca_collect.log
+    python tools/dca_series_importer.py show US.SPY
+
+    series = load_series('US.SPY')
+    avg_cost = [c / q if q else 0.0 for c, q in zip(series['cost'], series['position'])]
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import json
+import os
+from array import array
+
+from price_store import DEFAULT_ROOT
+
+LINE_TAG = 'DCASER|v1|'
+SERIES_COLUMNS = (('bar', 'q'), ('price', 'd'), ('position', 'q'), ('cost', 'd'), ('drawdown', 'd'), ('layer', 'b'))
+_PARSERS = (int, float, int, float, float, int)
+
+
+def parse_series_log(lines):
+    """
+    解析日志行(平台可能在行首加时间前缀，从DCASER标记处开始解析)；行数不符的截断行整行跳过。
+
+    Returns:
+        dict: {标的: {列名: array}}，同一序号出现多次时保留最后一次
+    """
+    rows = {}
+    for line in lines:
+        start = line.find(LINE_TAG)
+        if start < 0:
+            continue
+        parts = line[start:].rstrip('\r\n').split('|', 5)
+        if len(parts) != 6:
+            continue
+        _, _, symbol, _, count, payload = parts
+        items = payload.split(';')
+        if not count.isdigit() or len(items) != int(count):
+            continue
+        try:
+            parsed = [tuple(parse(value) for parse, value in zip(_PARSERS, item.split(','))) for item in items]
+        except ValueError:
+            continue
+        by_bar = rows.setdefault(symbol, {})
+        for row in parsed:
+            if len(row) == len(SERIES_COLUMNS):
+                by_bar[row[0]] = row
+    return {symbol: _to_columns(by_bar) for symbol, by_bar in rows.items()}
+
+
+def _to_columns(by_bar):
+    ordered = [by_bar[bar] for bar in sorted(by_bar)]
+    return {name: array(code, (row[i] for row in ordered)) for i, (name, code) in enumerate(SERIES_COLUMNS)}
+
+
+def _series_folder(root, symbol):
+    return os.path.join(root, symbol, 'dca_series')
+
+
+def load_series(symbol, root=DEFAULT_ROOT):
+    """读取某标的的数据收集序列: {列名: array}"""
+    folder = _series_folder(root, symbol)
+    meta_path = os.path.join(folder, 'meta.json')
+    if not os.path.exists(meta_path):
+        raise KeyError(f"本地没有 {symbol} 的数据收集序列")
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        rows = json.load(f)['rows']
+    columns = {}
+    for name, code in SERIES_COLUMNS:
+        values = array(code)
+        with open(os.path.join(folder, f"{name}.bin"), 'rb') as f:
+            values.fromfile(f, rows)
+        columns[name] = values
+    return columns
+
+
+def write_series(root, symbol, columns, replace=False):
+    """按K线序号与已有序列合并(新数据覆盖同序号)，各列先写临时文件再替换；返回总行数"""
+    by_bar = {}
+    if not replace:
+        try:
+            existing = load_series(symbol, root)
+        except KeyError:
+            existing = None
+        if existing:
+            by_bar.update((row[0], row) for row in zip(*(existing[name] for name, _ in SERIES_COLUMNS)))
+    by_bar.update((row[0], row) for row in zip(*(columns[name] for name, _ in SERIES_COLUMNS)))
+    merged = _to_columns(by_bar)
+
+    folder = _series_folder(root, symbol)
+    os.makedirs(folder, exist_ok=True)
+    for name, _ in SERIES_COLUMNS:
+        tmp_path = os.path.join(folder, f"{name}.bin.tmp")
+        with open(tmp_path, 'wb') as f:
+            merged[name].tofile(f)
+        os.replace(tmp_path, os.path.join(folder, f"{name}.bin"))
+    with open(os.path.join(folder, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'rows': len(by_bar)}, f, ensure_ascii=False, indent=2)
+    return len(by_bar)
+
+
+def import_series_log(lines, root=DEFAULT_ROOT, replace=False):
+    """解析并写入价格库，返回 {标的: (新解析行数, 总行数)}"""
+    summary = {}
+    for symbol, columns in parse_series_log(lines).items():
+        summary[symbol] = (len(columns['bar']), write_series(root, symbol, columns, replace))
+    return summary
+
+
+def summarize(columns):
+    """序列汇总: K线数、最终持仓/成本/均价、最大回撤和各层级出现的K线数"""
+    rows = len(columns['bar'])
+    if not rows:
+        return {'bars': 0}
+    position, cost = columns['position'][-1], columns['cost'][-1]
+    layers = {}
+    for layer in columns['layer']:
+        layers[layer] = layers.get(layer, 0) + 1
+    return {
+        'bars': rows,
+        'first_bar': columns['bar'][0],
+        'last_bar': columns['bar'][-1],
+        'position': position,
+        'cost': cost,
+        'avg_cost': cost / position if position else 0.0,
+        'value': position * columns['price'][-1],
+        'max_drawdown': max(columns['drawdown']),
+        'layer_bars': dict(sorted(layers.items())),
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='DCA数据收集序列导入')
+    parser.add_argument('--root', default=DEFAULT_ROOT, help='价格库根目录')
+    sub = parser.add_subparsers(dest='command', required=True)
+    cmd = sub.add_parser('import', help='导入DCASER日志行')
+    cmd.add_argument('log_files', nargs='+')
+    cmd.add_argument('--replace', action='store_true', help='覆盖已有序列而不是合并')
+    cmd = sub.add_parser('show', help='查看已导入的序列汇总')
+    cmd.add_argument('symbol')
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        for index, log_file in enumerate(args.log_files):
+            with open(log_file, 'r', encoding='utf-8') as f:
+                result = import_series_log(f, args.root, replace=args.replace and index == 0)
+            for code, (parsed, rows) in sorted(result.items()):
+                print(f"📥 {log_file}: {code} 解析 {parsed} 根K线，序列共 {rows} 根")
+    else:
+        info = summarize(load_series(args.symbol, args.root))
+        if not info['bars']:
+            raise SystemExit(f"❌ {args.symbol} 的序列为空")
+        print(f"📊 {args.symbol}: 第{info['first_bar']}~{info['last_bar']}根K线，共 {info['bars']} 根")
+        print(f"   持仓 {info['position']}股 | 总成本 ${info['cost']:,.2f} | 均价 ${info['avg_cost']:.2f} | "
+              f"市值 ${info['value']:,.0f}")
+        print(f"   最大回撤 {info['max_drawdown']:.2f}% | 各层级K线数 {info['layer_bars']}")
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+DCA策略状态日志与快照
+DCA策略(v2.13.0)把重启后需要保留的状态(上次投资时间、最高价、体验券、持仓成本、阶梯挂单等)
+以 DCAJ(变化字段) / DCASNAP(完整快照) 日志行输出。本工具把导出的日志合并为最新快照，
+重启时填入策略的 restore_state 参数，一次读取即可恢复，不再请求200日历史数据。
+
+离线运行时用 StateJournal 做文件持久化：日志行实时追加到 journal.log(每行写入后fsync)，
+条目过多时合并写入 snapshot.json(先写临时文件再替换)并清空日志，崩溃后最多丢失未写完的一行。
+
+用法:
+    python tools/dca_state_journal.py restore live.log            # 输出可粘贴到 restore_state 的快照行
+    python tools/dca_state_journal.py show live.log
+    python tools/dca_state_journal.py restore --store data/price_store/dca_state/US.SPY
+
+    journal = StateJournal(root)
+    with contextlib.redirect_stdout(journal.stream()):
+        strategy = load_strategy(path, broker, overrides=dict(journal.restore_overrides()))
+        ...
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import io
+import json
+import os
+
+from price_store import DEFAULT_ROOT
+
+JOURNAL_TAG = 'DCAJ|v1|'
+SNAPSHOT_TAG = 'DCASNAP|v1|'
+JOURNAL_FILE = 'journal.log'
+SNAPSHOT_FILE = 'snapshot.json'
+
+
+def parse_line(line):
+    """解析一行状态日志: ('snapshot'|'journal', 序号, 字段) ；不是状态日志时返回None"""
+    for kind, tag in (('snapshot', SNAPSHOT_TAG), ('journal', JOURNAL_TAG)):
+        start = line.find(tag)
+        if start < 0:
+            continue
+        parts = line[start + len(tag):].rstrip('\r\n').split('|', 1)
+        if len(parts) != 2:
+            return None
+        try:
+            return kind, int(parts[0]), json.loads(parts[1])
+        except ValueError:
+            return None         # 被截断的行
+    return None
+
+
+def merge(entries, seq=0, state=None):
+    """
+    按顺序合并状态日志：快照替换全部状态(新会话的快照序号从1开始)，变化行覆盖对应字段；重复输出的旧序号被跳过。
+
+    Returns:
+        (序号, 状态字典)，没有任何快照时状态为None
+    """
+    for kind, entry_seq, fields in entries:
+        if kind == 'snapshot':
+            if state is None or entry_seq != seq:      # 相同序号的快照是重复输出
+                seq, state = entry_seq, dict(fields)
+        elif state is not None and entry_seq > seq:
+            seq = entry_seq
+            state.update(fields)
+    return seq, state
+
+
+def latest_state(lines):
+    return merge(entry for entry in map(parse_line, lines) if entry)
+
+
+def snapshot_line(seq, state):
+    """生成可直接填入 restore_state 参数的快照行"""
+    return f"{SNAPSHOT_TAG}{seq}|{json.dumps(state, ensure_ascii=False, separators=(',', ':'))}"
+
+
+class StateJournal:
+    """离线运行时的文件持久化：只追加的日志 + 定期合并的快照"""
+
+    def __init__(self, root, compact_every=200):
+        self.root = root
+        self.compact_every = compact_every
+        os.makedirs(root, exist_ok=True)
+        self.journal_path = os.path.join(root, JOURNAL_FILE)
+        self.snapshot_path = os.path.join(root, SNAPSHOT_FILE)
+        self._pending = 0
+        self._repair_tail()
+
+    def _repair_tail(self):
+        """截掉崩溃时写到一半的最后一行，避免后续追加的行与之粘连"""
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b'\n'):
+                f.truncate(data.rfind(b'\n') + 1)
+
+    def append(self, line):
+        """追加一行状态日志(非状态日志忽略)；返回是否写入"""
+        entry = parse_line(line)
+        if entry is None:
+            return False
+        tag = SNAPSHOT_TAG if entry[0] == 'snapshot' else JOURNAL_TAG
+        text = line[line.find(tag):].rstrip('\r\n')
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(text + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._pending += 1
+        if self.compact_every and self._pending >= self.compact_every:
+            self.compact()
+        return True
+
+    def stream(self):
+        """供 redirect_stdout 使用的输出流：状态日志行实时写入，其余输出保留在 .output 中"""
+        return _JournalStream(self)
+
+    def load(self):
+        """读取快照并重放其后的日志: (序号, 状态)"""
+        seq, state = 0, None
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            seq, state = data['seq'], data['state']
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                seq, state = merge((entry for entry in map(parse_line, f) if entry), seq, state)
+        return seq, state
+
+    def compact(self):
+        """把日志合并进快照并清空日志"""
+        seq, state = self.load()
+        if state is not None:
+            tmp_path = self.snapshot_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'seq': seq, 'state': state}, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+        open(self.journal_path, 'w').close()
+        self._pending = 0
+        return seq, state
+
+    def restore_overrides(self):
+        """重启参数: {'restore_state': 快照行}，没有保存的状态时为空"""
+        seq, state = self.load()
+        return {'restore_state': snapshot_line(seq, state)} if state else {}
+
+
+class _JournalStream(io.TextIOBase):
+    def __init__(self, journal):
+        self.journal = journal
+        self.output = io.StringIO()
+        self._buffer = ''
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self.output.write(text)
+        self._buffer += text
+        while '\n' in self._buffer:
+            line, self._buffer = self._buffer.split('\n', 1)
+            self.journal.append(line)
+        return len(text)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='DCA策略状态日志与快照')
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name, help_text in (('restore', '输出可填入restore_state的快照行'), ('show', '查看最新状态')):
+        cmd = sub.add_parser(name, help=help_text)
+        cmd.add_argument('log_files', nargs='*', help='策略运行日志')
+        cmd.add_argument('--store', help=f"StateJournal目录(如 {os.path.join(DEFAULT_ROOT, 'dca_state', 'US.SPY')})")
+    args = parser.parse_args()
+
+    if args.store:
+        seq, state = StateJournal(args.store, compact_every=0).load()
+    else:
+        lines = []
+        for log_file in args.log_files:
+            with open(log_file, 'r', encoding='utf-8') as f:
+                lines.extend(f)
+        seq, state = latest_state(lines)
+    if state is None:
+        raise SystemExit('❌ 没有找到DCASNAP快照')
+    if args.command == 'restore':
+        print(snapshot_line(seq, state))
+    else:
+        print(f"📸 序号 {seq} | 标的 {state.get('symbol')}")
+        for key, value in state.items():
+            print(f"   {key:<24}{value}")
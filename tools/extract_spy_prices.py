@@ -8,36 +8,26 @@ import csv
 import json
 from datetime import datetime
 
+from fills_importer import iter_fills
+
 def extract_spy_prices(csv_file):
-    """从订单历史CSV提取SPY价格数据"""
+    """从订单历史CSV提取SPY价格数据(流式读取，只保留SPY成交)"""
     spy_data = []
     
-    with open(csv_file, 'r', encoding='utf-8-sig') as file:
-        # 跳过BOM标记
-        content = file.read()
-        if content.startswith('\ufeff'):
-            content = content[1:]
-        
-        # 重新分析CSV
-        lines = content.strip().split('\n')
-        reader = csv.DictReader(lines)
+    for fill in iter_fills(csv_file):
+        if fill['symbol'] != 'US.SPY':
+            continue
+        # 转换日期格式
+        date_obj = datetime.strptime(fill['trade_time'].split(' ')[0], '%Y/%m/%d')
+        formatted_date = date_obj.strftime('%Y-%m-%d')
         
-        for row in reader:
-            # 提取关键信息
-            trade_date = row['成交时间'].split(' ')[0]  # 提取日期部分
-            price = float(row['成交价格'])
-            
-            # 转换日期格式
-            date_obj = datetime.strptime(trade_date, '%Y/%m/%d')
-            formatted_date = date_obj.strftime('%Y-%m-%d')
-            
-            spy_data.append({
-                'date': formatted_date,
-                'price': price,
-                'trade_time': row['成交时间'],
-                'quantity': int(row['成交数量']),
-                'amount': float(row['成交金额'])
-            })
+        spy_data.append({
+            'date': formatted_date,
+            'price': fill['price'],
+            'trade_time': fill['trade_time'],
+            'quantity': int(fill['qty']),
+            'amount': fill['amount']
+        })
     
     return spy_data
 
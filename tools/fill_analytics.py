@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+订单成交分析与成交模型校准
+解析 order_analyzer.moo 输出的 OFILL 日志行，统计：
+    - 受理/首次成交/完结延迟直方图
+    - 相对下单时现价的滑点(基点，正数=不利)
+    - 按订单类型、按时段(默认30分钟)的全部成交率、部分成交率和部分成交比例
+并据此校准 FillModel。离线回测(quant_runtime.SimBroker(fill_model=...))用它决定市价单的
+成交数量和价格；strategy_overrides() 给出网格策略 partial_fill_ratio / live_partial_fill_ratio
+的校准值，替代 _confirm_order 中写死的80%/50%部分成交假设。
+
+模型文件(默认在价格库根目录):
+    fill_model.json   {"orders": N, "bucket_minutes": 30,
+                       "types": {"MARKET": {"fill_rate", "partial_rate", "partial_ratio", "slippage_bps", ...}},
+                       "by_time": {"LIMIT": {"09:30": {"orders", "fill_rate"}}}}
+
+用法:
+    records = parse_log(open('analyzer.log', encoding='utf-8'))
+    print(format_report(analyze(records)))
+    model = calibrate(records); model.save(path)
+    broker = SimBroker(fill_model=FillModel.load(path))
+    strategy = load_strategy(grid_path, broker, overrides=model.strategy_overrides())
+
+    python tools/fill_analytics.py report analyzer.log
+    python tools/fill_analytics.py calibrate analyzer.log --out data/fill_model.json
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import json
+import os
+
+from price_store import DEFAULT_ROOT
+
+LINE_TAG = 'OFILL|v1|'
+FILL_MODEL_FILE = 'fill_model.json'
+ORDER_TYPES = {'M': 'MARKET', 'L': 'LIMIT'}
+LATENCY_BOUNDS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+MIN_BUCKET_ORDERS = 5           # 时段样本少于此数时使用该订单类型的整体成交率
+DEFAULT_TYPE_PARAMS = {'fill_rate': 1.0, 'partial_rate': 0.0, 'partial_ratio': 0.8, 'slippage_bps': 0.0}
+
+
+# ========== 日志解析 ==========
+
+def _int_or_none(text):
+    return int(text) if text else None
+
+
+def _float_or_none(text):
+    return float(text) if text else None
+
+
+def parse_log(lines):
+    """
+    解析日志行(平台日志行首可能带时间前缀，只从 OFILL 标记处开始解析)，按订单ID去重。
+
+    Returns:
+        list: [{time, order_id, symbol, side(1买/-1卖), type, qty, limit, ref_price,
+                ack_ms, fill_ms, done_ms, filled_qty, avg_price, status}]
+    """
+    records = {}
+    for line in lines:
+        start = line.find(LINE_TAG)
+        if start < 0:
+            continue
+        fields = line[start + len(LINE_TAG):].rstrip('\r\n').split('|')
+        if len(fields) != 14:
+            continue
+        stamp, order_id, symbol, side, kind, qty, limit, ref, ack, fill, done, filled, avg, status = fields
+        records[order_id] = {
+            'time': stamp, 'order_id': order_id, 'symbol': symbol,
+            'side': 1 if side == 'B' else -1, 'type': ORDER_TYPES.get(kind, kind),
+            'qty': float(qty), 'limit': _float_or_none(limit), 'ref_price': float(ref),
+            'ack_ms': _int_or_none(ack), 'fill_ms': _int_or_none(fill), 'done_ms': _int_or_none(done),
+            'filled_qty': _float_or_none(filled) or 0.0, 'avg_price': _float_or_none(avg), 'status': status,
+        }
+    return sorted(records.values(), key=lambda r: (r['time'], r['order_id']))
+
+
+# ========== 统计 ==========
+
+def slippage_bps(record):
+    """成交均价相对下单时现价的滑点(基点)，买入价高/卖出价低为正(不利)"""
+    if not record['avg_price'] or not record['ref_price']:
+        return None
+    return (record['avg_price'] - record['ref_price']) / record['ref_price'] * 10000 * record['side']
+
+
+def time_bucket(stamp, minutes=30):
+    """'YYYY-MM-DD HH:MM:SS' -> 所在时段起点 'HH:MM'"""
+    hour, minute = int(stamp[11:13]), int(stamp[14:16])
+    minute = minute // minutes * minutes
+    return f"{hour + minute // 60:02d}:{minute % 60:02d}"
+
+
+def percentile(values, pct):
+    """最近秩百分位，values需已排序"""
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * pct / 100.0))]
+
+
+def latency_histogram(values, bounds=LATENCY_BOUNDS_MS):
+    """按延迟分桶计数: [(标签, 次数)]，最后一桶为超出最大边界的部分"""
+    counts = [0] * (len(bounds) + 1)
+    for value in values:
+        index = 0
+        while index < len(bounds) and value > bounds[index]:
+            index += 1
+        counts[index] += 1
+    labels = [f"≤{bound}ms" for bound in bounds] + [f">{bounds[-1]}ms"]
+    return list(zip(labels, counts))
+
+
+def _fill_stats(rows):
+    """一组订单的成交率、部分成交比例、滑点和延迟分位"""
+    full = [r for r in rows if r['filled_qty'] >= r['qty']]
+    partial = [r for r in rows if 0 < r['filled_qty'] < r['qty']]
+    slips = sorted(s for s in (slippage_bps(r) for r in rows) if s is not None)
+    acks = sorted(r['ack_ms'] for r in rows if r['ack_ms'] is not None)
+    fills = sorted(r['fill_ms'] for r in rows if r['fill_ms'] is not None)
+    count = len(rows)
+    return {
+        'orders': count,
+        'filled': len(full),
+        'partial': len(partial),
+        'unfilled': count - len(full) - len(partial),
+        'fill_rate': len(full) / count if count else 0.0,
+        'partial_rate': len(partial) / count if count else 0.0,
+        'partial_ratio': (sum(r['filled_qty'] / r['qty'] for r in partial) / len(partial)) if partial else None,
+        'slippage_bps': sum(slips) / len(slips) if slips else None,
+        'slippage_p50': percentile(slips, 50),
+        'slippage_p95': percentile(slips, 95),
+        'ack_ms_p50': percentile(acks, 50),
+        'ack_ms_p95': percentile(acks, 95),
+        'fill_ms_p50': percentile(fills, 50),
+        'fill_ms_p95': percentile(fills, 95),
+    }
+
+
+def analyze(records, bucket_minutes=30):
+    """
+    Returns:
+        dict: {'orders', 'by_type': {类型: _fill_stats},
+               'by_time': {类型: {时段: {'orders', 'fill_rate', 'any_fill_rate'}}},
+               'histograms': {'ack_ms'|'fill_ms'|'done_ms': latency_histogram}}
+    """
+    by_type, by_time = {}, {}
+    for record in records:
+        by_type.setdefault(record['type'], []).append(record)
+        bucket = time_bucket(record['time'], bucket_minutes)
+        by_time.setdefault(record['type'], {}).setdefault(bucket, []).append(record)
+
+    time_stats = {}
+    for order_type, buckets in by_time.items():
+        time_stats[order_type] = {}
+        for bucket, rows in sorted(buckets.items()):
+            stats = _fill_stats(rows)
+            time_stats[order_type][bucket] = {
+                'orders': stats['orders'], 'fill_rate': stats['fill_rate'],
+                'any_fill_rate': stats['fill_rate'] + stats['partial_rate'],
+            }
+    return {
+        'orders': len(records),
+        'bucket_minutes': bucket_minutes,
+        'by_type': {order_type: _fill_stats(rows) for order_type, rows in sorted(by_type.items())},
+        'by_time': time_stats,
+        'histograms': {field: latency_histogram([r[field] for r in records if r[field] is not None])
+                       for field in ('ack_ms', 'fill_ms', 'done_ms')},
+    }
+
+
+def format_report(analysis):
+    def fmt(value, spec):
+        return '-' if value is None else format(value, spec)
+
+    lines = [f"📊 {analysis['orders']} 笔测试单"]
+    for order_type, stats in analysis['by_type'].items():
+        lines.append(f"{order_type}: {stats['orders']}笔 | 全部成交 {stats['fill_rate']:.0%} "
+                     f"部分成交 {stats['partial_rate']:.0%} (平均成交 {fmt(stats['partial_ratio'], '.0%')}) "
+                     f"未成交 {stats['unfilled']}")
+        lines.append(f"   滑点 平均 {fmt(stats['slippage_bps'], '+.2f')}bp p50 {fmt(stats['slippage_p50'], '+.2f')}"
+                     f" p95 {fmt(stats['slippage_p95'], '+.2f')} | 受理 p50 {fmt(stats['ack_ms_p50'], 'd')}ms"
+                     f" p95 {fmt(stats['ack_ms_p95'], 'd')}ms | 成交 p50 {fmt(stats['fill_ms_p50'], 'd')}ms"
+                     f" p95 {fmt(stats['fill_ms_p95'], 'd')}ms")
+        for bucket, row in analysis['by_time'].get(order_type, {}).items():
+            lines.append(f"   {bucket}  {row['orders']:>4}笔  全部成交 {row['fill_rate']:>5.0%}"
+                         f"  有成交 {row['any_fill_rate']:>5.0%}")
+    for field, title in (('ack_ms', '受理延迟'), ('fill_ms', '首次成交延迟'), ('done_ms', '完结延迟')):
+        histogram = analysis['histograms'][field]
+        total = sum(count for _, count in histogram)
+        if not total:
+            continue
+        lines.append(f"{title}分布:")
+        peak = max(count for _, count in histogram)
+        for label, count in histogram:
+            if count:
+                lines.append(f"   {label:>9} {count:>5} {'█' * max(1, round(count / peak * 30))}")
+    return '\n'.join(lines)
+
+
+# ========== 成交模型 ==========
+
+class FillModel:
+    """按订单类型(和时段)抽样成交结果的校准模型"""
+
+    def __init__(self, types=None, by_time=None, bucket_minutes=30, orders=0):
+        self.types = {name: dict(DEFAULT_TYPE_PARAMS, **params) for name, params in (types or {}).items()}
+        self.by_time = by_time or {}
+        self.bucket_minutes = bucket_minutes
+        self.orders = orders
+
+    def params(self, order_type):
+        return self.types.get(order_type, DEFAULT_TYPE_PARAMS)
+
+    def partial_fill_ratio(self, order_type='MARKET'):
+        return self.params(order_type)['partial_ratio']
+
+    def strategy_overrides(self, order_type='MARKET'):
+        """网格策略部分成交比例参数(策略下单使用市价单)"""
+        ratio = round(self.partial_fill_ratio(order_type), 4)
+        return {'partial_fill_ratio': ratio, 'live_partial_fill_ratio': ratio}
+
+    def fill(self, order_type, side, qty, ref_price, rng, when=None):
+        """
+        抽样一笔订单的成交结果。
+
+        Args:
+            side: 'BUY'/'SELL'(或OrderSide成员)
+            when: 下单时间(datetime)，有足够样本的时段使用该时段的全部成交率
+
+        Returns:
+            (成交数量, 成交价格)
+        """
+        params = self.params(order_type)
+        fill_rate = params['fill_rate']
+        if when is not None:
+            bucket = self.by_time.get(order_type, {}).get(time_bucket(when.strftime('%Y-%m-%d %H:%M:%S'),
+                                                                      self.bucket_minutes))
+            if bucket and bucket['orders'] >= MIN_BUCKET_ORDERS:
+                fill_rate = bucket['fill_rate']
+        partial_rate = min(params['partial_rate'], 1.0 - fill_rate)
+
+        draw = rng.random()
+        if draw < fill_rate or (qty <= 1 and draw < fill_rate + partial_rate):
+            filled = qty
+        elif draw < fill_rate + partial_rate:
+            filled = min(qty - 1, max(1, int(qty * params['partial_ratio'])))
+        else:
+            filled = 0
+        sign = 1 if str(side).split('.')[-1] == 'BUY' else -1
+        price = round(ref_price * (1 + sign * params['slippage_bps'] / 10000.0), 4) if ref_price else ref_price
+        return filled, price
+
+    def to_dict(self):
+        return {'orders': self.orders, 'bucket_minutes': self.bucket_minutes,
+                'types': self.types, 'by_time': self.by_time}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('types'), data.get('by_time'), data.get('bucket_minutes', 30), data.get('orders', 0))
+
+    def save(self, path=None):
+        path = path or os.path.join(DEFAULT_ROOT, FILL_MODEL_FILE)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path=None):
+        with open(path or os.path.join(DEFAULT_ROOT, FILL_MODEL_FILE), 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def calibrate(records, bucket_minutes=30):
+    """由测试单记录校准成交模型；某类型没有部分成交样本时保留默认的部分成交比例"""
+    analysis = analyze(records, bucket_minutes)
+    types = {}
+    for order_type, stats in analysis['by_type'].items():
+        params = {'fill_rate': stats['fill_rate'], 'partial_rate': stats['partial_rate'],
+                  'slippage_bps': stats['slippage_bps'] or 0.0,
+                  'fill_ms_p50': stats['fill_ms_p50'], 'orders': stats['orders']}
+        if stats['partial_ratio'] is not None:
+            params['partial_ratio'] = stats['partial_ratio']
+        types[order_type] = params
+    by_time = {order_type: {bucket: {'orders': row['orders'], 'fill_rate': row['fill_rate']}
+                            for bucket, row in buckets.items()}
+               for order_type, buckets in analysis['by_time'].items()}
+    return FillModel(types, by_time, bucket_minutes, len(records))
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='订单成交分析与成交模型校准')
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name, text in (('report', '输出成交分析报告'), ('calibrate', '校准并保存成交模型')):
+        cmd = sub.add_parser(name, help=text)
+        cmd.add_argument('log_files', nargs='+', help='order_analyzer.moo 运行日志')
+        cmd.add_argument('--bucket', type=int, default=30, help='时段分组分钟数')
+    sub.choices['calibrate'].add_argument('--out', default=os.path.join(DEFAULT_ROOT, FILL_MODEL_FILE))
+    args = parser.parse_args()
+
+    parsed = []
+    for log_file in args.log_files:
+        with open(log_file, 'r', encoding='utf-8') as f:
+            parsed.extend(parse_log(f))
+    if args.command == 'report':
+        print(format_report(analyze(parsed, args.bucket)))
+    else:
+        model = calibrate(parsed, args.bucket)
+        print(f"💾 成交模型({model.orders}笔测试单) 已保存: {model.save(args.out)}")
+        for kind, row in model.types.items():
+            print(f"   {kind}: 全部成交 {row['fill_rate']:.0%} 部分成交 {row['partial_rate']:.0%} "
+                  f"比例 {row['partial_ratio']:.0%} 滑点 {row['slippage_bps']:+.2f}bp")
+        print(f"   网格策略参数: {model.strategy_overrides()}")
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Moomoo历史订单导出流式导入工具
+逐行流式解析 orders_his.csv(自动处理BOM)，按块把成交记录分标的追加到本地价格库，
+按订单号+成交时间去重(重复导入同一份或重叠的导出不会产生重复成交)，
+并提供逐笔成交序列和每日VWAP，供回放和滑点分析使用。
+
+存储结构(与price_store共用根目录):
+    <root>/<标的>/fills/
+        meta.json       行数
+        ts.bin          int64   成交时间戳(秒，导出中的本地时间)
+        side.bin        int8    1=买入 -1=卖出
+        price.bin       float64 成交价格
+        qty.bin         float64 成交数量
+        fee.bin         float64 合计费用
+        keys.txt        去重键，每行一个
+
+用法:
+    python tools/fills_importer.py import strategies/orders_his.csv
+    python tools/fills_importer.py vwap US.SPY --start 2024-08-01
+
+    with load_fills('US.SPY') as fills:       # 零拷贝视图
+        prices = fills.price
+    for day in daily_vwap('US.SPY'):
+        print(day['date'], day['vwap'])
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import bisect
+import csv
+import json
+import mmap
+import os
+from array import array
+
+from price_store import DEFAULT_ROOT, to_ts, ts_to_datetime
+
+FILL_COLUMNS = (('ts', 'q'), ('side', 'b'), ('price', 'd'), ('qty', 'd'), ('fee', 'd'))
+CHUNK_ROWS = 10000
+
+# 字段 -> 导出文件中可能出现的列名(中文/英文界面)
+FIELD_ALIASES = {
+    'order_id': ('订单号', '订单ID', '订单编号', 'Order ID', 'Order No.'),
+    'code': ('代码', 'Symbol', 'Code'),
+    'market': ('市场', 'Market'),
+    'side': ('方向', 'Side', 'Direction'),
+    'filled_time': ('成交时间', 'Fill Time', 'Filled Time'),
+    'filled_price': ('成交价格', 'Fill Price', 'Filled Price'),
+    'filled_qty': ('成交数量', 'Fill Qty', 'Filled Qty', 'Filled Quantity'),
+    'amount': ('成交金额', 'Fill Amount', 'Filled Amount'),
+    'fee': ('合计费用', 'Total Fee', 'Total Fees'),
+}
+SELL_WORDS = ('卖', 'sell', 'short')
+
+
+# ========== 流式解析 ==========
+
+def _resolve_columns(header):
+    """把表头映射为 {字段: 列序号}"""
+    header = [name.strip() for name in header]
+    columns = {}
+    for field, aliases in FIELD_ALIASES.items():
+        for alias in aliases:
+            if alias in header:
+                columns[field] = header.index(alias)
+                break
+    missing = [f for f in ('code', 'filled_time', 'filled_price', 'filled_qty') if f not in columns]
+    if missing:
+        raise ValueError(f"导出文件缺少必要列: {missing}")
+    return columns
+
+
+def _number(text):
+    text = (text or '').replace(',', '').replace('$', '').strip()
+    return float(text) if text else 0.0
+
+
+def _fill_ts(stamp, day_cache):
+    """'2024/08/01 09:30:00' -> 时间戳；日期部分缓存，避免逐行strptime"""
+    day, _, clock = stamp.partition(' ')
+    day_ts = day_cache.get(day)
+    if day_ts is None:
+        day_ts = day_cache[day] = to_ts(day)
+    if not clock:
+        return day_ts
+    hour, minute, second = (clock.split(':') + ['0', '0'])[:3]
+    return day_ts + int(hour) * 3600 + int(minute) * 60 + int(second)
+
+
+def iter_fills(path):
+    """
+    逐行读取导出文件，生成成交记录(未成交或已撤销的行被跳过)。
+    utf-8-sig编码自动去掉BOM；文件不整体读入内存。
+    """
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        columns = _resolve_columns(next(reader))
+
+        def get(row, field):
+            index = columns.get(field)
+            return row[index].strip() if index is not None and index < len(row) else ''
+
+        day_cache = {}
+        for row in reader:
+            qty = _number(get(row, 'filled_qty'))
+            filled_time = get(row, 'filled_time')
+            if qty <= 0 or not filled_time:
+                continue
+            code = get(row, 'code')
+            if '.' not in code:
+                code = f"{get(row, 'market') or 'US'}.{code}"
+            # 成交时间可能带时区说明，如 "2024/08/01 09:30:00 (美东)"
+            stamp = ' '.join(filled_time.split()[:2])
+            price = _number(get(row, 'filled_price'))
+            order_id = get(row, 'order_id')
+            side = -1 if any(w in get(row, 'side').lower() for w in SELL_WORDS) else 1
+            # 去重键只取成交内容，不依赖行号：重新排序或拼接的导出文件重复导入时不会产生重复成交
+            key = order_id or f"{code.upper()}|{'S' if side < 0 else 'B'}"
+            yield {
+                'symbol': code.upper(),
+                'order_id': order_id,
+                'key': f"{key}|{stamp}|{price:g}|{qty:g}",
+                'ts': _fill_ts(stamp, day_cache),
+                'side': side,
+                'price': price,
+                'qty': qty,
+                'fee': _number(get(row, 'fee')),
+                'trade_time': filled_time,
+                'amount': _number(get(row, 'amount')) or price * qty,
+            }
+
+
+# ========== 分标的追加存储 ==========
+
+def _fills_folder(root, symbol):
+    return os.path.join(root, symbol, 'fills')
+
+
+def _read_meta(folder):
+    path = os.path.join(folder, 'meta.json')
+    if not os.path.exists(path):
+        return {'rows': 0, 'sorted': True, 'last_ts': None}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class _SymbolWriter:
+    """单个标的的追加写入器：已有去重键只在首次写入该标的时加载一次"""
+
+    def __init__(self, root, symbol):
+        self.folder = _fills_folder(root, symbol)
+        os.makedirs(self.folder, exist_ok=True)
+        self.meta = _read_meta(self.folder)
+        keys_path = os.path.join(self.folder, 'keys.txt')
+        self.keys = set()
+        if os.path.exists(keys_path):
+            with open(keys_path, 'r', encoding='utf-8') as f:
+                self.keys = {line.rstrip('\n') for line in f}
+        self.added = 0
+        self.duplicates = 0
+
+    def append(self, fills):
+        fresh = []
+        for fill in fills:
+            if fill['key'] in self.keys:
+                self.duplicates += 1
+                continue
+            self.keys.add(fill['key'])
+            fresh.append(fill)
+        if not fresh:
+            return
+
+        for name, code in FILL_COLUMNS:
+            with open(os.path.join(self.folder, f"{name}.bin"), 'ab') as f:
+                array(code, (fill[name] for fill in fresh)).tofile(f)
+        with open(os.path.join(self.folder, 'keys.txt'), 'a', encoding='utf-8') as f:
+            f.writelines(fill['key'] + '\n' for fill in fresh)
+
+        last_ts = self.meta['last_ts']
+        for fill in fresh:
+            if last_ts is not None and fill['ts'] < last_ts:
+                self.meta['sorted'] = False
+            last_ts = fill['ts'] if last_ts is None else max(last_ts, fill['ts'])
+        self.meta['last_ts'] = last_ts
+        self.meta['rows'] += len(fresh)
+        self.added += len(fresh)
+
+    def finish(self):
+        if not self.meta['sorted']:
+            _sort_in_place(self.folder, self.meta['rows'])
+            self.meta['sorted'] = True
+        with open(os.path.join(self.folder, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, ensure_ascii=False, indent=2)
+
+
+def _sort_in_place(folder, rows):
+    """导出通常按时间倒序，导入结束后按成交时间重排一次，使读取时可以二分定位"""
+    columns = {}
+    for name, code in FILL_COLUMNS:
+        values = array(code)
+        with open(os.path.join(folder, f"{name}.bin"), 'rb') as f:
+            values.fromfile(f, rows)
+        columns[name] = values
+    with open(os.path.join(folder, 'keys.txt'), 'r', encoding='utf-8') as f:
+        keys = f.read().splitlines()
+
+    order = sorted(range(rows), key=columns['ts'].__getitem__)
+    for name, code in FILL_COLUMNS:
+        tmp_path = os.path.join(folder, f"{name}.bin.tmp")
+        with open(tmp_path, 'wb') as f:
+            array(code, (columns[name][i] for i in order)).tofile(f)
+        os.replace(tmp_path, os.path.join(folder, f"{name}.bin"))
+    tmp_path = os.path.join(folder, 'keys.txt.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.writelines(keys[i] + '\n' for i in order)
+    os.replace(tmp_path, os.path.join(folder, 'keys.txt'))
+
+
+def import_export(path, root=DEFAULT_ROOT, chunk_rows=CHUNK_ROWS):
+    """
+    流式导入导出文件：每累计chunk_rows条成交按标的分组追加一次，
+    解析占用的内存与文件大小无关(只有去重键集合随成交数增长)。
+
+    Returns:
+        dict: {标的: {'added': 新增成交数, 'duplicates': 重复跳过数, 'rows': 总成交数}}
+    """
+    writers = {}
+    chunk = []
+
+    def flush():
+        groups = {}
+        for fill in chunk:
+            groups.setdefault(fill['symbol'], []).append(fill)
+        for symbol, fills in groups.items():
+            if symbol not in writers:
+                writers[symbol] = _SymbolWriter(root, symbol)
+            writers[symbol].append(fills)
+        chunk.clear()
+
+    for fill in iter_fills(path):
+        chunk.append(fill)
+        if len(chunk) >= chunk_rows:
+            flush()
+    flush()
+
+    summary = {}
+    for symbol, writer in sorted(writers.items()):
+        writer.finish()
+        summary[symbol] = {'added': writer.added, 'duplicates': writer.duplicates,
+                           'rows': writer.meta['rows']}
+    return summary
+
+
+# ========== 读取与分析 ==========
+
+class FillSeries:
+    """逐笔成交的零拷贝视图(各列为内存映射上的memoryview)"""
+
+    def __init__(self, symbol, columns, maps, start, stop):
+        self.symbol = symbol
+        self._maps = maps
+        self._views = []
+        for name, view in columns.items():
+            part = view[start:stop]
+            self._views.extend([view, part])
+            setattr(self, name, part)
+
+    def __len__(self):
+        return len(self.ts)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def release(self):
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        for m in self._maps:
+            m.close()
+        self._maps = []
+
+
+def load_fills(symbol, start=None, end=None, root=DEFAULT_ROOT):
+    """映射某标的的成交序列，按[start, end]闭区间返回FillSeries"""
+    folder = _fills_folder(root, symbol)
+    if not os.path.isdir(folder):
+        raise KeyError(f"本地没有 {symbol} 的成交记录")
+    meta = _read_meta(folder)
+
+    maps, columns = [], {}
+    for name, code in FILL_COLUMNS:
+        if meta['rows'] == 0:
+            columns[name] = memoryview(array(code))
+            continue
+        with open(os.path.join(folder, f"{name}.bin"), 'rb') as f:
+            m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        maps.append(m)
+        raw = memoryview(m)
+        columns[name] = raw.cast(code)
+        raw.release()
+
+    ts = columns['ts']
+    lo = 0 if start is None else bisect.bisect_left(ts, to_ts(start))
+    if end is None:
+        hi = len(ts)
+    else:
+        end_ts = to_ts(end) + (86399 if isinstance(end, str) and ' ' not in end.strip() else 0)
+        hi = bisect.bisect_right(ts, end_ts)
+    return FillSeries(symbol, columns, maps, lo, hi)
+
+
+def daily_vwap(symbol, start=None, end=None, root=DEFAULT_ROOT):
+    """
+    按成交日汇总：VWAP、成交量、买卖数量、笔数和费用。
+
+    Returns:
+        list: [{'date', 'vwap', 'qty', 'buy_qty', 'sell_qty', 'buy_vwap', 'sell_vwap', 'fills', 'fees'}]
+    """
+    days = []
+    with load_fills(symbol, start, end, root) as fills:
+        current = None
+        for ts, side, price, qty, fee in zip(fills.ts, fills.side, fills.price, fills.qty, fills.fee):
+            date = ts_to_datetime(ts).strftime('%Y-%m-%d')
+            if current is None or current['date'] != date:
+                current = {'date': date, 'notional': 0.0, 'qty': 0.0, 'buy_qty': 0.0, 'buy_notional': 0.0,
+                           'sell_qty': 0.0, 'sell_notional': 0.0, 'fills': 0, 'fees': 0.0}
+                days.append(current)
+            current['notional'] += price * qty
+            current['qty'] += qty
+            current['fills'] += 1
+            current['fees'] += fee
+            prefix = 'buy' if side > 0 else 'sell'
+            current[prefix + '_qty'] += qty
+            current[prefix + '_notional'] += price * qty
+
+    for day in days:
+        day['vwap'] = day.pop('notional') / day['qty']
+        for prefix in ('buy', 'sell'):
+            notional = day.pop(prefix + '_notional')
+            day[prefix + '_vwap'] = notional / day[prefix + '_qty'] if day[prefix + '_qty'] else None
+    return days
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Moomoo历史订单流式导入')
+    parser.add_argument('--root', default=DEFAULT_ROOT, help='价格库根目录')
+    sub = parser.add_subparsers(dest='command', required=True)
+    cmd_import = sub.add_parser('import', help='导入历史订单导出文件')
+    cmd_import.add_argument('files', nargs='+')
+    cmd_import.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    cmd_vwap = sub.add_parser('vwap', help='输出每日VWAP')
+    cmd_vwap.add_argument('symbol')
+    cmd_vwap.add_argument('--start')
+    cmd_vwap.add_argument('--end')
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        for file_path in args.files:
+            result = import_export(file_path, args.root, args.chunk_rows)
+            print(f"📥 {file_path}: {len(result)} 个标的")
+            for code, info in result.items():
+                print(f"   {code:<12} 新增 {info['added']:>7} 笔 | 重复 {info['duplicates']:>7} 笔 | 共 {info['rows']} 笔")
+    else:
+        for day in daily_vwap(args.symbol, args.start, args.end, args.root):
+            print(f"{day['date']}  VWAP ${day['vwap']:.4f}  数量 {day['qty']:g} "
+                  f"(买 {day['buy_qty']:g} / 卖 {day['sell_qty']:g})  {day['fills']} 笔  费用 ${day['fees']:.2f}")
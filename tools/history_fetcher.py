@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+增量历史行情获取工具
+按 标的/K线类型 记录水位线，只请求本地价格库缺失的时间段(最后一根K线每次重新获取，
+盘中获取的未完成K线会在收盘后被修正)，通过有界线程池并发获取
+多个标的，结果直接写入 price_store，并记录检测到的数据缺口。
+
+获取状态保存在价格库根目录的 fetch_state.json:
+    {"US.SPY/D1": {"fetched_from": 起始时间戳, "watermark": 最后一根K线的开始时间戳(UTC),
+                   "last_bar": 最后一根K线(本地时间), "gaps": [["2024-11-27", "2024-12-02"], ...]}}
+
+用法:
+    python tools/history_fetcher.py US.SPY US.QQQ US.TSLA --days 365 --workers 4
+    python tools/history_fetcher.py US.SPY --bar-type H1 --base-url http://127.0.0.1:8000
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from price_store import DEFAULT_ROOT, ts_to_datetime, write_bars
+
+YAHOO_BASE_URL = 'https://query1.finance.yahoo.com'
+STATE_FILE = 'fetch_state.json'
+
+# K线类型 -> (Yahoo interval, 秒数)
+INTERVALS = {
+    'M1': ('1m', 60), 'M5': ('5m', 300), 'M15': ('15m', 900), 'M30': ('30m', 1800),
+    'H1': ('1h', 3600), 'D1': ('1d', 86400),
+}
+DAY_SECONDS = 86400
+
+
+def yahoo_symbol(symbol):
+    """US.SPY -> SPY"""
+    return symbol.split('.', 1)[1] if '.' in symbol else symbol
+
+
+# ========== 获取与解析 ==========
+
+def fetch_chart(base_url, symbol, bar_type, period1, period2, timeout=10):
+    """请求Yahoo chart接口，返回解析后的K线列表(时间戳换算为交易所本地时间)"""
+    interval = INTERVALS[bar_type][0]
+    url = (f"{base_url}/v8/finance/chart/{yahoo_symbol(symbol)}"
+           f"?period1={int(period1)}&period2={int(period2)}&interval={interval}")
+    request = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        data = json.loads(response.read().decode())
+    return parse_chart(data, bar_type)
+
+
+def parse_chart(data, bar_type):
+    """解析chart响应；'ts'为交易所本地时间，'source_ts'为接口原始的UTC时间戳(用于水位线)"""
+    chart = data['chart']
+    if chart.get('error'):
+        raise ValueError(chart['error'].get('description', chart['error']))
+    result = chart['result'][0]
+    timestamps = result.get('timestamp') or []
+    if not timestamps:
+        return []
+    quote = result['indicators']['quote'][0]
+    offset = result.get('meta', {}).get('gmtoffset', 0)
+
+    bars = []
+    for i, ts in enumerate(timestamps):
+        close = quote['close'][i]
+        if close is None:  # 过滤无效数据
+            continue
+        local_ts = ts + offset
+        if bar_type == 'D1':
+            local_ts -= local_ts % DAY_SECONDS
+        bars.append({
+            'ts': local_ts,
+            'open': quote['open'][i] or close,
+            'high': quote['high'][i] or close,
+            'low': quote['low'][i] or close,
+            'close': close,
+            'volume': quote['volume'][i] or 0,
+            'source_ts': ts,
+        })
+    return bars
+
+
+def detect_gaps(stamps, bar_type, max_missing_days=1):
+    """
+    检测缺口。日线：相邻K线之间缺失的工作日超过max_missing_days(允许单日假期)；
+    日内线：同一天内相邻K线间隔超过一个周期。
+
+    Returns:
+        list: [[前一根K线时间, 后一根K线时间], ...]
+    """
+    step = INTERVALS[bar_type][1]
+    gaps = []
+    for prev, curr in zip(stamps, stamps[1:]):
+        if bar_type == 'D1':
+            missing = sum(1 for ts in range(prev + DAY_SECONDS, curr, DAY_SECONDS)
+                          if ts_to_datetime(ts).weekday() < 5)
+            is_gap = missing > max_missing_days
+        else:
+            is_gap = curr - prev > step and prev // DAY_SECONDS == curr // DAY_SECONDS
+        if is_gap:
+            fmt = '%Y-%m-%d' if bar_type == 'D1' else '%Y-%m-%d %H:%M'
+            gaps.append([ts_to_datetime(prev).strftime(fmt), ts_to_datetime(curr).strftime(fmt)])
+    return gaps
+
+
+# ========== 增量获取 ==========
+
+class HistoryFetcher:
+    """按水位线增量获取多个标的的历史K线"""
+
+    def __init__(self, root=DEFAULT_ROOT, base_url=YAHOO_BASE_URL, max_workers=4, timeout=10,
+                 now=None):
+        self.root = root
+        self.base_url = base_url.rstrip('/')
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.now = now or time.time
+        self.state = self._load_state()
+
+    def _state_path(self):
+        return os.path.join(self.root, STATE_FILE)
+
+    def _load_state(self):
+        if not os.path.exists(self._state_path()):
+            return {}
+        with open(self._state_path(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_state(self):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self._state_path() + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self._state_path())
+
+    def missing_ranges(self, symbol, bar_type, start, end):
+        """对比已获取区间，返回需要请求的 [(period1, period2)]"""
+        entry = self.state.get(f"{symbol}/{bar_type}")
+        if entry is None:
+            return [(start, end)] if start < end else []
+        ranges = []
+        if start < entry['fetched_from']:
+            ranges.append((start, entry['fetched_from']))
+        if end > entry['watermark']:
+            ranges.append((entry['watermark'], end))
+        return ranges
+
+    def update(self, symbols, bar_type='D1', days=365):
+        """
+        获取各标的缺失区间并写入价格库。
+        网络请求在线程池中并发执行；写库和状态更新在调用线程中按标的顺序完成。
+
+        Returns:
+            dict: {标的: {'ranges', 'bars', 'rows', 'gaps', 'error'}}
+        """
+        end = int(self.now())
+        start = end - days * DAY_SECONDS
+        plans = {symbol: self.missing_ranges(symbol, bar_type, start, end) for symbol in symbols}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {symbol: [pool.submit(fetch_chart, self.base_url, symbol, bar_type, p1, p2, self.timeout)
+                                for p1, p2 in ranges]
+                       for symbol, ranges in plans.items()}
+
+            results = {}
+            for symbol, symbol_futures in futures.items():
+                result = {'ranges': plans[symbol], 'bars': 0, 'rows': None, 'gaps': [], 'error': None}
+                results[symbol] = result
+                try:
+                    bars = [bar for future in symbol_futures for bar in future.result()]
+                except (urllib.error.URLError, OSError, ValueError, KeyError) as e:
+                    result['error'] = str(e)
+                    print(f"❌ {symbol} 获取失败: {e}")
+                    continue
+                self._commit(symbol, bar_type, plans[symbol], bars, result)
+
+        self._save_state()
+        return results
+
+    def _commit(self, symbol, bar_type, ranges, bars, result):
+        key = f"{symbol}/{bar_type}"
+        entry = self.state.get(key)
+        if ranges:
+            fetched_from = min(p1 for p1, _ in ranges)
+            watermark = max(p2 for _, p2 in ranges)
+            if bars:
+                # 水位线停在最后一根K线的开始时刻：盘中获取的未完成K线下次会重新获取并覆盖
+                watermark = min(watermark, max(bar['source_ts'] for bar in bars))
+            if entry is not None:
+                fetched_from = min(fetched_from, entry['fetched_from'])
+                watermark = max(watermark, entry['watermark'])
+            entry = dict(entry or {'gaps': [], 'last_bar': None})
+            entry.update(fetched_from=fetched_from, watermark=watermark)
+            self.state[key] = entry
+
+        result['bars'] = len(bars)
+        if not bars:
+            return
+        result['rows'] = write_bars(self.root, symbol, bar_type, bars)
+
+        # 新K线连同已有的最后一根一起检测缺口，覆盖两次获取之间的衔接处
+        stamps = sorted({bar['ts'] for bar in bars})
+        if entry['last_bar'] is not None and entry['last_bar'] < stamps[0]:
+            stamps.insert(0, entry['last_bar'])
+        result['gaps'] = detect_gaps(stamps, bar_type)
+        for gap in result['gaps']:
+            if gap not in entry['gaps']:
+                entry['gaps'].append(gap)
+        entry['gaps'].sort()
+        entry['last_bar'] = max(stamps[-1], entry['last_bar'] or 0)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='增量历史行情获取')
+    parser.add_argument('symbols', nargs='+', help='标的代码，如 US.SPY')
+    parser.add_argument('--bar-type', default='D1', choices=sorted(INTERVALS))
+    parser.add_argument('--days', type=int, default=365, help='首次获取的回溯天数')
+    parser.add_argument('--workers', type=int, default=4, help='并发请求数上限')
+    parser.add_argument('--root', default=DEFAULT_ROOT, help='价格库根目录')
+    parser.add_argument('--base-url', default=YAHOO_BASE_URL, help='行情接口地址(测试时可指向本地)')
+    args = parser.parse_args()
+
+    fetcher = HistoryFetcher(args.root, args.base_url, max_workers=args.workers)
+    summary = fetcher.update(args.symbols, args.bar_type, args.days)
+    for code, info in summary.items():
+        if info['error']:
+            continue
+        status = f"新增 {info['bars']} 根K线，共 {info['rows']} 根" if info['bars'] else "已是最新"
+        print(f"📊 {code} {args.bar_type}: {status}，请求 {len(info['ranges'])} 个区间")
+        for gap_start, gap_end in info['gaps']:
+            print(f"   ⚠️ 缺口: {gap_start} → {gap_end}")
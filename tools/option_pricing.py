@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+期权定价引擎 (Black-Scholes)
+整条期权链批量计算理论价格、Delta、Gamma、Theta、Vega和隐含波动率，
+供滚轮策略的离线回测与分析使用。滚轮策略.quant内嵌了同一算法的精简版本。
+
+批量接口以等长列表为输入(纯标准库实现，无需numpy)：
+    greeks = chain_greeks(spot=100.0, strikes=[90, 95, 100], dtes=[35, 35, 35],
+                          vols=[0.25, 0.22, 0.20], is_call=False)
+    ivs = implied_vol_chain(prices=[0.45, 1.20, 3.10], spot=100.0,
+                            strikes=[90, 95, 100], dtes=[35, 35, 35], is_call=False)
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import math
+
+DAYS_PER_YEAR = 365.0
+MIN_VOL = 1e-4
+MAX_VOL = 5.0
+PRICE_TOLERANCE = 1e-6
+NEWTON_ITERATIONS = 20
+BISECTION_ITERATIONS = 100
+
+_SQRT_2PI = math.sqrt(2.0 * math.pi)
+
+
+# ========== 基础函数 ==========
+
+def norm_cdf(x):
+    """标准正态分布累积函数"""
+    return 0.5 * (1.0 + math.erf(x / math.sqrt(2.0)))
+
+
+def norm_pdf(x):
+    """标准正态分布密度函数"""
+    return math.exp(-0.5 * x * x) / _SQRT_2PI
+
+
+def _d1_d2(spot, strike, t, rate, vol):
+    vol_sqrt_t = vol * math.sqrt(t)
+    d1 = (math.log(spot / strike) + (rate + 0.5 * vol * vol) * t) / vol_sqrt_t
+    return d1, d1 - vol_sqrt_t
+
+
+def bs_price(spot, strike, t, rate, vol, is_call):
+    """单个合约的Black-Scholes理论价格(t以年为单位)"""
+    if t <= 0 or vol <= 0:
+        intrinsic = spot - strike if is_call else strike - spot
+        return max(intrinsic, 0.0)
+    d1, d2 = _d1_d2(spot, strike, t, rate, vol)
+    discount = math.exp(-rate * t)
+    if is_call:
+        return spot * norm_cdf(d1) - strike * discount * norm_cdf(d2)
+    return strike * discount * norm_cdf(-d2) - spot * norm_cdf(-d1)
+
+
+def bs_greeks(spot, strike, t, rate, vol, is_call):
+    """
+    单个合约的价格与Greeks。
+
+    Returns:
+        dict: price, delta, gamma, theta(每日), vega(每1%波动率)
+    """
+    if t <= 0 or vol <= 0:
+        price = bs_price(spot, strike, t, rate, vol, is_call)
+        itm = (spot > strike) if is_call else (spot < strike)
+        delta = (1.0 if is_call else -1.0) if itm else 0.0
+        return {'price': price, 'delta': delta, 'gamma': 0.0, 'theta': 0.0, 'vega': 0.0}
+
+    sqrt_t = math.sqrt(t)
+    d1, d2 = _d1_d2(spot, strike, t, rate, vol)
+    pdf_d1 = norm_pdf(d1)
+    discount = math.exp(-rate * t)
+
+    if is_call:
+        price = spot * norm_cdf(d1) - strike * discount * norm_cdf(d2)
+        delta = norm_cdf(d1)
+        theta = -spot * pdf_d1 * vol / (2 * sqrt_t) - rate * strike * discount * norm_cdf(d2)
+    else:
+        price = strike * discount * norm_cdf(-d2) - spot * norm_cdf(-d1)
+        delta = norm_cdf(d1) - 1.0
+        theta = -spot * pdf_d1 * vol / (2 * sqrt_t) + rate * strike * discount * norm_cdf(-d2)
+
+    return {
+        'price': price,
+        'delta': delta,
+        'gamma': pdf_d1 / (spot * vol * sqrt_t),
+        'theta': theta / DAYS_PER_YEAR,
+        'vega': spot * pdf_d1 * sqrt_t / 100.0,
+    }
+
+
+def _broadcast(value, size):
+    """标量扩展为列表，列表原样返回"""
+    if isinstance(value, (list, tuple)):
+        if len(value) != size:
+            raise ValueError("批量参数长度不一致: {0} != {1}".format(len(value), size))
+        return list(value)
+    return [value] * size
+
+
+# ========== 整链批量计算 ==========
+
+def chain_greeks(spot, strikes, dtes, vols, is_call, rate=0.0):
+    """
+    整条期权链批量计算价格和Greeks。
+
+    Args:
+        spot: 标的现价
+        strikes: 行权价列表
+        dtes: 到期天数(标量或列表)
+        vols: 波动率(标量或列表，None的合约结果为None)
+        is_call: 是否CALL(标量或列表)
+        rate: 无风险利率
+
+    Returns:
+        list: 每个合约一个Greeks字典(无法计算时为None)
+    """
+    size = len(strikes)
+    dtes = _broadcast(dtes, size)
+    vols = _broadcast(vols, size)
+    calls = _broadcast(is_call, size)
+
+    results = []
+    for strike, dte, vol, call in zip(strikes, dtes, vols, calls):
+        if vol is None or strike is None or dte is None:
+            results.append(None)
+            continue
+        results.append(bs_greeks(spot, strike, dte / DAYS_PER_YEAR, rate, vol, call))
+    return results
+
+
+def _price_bounds(spot, strike, t, rate, is_call):
+    """无套利价格区间 (下限, 上限)"""
+    discount = math.exp(-rate * t)
+    if is_call:
+        return max(spot - strike * discount, 0.0), spot
+    return max(strike * discount - spot, 0.0), strike * discount
+
+
+def _bisect_vol(price, spot, strike, t, rate, is_call):
+    """二分法求隐含波动率(Newton失败时的兜底)"""
+    low, high = MIN_VOL, MAX_VOL
+    if bs_price(spot, strike, t, rate, high, is_call) < price:
+        return None
+    for _ in range(BISECTION_ITERATIONS):
+        mid = 0.5 * (low + high)
+        diff = bs_price(spot, strike, t, rate, mid, is_call) - price
+        if abs(diff) < PRICE_TOLERANCE:
+            return mid
+        if diff > 0:
+            high = mid
+        else:
+            low = mid
+    return 0.5 * (low + high)
+
+
+def implied_vol_chain(prices, spot, strikes, dtes, is_call, rate=0.0):
+    """
+    整条期权链批量求解隐含波动率。
+
+    所有合约同步进行Newton迭代，每轮只处理尚未收敛的合约；
+    Newton发散(越界或Vega过小)的合约转入二分法兜底。
+    价格超出无套利区间的合约返回None。
+
+    Returns:
+        list: 隐含波动率列表，与输入顺序一致
+    """
+    size = len(strikes)
+    prices = _broadcast(prices, size)
+    dtes = _broadcast(dtes, size)
+    calls = _broadcast(is_call, size)
+    years = [dte / DAYS_PER_YEAR if dte is not None else None for dte in dtes]
+
+    vols = [None] * size
+    active = []
+    for i in range(size):
+        price, strike, t = prices[i], strikes[i], years[i]
+        if price is None or strike is None or t is None or t <= 0 or price <= 0:
+            continue
+        lower, upper = _price_bounds(spot, strike, t, rate, calls[i])
+        if price <= lower or price >= upper:
+            continue
+        # Brenner-Subrahmanyam近似作为初值
+        vols[i] = min(max(math.sqrt(2 * math.pi / t) * price / spot, 0.05), 2.0)
+        active.append(i)
+
+    fallback = []
+    for _ in range(NEWTON_ITERATIONS):
+        if not active:
+            break
+        still_active = []
+        for i in active:
+            greeks = bs_greeks(spot, strikes[i], years[i], rate, vols[i], calls[i])
+            diff = greeks['price'] - prices[i]
+            if abs(diff) < PRICE_TOLERANCE:
+                continue
+            vega = greeks['vega'] * 100.0
+            if vega < 1e-8:
+                fallback.append(i)
+                continue
+            new_vol = vols[i] - diff / vega
+            if not (MIN_VOL < new_vol < MAX_VOL):
+                fallback.append(i)
+                continue
+            vols[i] = new_vol
+            still_active.append(i)
+        active = still_active
+
+    for i in fallback + active:
+        vols[i] = _bisect_vol(prices[i], spot, strikes[i], years[i], rate, calls[i])
+
+    return vols
+
+
+def select_by_delta(deltas, target_delta):
+    """返回Delta最接近目标的下标(无有效Delta时返回None)"""
+    best_index, best_gap = None, None
+    for i, delta in enumerate(deltas):
+        if delta is None:
+            continue
+        gap = abs(delta - target_delta)
+        if best_gap is None or gap < best_gap:
+            best_index, best_gap = i, gap
+    return best_index
+
+
+if __name__ == '__main__':
+    strikes = [85.0, 90.0, 95.0, 100.0, 105.0]
+    greeks = chain_greeks(100.0, strikes, 35, 0.25, is_call=False, rate=0.04)
+    prices = [g['price'] for g in greeks]
+    ivs = implied_vol_chain(prices, 100.0, strikes, 35, is_call=False, rate=0.04)
+    print("📊 PUT期权链 (现价$100, 35天, IV 25%)")
+    for strike, g, iv in zip(strikes, greeks, ivs):
+        print(f"   K={strike:>6.1f} 价格${g['price']:.3f} Delta {g['delta']:+.3f} "
+              f"Gamma {g['gamma']:.4f} Theta {g['theta']:+.4f} Vega {g['vega']:.4f} IV {iv:.4f}")
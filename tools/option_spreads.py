@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+多腿期权组合评估器
+按 docs/Automatable_Options_Strategies_Design.md 中的策略，在整条期权链上枚举
+满足宽度和Delta约束的全部组合，批量计算净权利金、最大亏损、盈亏平衡点、
+盈利概率(POP)和风险回报率，并把最优组合交给多腿下单构建器。
+
+支持的组合:
+    bull_put     牛市看跌期权价差 (Bull Put Spread)
+    bear_call    熊市看涨期权价差 (Bear Call Spread)
+    iron_condor  铁鹰组合 (Iron Condor)
+    jade_lizard  玉蜥蜴 (Jade Lizard)
+    pmcc         穷人的备兑看涨期权 (Poor Man's Covered Call)
+
+用法:
+    chain = load_chain(rows)          # rows: [{symbol, strike, dte, is_call, bid, ask, delta, iv}]
+    combos = bull_put_spreads(chain, spot=100.0, short_delta=(0.25, 0.35), width=(2, 5))
+    best = best_combo(combos)
+    orders = build_leg_orders(best, qty=1)
+
+价格均为每股报价(未乘100)。卖出腿按bid、买入腿按ask计价(保守成交价)。
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import bisect
+import math
+
+from option_pricing import DAYS_PER_YEAR, bs_price, norm_cdf
+
+# ========== 期权链整理 ==========
+
+CHAIN_COLUMNS = ('symbol', 'strike', 'dte', 'is_call', 'bid', 'ask', 'delta', 'iv')
+
+
+def load_chain(rows):
+    """
+    把期权链记录整理为按(类型, 到期天数)分组、按行权价升序排列的列存结构。
+
+    Returns:
+        dict: {(is_call, dte): {列名: [值, ...]}}
+    """
+    groups = {}
+    for row in rows:
+        if row.get('bid') is None or row.get('ask') is None or row.get('delta') is None:
+            continue
+        key = (bool(row['is_call']), int(row['dte']))
+        groups.setdefault(key, []).append(row)
+
+    chain = {}
+    for key, group_rows in groups.items():
+        group_rows.sort(key=lambda r: r['strike'])
+        chain[key] = {col: [r.get(col) for r in group_rows] for col in CHAIN_COLUMNS}
+    return chain
+
+
+def _expiries(chain, is_call, dte_range):
+    low, high = dte_range
+    return sorted(dte for call, dte in chain if call == is_call and low <= dte <= high)
+
+
+def _delta_mask(deltas, delta_range):
+    low, high = delta_range
+    return [d is not None and low <= abs(d) <= high for d in deltas]
+
+
+# ========== 概率计算 ==========
+
+def probability_above(spot, level, dte, vol, rate=0.0):
+    """到期时标的价格高于level的风险中性概率(对数正态)"""
+    if level <= 0:
+        return 1.0
+    t = dte / DAYS_PER_YEAR
+    if t <= 0 or not vol:
+        return 1.0 if spot > level else 0.0
+    d2 = (math.log(spot / level) + (rate - 0.5 * vol * vol) * t) / (vol * math.sqrt(t))
+    return norm_cdf(d2)
+
+
+def _combo(strategy, legs, dte, credit, max_loss, breakevens, pop):
+    return {
+        'strategy': strategy,
+        'dte': dte,
+        'legs': legs,
+        'credit': credit,
+        'max_loss': max_loss,
+        'breakevens': breakevens,
+        'pop': pop,
+        'return_on_risk': credit / max_loss if max_loss > 0 else float('inf'),
+    }
+
+
+def _leg(side, group, i):
+    return {'side': side, 'symbol': group['symbol'][i], 'strike': group['strike'][i],
+            'is_call': group['is_call'][i], 'iv': group['iv'][i],
+            'price': group['bid'][i] if side == 'SELL' else group['ask'][i]}
+
+
+# ========== 垂直价差 ==========
+
+def _vertical_pairs(group, short_delta, width, is_call):
+    """
+    在单个到期日内枚举垂直价差的(卖腿, 买腿)下标。
+    行权价已排序，用二分查找定位宽度区间内的买腿，只遍历有效组合。
+    """
+    strikes = group['strike']
+    eligible = _delta_mask(group['delta'], short_delta)
+    min_width, max_width = width
+    pairs = []
+    for s, ok in enumerate(eligible):
+        if not ok:
+            continue
+        if is_call:
+            lo = bisect.bisect_left(strikes, strikes[s] + min_width)
+            hi = bisect.bisect_right(strikes, strikes[s] + max_width)
+        else:
+            lo = bisect.bisect_left(strikes, strikes[s] - max_width)
+            hi = bisect.bisect_right(strikes, strikes[s] - min_width)
+        for l in range(lo, hi):
+            if l != s:
+                pairs.append((s, l))
+    return pairs
+
+
+def _vertical_spreads(chain, spot, is_call, short_delta, width, dte_range, rate):
+    strategy = 'bear_call' if is_call else 'bull_put'
+    results = []
+    for dte in _expiries(chain, is_call, dte_range):
+        group = chain[(is_call, dte)]
+        pairs = _vertical_pairs(group, short_delta, width, is_call)
+        if not pairs:
+            continue
+        strikes, bids, asks, ivs = group['strike'], group['bid'], group['ask'], group['iv']
+
+        # 按列批量计算所有组合的指标
+        credits = [bids[s] - asks[l] for s, l in pairs]
+        widths = [abs(strikes[l] - strikes[s]) for s, l in pairs]
+        max_losses = [w - c for w, c in zip(widths, credits)]
+        if is_call:
+            breakevens = [strikes[s] + c for (s, _), c in zip(pairs, credits)]
+            pops = [1.0 - probability_above(spot, be, dte, ivs[s], rate)
+                    for (s, _), be in zip(pairs, breakevens)]
+        else:
+            breakevens = [strikes[s] - c for (s, _), c in zip(pairs, credits)]
+            pops = [probability_above(spot, be, dte, ivs[s], rate)
+                    for (s, _), be in zip(pairs, breakevens)]
+
+        for (s, l), credit, max_loss, be, pop in zip(pairs, credits, max_losses, breakevens, pops):
+            if credit <= 0 or max_loss <= 0:
+                continue
+            legs = [_leg('SELL', group, s), _leg('BUY', group, l)]
+            results.append(_combo(strategy, legs, dte, credit, max_loss, [be], pop))
+    return results
+
+
+def bull_put_spreads(chain, spot, short_delta=(0.25, 0.35), width=(1.0, 5.0),
+                     dte_range=(30, 45), rate=0.0):
+    """牛市看跌期权价差：卖虚值Put，买更低行权价的Put"""
+    return _vertical_spreads(chain, spot, False, short_delta, width, dte_range, rate)
+
+
+def bear_call_spreads(chain, spot, short_delta=(0.15, 0.25), width=(1.0, 5.0),
+                      dte_range=(30, 45), rate=0.0):
+    """熊市看涨期权价差：卖虚值Call，买更高行权价的Call"""
+    return _vertical_spreads(chain, spot, True, short_delta, width, dte_range, rate)
+
+
+def _top(combos, top_k, key='return_on_risk'):
+    return sorted(combos, key=lambda c: c[key], reverse=True)[:top_k]
+
+
+# ========== 铁鹰 ==========
+
+def iron_condors(chain, spot, short_delta=(0.10, 0.20), width=(1.0, 10.0),
+                 dte_range=(30, 45), rate=0.0, top_k=25):
+    """
+    铁鹰组合 = 同一到期日的牛市看跌价差 + 熊市看涨价差。
+    每侧先按风险回报率保留top_k个价差再两两组合，避免四条腿全量枚举。
+    """
+    puts = bull_put_spreads(chain, spot, short_delta, width, dte_range, rate)
+    calls = bear_call_spreads(chain, spot, short_delta, width, dte_range, rate)
+
+    results = []
+    for dte in sorted(set(c['dte'] for c in puts) & set(c['dte'] for c in calls)):
+        put_side = _top([c for c in puts if c['dte'] == dte], top_k)
+        call_side = _top([c for c in calls if c['dte'] == dte], top_k)
+        for p in put_side:
+            put_width = p['legs'][0]['strike'] - p['legs'][1]['strike']
+            for c in call_side:
+                if c['legs'][0]['strike'] <= p['legs'][0]['strike']:
+                    continue
+                call_width = c['legs'][1]['strike'] - c['legs'][0]['strike']
+                credit = p['credit'] + c['credit']
+                # 到期时最多只有一侧亏损
+                max_loss = max(put_width, call_width) - credit
+                if max_loss <= 0:
+                    continue
+                low_be = p['legs'][0]['strike'] - credit
+                high_be = c['legs'][0]['strike'] + credit
+                pop = (probability_above(spot, low_be, dte, p['legs'][0]['iv'], rate) -
+                       probability_above(spot, high_be, dte, c['legs'][0]['iv'], rate))
+                legs = p['legs'] + c['legs']
+                results.append(_combo('iron_condor', legs, dte, credit, max_loss,
+                                      [low_be, high_be], max(pop, 0.0)))
+    return results
+
+
+# ========== 玉蜥蜴 ==========
+
+def jade_lizards(chain, spot, put_delta=(0.25, 0.35), call_delta=(0.25, 0.35),
+                 call_width=(1.0, 5.0), dte_range=(30, 45), rate=0.0, top_k=25):
+    """
+    玉蜥蜴 = 卖虚值Put + 熊市看涨价差，要求总权利金不低于看涨价差宽度(上方无风险)。
+    最大亏损按下方Put被行权、标的跌至0计算。
+    """
+    calls = bear_call_spreads(chain, spot, call_delta, call_width, dte_range, rate)
+    results = []
+    for dte in _expiries(chain, False, dte_range):
+        group = chain[(False, dte)]
+        call_side = [c for c in calls if c['dte'] == dte]
+        if not call_side:
+            continue
+        call_side = sorted(call_side, key=lambda c: c['credit'], reverse=True)[:top_k]
+        eligible = _delta_mask(group['delta'], put_delta)
+        for p, ok in enumerate(eligible):
+            if not ok or group['strike'][p] >= spot:
+                continue
+            put_credit = group['bid'][p]
+            for c in call_side:
+                width = c['legs'][1]['strike'] - c['legs'][0]['strike']
+                credit = put_credit + c['credit']
+                if credit < width:
+                    continue
+                breakeven = group['strike'][p] - credit
+                max_loss = breakeven
+                pop = probability_above(spot, breakeven, dte, group['iv'][p], rate)
+                legs = [_leg('SELL', group, p)] + c['legs']
+                results.append(_combo('jade_lizard', legs, dte, credit, max_loss, [breakeven], pop))
+    return results
+
+
+# ========== PMCC ==========
+
+def pmcc_combos(chain, spot, leaps_min_dte=365, leaps_min_delta=0.80,
+                short_delta=(0.20, 0.30), short_dte_range=(30, 45), rate=0.0):
+    """
+    穷人的备兑看涨期权 = 买深度实值LEAPS Call + 卖短期虚值Call。
+    要求卖腿行权价 > 买腿行权价 + 净支出，确保短腿被行权时不亏损。
+    credit为负(净支出)，max_loss为净支出；盈利按短腿到期、标的收于短腿行权价时
+    LEAPS的Black-Scholes价值估算。
+    """
+    leaps_keys = [(True, dte) for call, dte in chain if call and dte >= leaps_min_dte]
+    short_expiries = _expiries(chain, True, short_dte_range)
+
+    results = []
+    for leaps_key in sorted(leaps_keys):
+        leaps = chain[leaps_key]
+        long_idx = [i for i, d in enumerate(leaps['delta']) if d is not None and d >= leaps_min_delta]
+        for short_dte in short_expiries:
+            short = chain[(True, short_dte)]
+            short_idx = [i for i, ok in enumerate(_delta_mask(short['delta'], short_delta)) if ok]
+            remaining = (leaps_key[1] - short_dte) / DAYS_PER_YEAR
+            for l in long_idx:
+                for s in short_idx:
+                    debit = leaps['ask'][l] - short['bid'][s]
+                    if debit <= 0 or short['strike'][s] <= leaps['strike'][l] + debit:
+                        continue
+                    vol = leaps['iv'][l]
+                    value_at_short = bs_price(short['strike'][s], leaps['strike'][l],
+                                              remaining, rate, vol, True)
+                    max_profit = value_at_short - debit
+                    if max_profit <= 0:
+                        continue
+                    breakeven = _pmcc_breakeven(leaps['strike'][l], remaining, rate, vol, debit)
+                    pop = probability_above(spot, breakeven, short_dte, short['iv'][s], rate)
+                    legs = [_leg('BUY', leaps, l), _leg('SELL', short, s)]
+                    combo = _combo('pmcc', legs, short_dte, -debit, debit, [breakeven], pop)
+                    combo['max_profit'] = max_profit
+                    combo['return_on_risk'] = max_profit / debit
+                    results.append(combo)
+    return results
+
+
+def _pmcc_breakeven(strike, remaining, rate, vol, debit):
+    """二分求解LEAPS价值等于净支出时的标的价格"""
+    low, high = 0.0, strike + debit * 10 + 1.0
+    for _ in range(100):
+        mid = 0.5 * (low + high)
+        if bs_price(mid, strike, remaining, rate, vol, True) < debit:
+            low = mid
+        else:
+            high = mid
+    return 0.5 * (low + high)
+
+
+# ========== 选择与下单 ==========
+
+STRATEGIES = {
+    'bull_put': bull_put_spreads,
+    'bear_call': bear_call_spreads,
+    'iron_condor': iron_condors,
+    'jade_lizard': jade_lizards,
+    'pmcc': pmcc_combos,
+}
+
+
+def best_combo(combos, key='return_on_risk', min_pop=0.0):
+    """按指定指标选出最优组合(可设最低盈利概率)"""
+    candidates = [c for c in combos if c['pop'] >= min_pop]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda c: c[key])
+
+
+def build_leg_orders(combo, qty=1):
+    """
+    多腿下单构建器：买入腿在前(先建立保护)，卖出腿在后。
+
+    Returns:
+        list: [{'symbol', 'side', 'qty', 'price'}]，可逐条交给place_limit
+    """
+    if combo is None:
+        return []
+    legs = sorted(combo['legs'], key=lambda leg: 0 if leg['side'] == 'BUY' else 1)
+    return [{'symbol': leg['symbol'], 'side': leg['side'], 'qty': qty, 'price': leg['price']}
+            for leg in legs]
+
+
+def evaluate(chain, strategy, spot, qty=1, key='return_on_risk', min_pop=0.0, **params):
+    """枚举指定策略的全部组合，返回(最优组合, 下单列表, 组合总数)"""
+    combos = STRATEGIES[strategy](chain, spot, **params)
+    best = best_combo(combos, key, min_pop)
+    return best, build_leg_orders(best, qty), len(combos)
+
+
+def _format_combo(combo):
+    legs = " / ".join(f"{leg['side']} {'C' if leg['is_call'] else 'P'}{leg['strike']:g}@{leg['price']:.2f}"
+                      for leg in combo['legs'])
+    return (f"{combo['strategy']:<12} DTE {combo['dte']:>3} | {legs} | 净权利金 {combo['credit']:+.2f} "
+            f"| 最大亏损 {combo['max_loss']:.2f} | POP {combo['pop']:.1%} | 回报率 {combo['return_on_risk']:.2f}")
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='多腿期权组合评估')
+    parser.add_argument('chain_file', help='期权链JSON文件(记录列表)')
+    parser.add_argument('--spot', type=float, required=True, help='标的现价')
+    parser.add_argument('--strategy', choices=sorted(STRATEGIES), default='bull_put')
+    parser.add_argument('--min-pop', type=float, default=0.0, help='最低盈利概率')
+    args = parser.parse_args()
+
+    with open(args.chain_file, 'r', encoding='utf-8') as f:
+        option_chain = load_chain(json.load(f))
+
+    best, orders, total = evaluate(option_chain, args.strategy, args.spot, min_pop=args.min_pop)
+    print(f"📊 {args.strategy}: 共评估{total}个组合")
+    if best:
+        print(f"🏆 {_format_combo(best)}")
+        for order in orders:
+            print(f"   {order['side']:<4} {order['qty']} × {order['symbol']} @ ${order['price']:.2f}")
+    else:
+        print("❌ 没有满足条件的组合")
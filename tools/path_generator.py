@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+合成价格路径生成器
+一次生成 路径数×天数 的价格矩阵，用于压力测试DCA/网格等策略。
+只有一年SPY和三个月TSLA的历史数据时，单条历史路径说明不了策略在深度回撤、
+长期阴跌或暴涨暴跌中的表现。
+
+支持的模型:
+    gbm         几何布朗运动
+    bootstrap   历史收益率分块自助抽样(保留波动聚集)
+    regime      两状态马尔可夫区制切换(牛市/熊市各自的漂移和波动)
+    jump        Merton跳跃扩散(GBM + 泊松跳跃)
+
+矩阵按行(路径)连续存放为float64，直接写入 multiprocessing.shared_memory，
+回测引擎按名称附加即可零拷贝读取。每条路径使用由(seed, 路径序号)确定的独立随机流，
+结果与工作进程数无关，可复现。
+
+用法:
+    paths = generate_paths('gbm', n_paths=2000, n_days=252, s0=550.0, seed=7, mu=0.08, sigma=0.2)
+    row = paths.row(0)                  # memoryview('d')，第0条路径
+    other = PathMatrix.attach(paths.name, 2000, 252)   # 其他进程按名称附加
+    paths.close(); paths.unlink()
+
+    python tools/path_generator.py regime --paths 2000 --days 504 --seed 7
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import math
+import random
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+TRADING_DAYS = 252
+SEED_STRIDE = 1000003
+
+MODEL_DEFAULTS = {
+    'gbm': {'mu': 0.07, 'sigma': 0.18},
+    'bootstrap': {'returns': None, 'block': 20},
+    'regime': {'mus': (0.12, -0.25), 'sigmas': (0.14, 0.35), 'switch': (0.01, 0.04)},
+    'jump': {'mu': 0.07, 'sigma': 0.16, 'jump_rate': 2.0, 'jump_mean': -0.06, 'jump_std': 0.08},
+}
+
+
+# ========== 共享内存矩阵 ==========
+
+class PathMatrix:
+    """共享内存中的 路径数×天数 float64 矩阵(行优先)"""
+
+    def __init__(self, shm, n_paths, n_days, owner):
+        self.shm = shm
+        self.name = shm.name
+        self.n_paths = n_paths
+        self.n_days = n_days
+        self.owner = owner
+        self.view = shm.buf[:n_paths * n_days * 8].cast('d')
+
+    @classmethod
+    def create(cls, n_paths, n_days, name=None):
+        shm = shared_memory.SharedMemory(name=name, create=True, size=max(n_paths * n_days * 8, 8))
+        return cls(shm, n_paths, n_days, owner=True)
+
+    @classmethod
+    def attach(cls, name, n_paths, n_days):
+        """按名称附加已有矩阵(附加方只close，不unlink)"""
+        shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, n_paths, n_days, owner=False)
+
+    def row(self, i):
+        start = i * self.n_days
+        return self.view[start:start + self.n_days]
+
+    def column(self, day):
+        """某一天所有路径的价格(复制为array)"""
+        return array('d', self.view[day::self.n_days])
+
+    def close(self):
+        if self.view is not None:
+            self.view.release()
+            self.view = None
+        self.shm.close()
+
+    def unlink(self):
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        self.unlink()
+
+
+# ========== 路径模型 ==========
+
+def _gbm_path(rng, n_days, s0, mu, sigma):
+    dt = 1.0 / TRADING_DAYS
+    drift = (mu - 0.5 * sigma * sigma) * dt
+    vol = sigma * math.sqrt(dt)
+    gauss, exp = rng.gauss, math.exp
+    log_price = math.log(s0)
+    row = array('d', [s0]) * n_days
+    for day in range(1, n_days):
+        log_price += drift + vol * gauss(0.0, 1.0)
+        row[day] = exp(log_price)
+    return row
+
+
+def _bootstrap_path(rng, n_days, s0, returns, block):
+    """分块抽样历史对数收益率：每次随机选一个起点，连续取block天"""
+    if not returns:
+        raise ValueError("bootstrap模型需要历史收益率 returns")
+    n = len(returns)
+    block = max(1, min(block, n))
+    exp = math.exp
+    log_price = math.log(s0)
+    row = array('d', [s0]) * n_days
+    day = 1
+    while day < n_days:
+        start = rng.randrange(n - block + 1)
+        for r in returns[start:start + min(block, n_days - day)]:
+            log_price += r
+            row[day] = exp(log_price)
+            day += 1
+    return row
+
+
+def _regime_path(rng, n_days, s0, mus, sigmas, switch):
+    """状态0/1各自的年化漂移和波动，switch[i]为每日离开状态i的概率"""
+    dt = 1.0 / TRADING_DAYS
+    drifts = [(m - 0.5 * s * s) * dt for m, s in zip(mus, sigmas)]
+    vols = [s * math.sqrt(dt) for s in sigmas]
+    gauss, uniform, exp = rng.gauss, rng.random, math.exp
+    state = 0
+    log_price = math.log(s0)
+    row = array('d', [s0]) * n_days
+    for day in range(1, n_days):
+        if uniform() < switch[state]:
+            state = 1 - state
+        log_price += drifts[state] + vols[state] * gauss(0.0, 1.0)
+        row[day] = exp(log_price)
+    return row
+
+
+def _jump_path(rng, n_days, s0, mu, sigma, jump_rate, jump_mean, jump_std):
+    """Merton跳跃扩散，漂移按跳跃补偿修正使期望收益仍为mu"""
+    dt = 1.0 / TRADING_DAYS
+    compensator = jump_rate * (math.exp(jump_mean + 0.5 * jump_std * jump_std) - 1.0)
+    drift = (mu - compensator - 0.5 * sigma * sigma) * dt
+    vol = sigma * math.sqrt(dt)
+    jump_prob = jump_rate * dt
+    gauss, uniform, exp = rng.gauss, rng.random, math.exp
+    log_price = math.log(s0)
+    row = array('d', [s0]) * n_days
+    for day in range(1, n_days):
+        log_price += drift + vol * gauss(0.0, 1.0)
+        if uniform() < jump_prob:
+            log_price += gauss(jump_mean, jump_std)
+        row[day] = exp(log_price)
+    return row
+
+
+MODELS = {'gbm': _gbm_path, 'bootstrap': _bootstrap_path, 'regime': _regime_path, 'jump': _jump_path}
+
+
+def _fill_rows(name, n_paths, n_days, model, s0, seed, params, start, stop):
+    """工作进程：附加共享矩阵并填充[start, stop)行"""
+    matrix = PathMatrix.attach(name, n_paths, n_days)
+    try:
+        _fill_local(matrix, model, s0, seed, params, start, stop)
+    finally:
+        matrix.close()
+    return stop - start
+
+
+def _fill_local(matrix, model, s0, seed, params, start, stop):
+    path_fn = MODELS[model]
+    for i in range(start, stop):
+        rng = random.Random(seed * SEED_STRIDE + i)
+        matrix.row(i)[:] = path_fn(rng, matrix.n_days, s0, **params)
+
+
+def generate_paths(model, n_paths, n_days, s0=100.0, seed=0, workers=1, name=None, **params):
+    """
+    生成价格路径矩阵(第0天为s0)。
+
+    Args:
+        model: 'gbm' / 'bootstrap' / 'regime' / 'jump'
+        workers: 工作进程数，>1时按行分块并行填充同一块共享内存
+        params: 模型参数，未给出的取 MODEL_DEFAULTS
+
+    Returns:
+        PathMatrix: 调用方负责close()和unlink()
+    """
+    if model not in MODELS:
+        raise ValueError(f"未知模型: {model}，可选 {sorted(MODELS)}")
+    options = dict(MODEL_DEFAULTS[model])
+    options.update(params)
+    if model == 'bootstrap':
+        options['returns'] = list(options['returns'] or [])
+
+    matrix = PathMatrix.create(n_paths, n_days, name)
+    try:
+        if workers <= 1 or n_paths < 2 * workers:
+            _fill_local(matrix, model, s0, seed, options, 0, n_paths)
+        else:
+            chunk = math.ceil(n_paths / workers)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_fill_rows, matrix.name, n_paths, n_days, model, s0, seed, options,
+                                       start, min(start + chunk, n_paths))
+                           for start in range(0, n_paths, chunk)]
+                for future in futures:
+                    future.result()
+    except BaseException:
+        matrix.close()
+        matrix.unlink()
+        raise
+    return matrix
+
+
+def historical_returns(closes):
+    """收盘价序列 -> 日对数收益率(供bootstrap模型使用)"""
+    return [math.log(b / a) for a, b in zip(closes, closes[1:]) if a > 0 and b > 0]
+
+
+def path_summary(matrix):
+    """各路径的期末收益率和最大回撤分布(百分位)"""
+    final_returns, drawdowns = [], []
+    for i in range(matrix.n_paths):
+        row = matrix.row(i)
+        peak, worst = row[0], 0.0
+        for price in row:
+            if price > peak:
+                peak = price
+            elif (peak - price) / peak > worst:
+                worst = (peak - price) / peak
+        final_returns.append(row[-1] / row[0] - 1.0)
+        drawdowns.append(worst)
+
+    def percentiles(values):
+        ordered = sorted(values)
+        return {p: ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] for p in (5, 25, 50, 75, 95)}
+
+    return {'final_return': percentiles(final_returns), 'max_drawdown': percentiles(drawdowns)}
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    from price_store import DEFAULT_ROOT, PriceStore
+
+    parser = argparse.ArgumentParser(description='合成价格路径生成器')
+    parser.add_argument('model', choices=sorted(MODELS))
+    parser.add_argument('--paths', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=TRADING_DAYS)
+    parser.add_argument('--s0', type=float, default=100.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--symbol', default='US.SPY', help='bootstrap模型使用的历史数据标的')
+    parser.add_argument('--root', default=DEFAULT_ROOT, help='价格库根目录')
+    args = parser.parse_args()
+
+    extra = {}
+    if args.model == 'bootstrap':
+        with PriceStore(args.root).load(args.symbol) as bars:
+            extra['returns'] = historical_returns(bars.close)
+
+    began = time.perf_counter()
+    with generate_paths(args.model, args.paths, args.days, args.s0, args.seed, args.workers, **extra) as paths:
+        elapsed = time.perf_counter() - began
+        summary = path_summary(paths)
+    print(f"📈 {args.model}: {args.paths} 条路径 × {args.days} 天，生成耗时 {elapsed:.2f}秒")
+    for label, key in (('期末收益率', 'final_return'), ('最大回撤', 'max_drawdown')):
+        bands = ' | '.join(f"P{p}: {v:+.1%}" for p, v in summary[key].items())
+        print(f"   {label}: {bands}")
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+本地OHLCV列式价格库
+所有工具统一的价格数据后端：每个 标的/K线类型 一个目录，每列一个定长类型数组文件，
+读取时内存映射并按日期区间返回零拷贝视图。
+
+目录结构:
+    <root>/<标的>/<K线类型>/
+        meta.json       行数、首末时间、数据来源、版本号
+        ts.bin          int64  时间戳(秒，按本地时间记，日线为当日00:00)
+        open.bin        float64
+        high.bin        float64
+        low.bin         float64
+        close.bin       float64
+        volume.bin      float64
+
+旧JSON/CSV价格文件(如定投成交记录)导入到单独的 <标的>/D1~legacy/，不与 history_fetcher.py
+抓取的真实日线 <标的>/D1/ 混合，两者互不覆盖。
+
+用法:
+    python tools/price_store.py import data/spy_price_history.json --symbol US.SPY
+    python tools/price_store.py import data/tsla_price_2025_jan_mar_5tier.csv
+    python tools/price_store.py info US.SPY
+    python tools/price_store.py info US.SPY --bar-type D1~legacy
+
+    store = PriceStore()
+    with store.load('US.SPY', 'D1', start='2024-09-01', end='2024-12-31') as bars:
+        closes = bars.close                 # memoryview('d')，不复制数据
+        first_day = bars.dates()[0]
+
+    records = load_records('data/spy_price_history.json')   # 旧工具的 [{'date', 'price'}] 接口
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import bisect
+import csv
+import datetime
+import json
+import mmap
+import os
+from array import array
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'price_store')
+EPOCH = datetime.datetime(1970, 1, 1)
+
+COLUMNS = (('ts', 'q'), ('open', 'd'), ('high', 'd'), ('low', 'd'), ('close', 'd'), ('volume', 'd'))
+PRICE_COLUMNS = ('open', 'high', 'low', 'close')
+LEGACY_BAR_TYPE = 'D1~legacy'       # 旧文件导入的日线，与抓取的D1分开存放
+
+
+# ========== 时间转换 ==========
+
+def to_ts(value):
+    """日期/时间(字符串、date或datetime)转为秒级时间戳"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        text = value.strip().replace('/', '-')
+        fmt = '%Y-%m-%d %H:%M:%S' if ' ' in text else '%Y-%m-%d'
+        value = datetime.datetime.strptime(text, fmt)
+    elif not isinstance(value, datetime.datetime):
+        value = datetime.datetime(value.year, value.month, value.day)
+    return int((value - EPOCH).total_seconds())
+
+
+def ts_to_datetime(ts):
+    return EPOCH + datetime.timedelta(seconds=ts)
+
+
+# ========== 读取 ==========
+
+class BarSeries:
+    """
+    一段K线的零拷贝视图。各列为内存映射文件上的memoryview切片，
+    用完需release()(或使用with)释放映射。close属性是收盘价列。
+    """
+
+    def __init__(self, symbol, bar_type, columns, maps, start, stop):
+        self.symbol = symbol
+        self.bar_type = bar_type
+        self._maps = maps
+        self._views = []
+        for name, view in columns.items():
+            part = view[start:stop]
+            self._views.extend([view, part])
+            setattr(self, name, part)
+
+    def __len__(self):
+        return len(self.ts)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def release(self):
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        for m in self._maps:
+            m.close()
+        self._maps = []
+
+    def dates(self):
+        """时间列格式化为字符串(日线及以上为YYYY-MM-DD)"""
+        daily = self.bar_type.split('~')[0] in ('D1', 'W1', 'MN1')
+        fmt = '%Y-%m-%d' if daily else '%Y-%m-%d %H:%M:%S'
+        return [ts_to_datetime(ts).strftime(fmt) for ts in self.ts]
+
+    def records(self):
+        """转为旧工具使用的记录列表，price为收盘价"""
+        return [{'date': date, 'price': self.close[i], 'open': self.open[i], 'high': self.high[i],
+                 'low': self.low[i], 'close': self.close[i], 'volume': self.volume[i]}
+                for i, date in enumerate(self.dates())]
+
+
+class PriceStore:
+    """按 标的/K线类型 组织的列式价格库"""
+
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+
+    def _folder(self, symbol, bar_type):
+        return os.path.join(self.root, symbol, bar_type)
+
+    def meta(self, symbol, bar_type='D1'):
+        path = os.path.join(self._folder(symbol, bar_type), 'meta.json')
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def symbols(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def load(self, symbol, bar_type='D1', start=None, end=None):
+        """
+        映射指定标的的K线列，按[start, end]闭区间返回BarSeries。
+        时间列有序，区间定位为二分查找，不读取区间外的数据。
+        """
+        meta = self.meta(symbol, bar_type)
+        if meta is None:
+            raise KeyError(f"价格库中没有 {symbol} {bar_type}")
+
+        folder = self._folder(symbol, bar_type)
+        maps, columns = [], {}
+        for name, code in COLUMNS:
+            if meta['rows'] == 0:
+                columns[name] = memoryview(array(code))
+                continue
+            with open(os.path.join(folder, f"{name}.bin"), 'rb') as f:
+                m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            maps.append(m)
+            raw = memoryview(m)
+            columns[name] = raw.cast(code)
+            raw.release()
+
+        ts = columns['ts']
+        lo = 0 if start is None else bisect.bisect_left(ts, to_ts(start))
+        hi = len(ts) if end is None else bisect.bisect_right(ts, _end_ts(end))
+        return BarSeries(symbol, bar_type, columns, maps, lo, hi)
+
+
+def _end_ts(end):
+    """只给日期的区间终点包含当天全部K线"""
+    ts = to_ts(end)
+    if isinstance(end, str) and ' ' not in end.strip():
+        ts += 86399
+    return ts
+
+
+# ========== 写入 ==========
+
+def write_bars(root, symbol, bar_type, bars, source=None, replace=False, extra_meta=None):
+    """
+    写入K线(与已有数据按时间戳合并，新数据覆盖旧数据；replace=True时整体替换)。
+    每次写入递增meta中的version，供派生数据(如重采样缓存)判断是否过期。
+
+    Args:
+        bars: 可迭代的 {'ts', 'open', 'high', 'low', 'close', 'volume'}
+    Returns:
+        int: 写入后的总行数
+    """
+    store = PriceStore(root)
+    merged = {}
+    meta = store.meta(symbol, bar_type)
+    if meta is not None and meta['rows'] and not replace:
+        with store.load(symbol, bar_type) as existing:
+            for i, ts in enumerate(existing.ts):
+                merged[ts] = tuple(getattr(existing, name)[i] for name, _ in COLUMNS[1:])
+    for bar in bars:
+        merged[int(bar['ts'])] = tuple(float(bar.get(name) or 0.0) for name, _ in COLUMNS[1:])
+
+    stamps = sorted(merged)
+    folder = store._folder(symbol, bar_type)
+    os.makedirs(folder, exist_ok=True)
+    for index, (name, code) in enumerate(COLUMNS):
+        if name == 'ts':
+            values = array(code, stamps)
+        else:
+            values = array(code, (merged[ts][index - 1] for ts in stamps))
+        tmp_path = os.path.join(folder, f"{name}.bin.tmp")
+        with open(tmp_path, 'wb') as f:
+            values.tofile(f)
+        os.replace(tmp_path, os.path.join(folder, f"{name}.bin"))
+
+    sources = dict(meta.get('sources', {})) if meta else {}
+    if source:
+        sources[os.path.basename(source)] = os.path.getmtime(source)
+    new_meta = {
+        'symbol': symbol, 'bar_type': bar_type, 'rows': len(stamps),
+        'first': ts_to_datetime(stamps[0]).isoformat(sep=' ') if stamps else None,
+        'last': ts_to_datetime(stamps[-1]).isoformat(sep=' ') if stamps else None,
+        'sources': sources,
+        'version': (meta.get('version', 0) + 1) if meta else 1,
+    }
+    new_meta.update(extra_meta or {})
+    with open(os.path.join(folder, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(new_meta, f, ensure_ascii=False, indent=2)
+    return len(stamps)
+
+
+# ========== 旧格式导入 ==========
+
+def read_legacy_file(path):
+    """
+    读取旧的JSON/CSV价格文件。
+    只有price列时开高低收都取price；成交量缺失记为0(JSON中的quantity是定投股数，不是成交量)。
+    """
+    if path.endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            rows = json.load(f)
+    else:
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            rows = list(csv.DictReader(f))
+
+    bars = []
+    for row in rows:
+        price = row.get('price', row.get('close'))
+        bar = {'ts': to_ts(row.get('date') or row.get('time'))}
+        for name in PRICE_COLUMNS:
+            bar[name] = float(row.get(name) or price)
+        bar['volume'] = float(row.get('volume') or 0.0)
+        bars.append(bar)
+    return bars
+
+
+def symbol_from_filename(path):
+    """spy_price_history.json -> US.SPY"""
+    return 'US.' + os.path.basename(path).split('_')[0].upper()
+
+
+def import_file(path, symbol=None, bar_type=LEGACY_BAR_TYPE, root=DEFAULT_ROOT):
+    symbol = symbol or symbol_from_filename(path)
+    return symbol, write_bars(root, symbol, bar_type, read_legacy_file(path), source=path)
+
+
+def load_records(path, symbol=None, bar_type=LEGACY_BAR_TYPE, start=None, end=None, root=DEFAULT_ROOT):
+    """
+    旧工具的统一入口：旧文件未导入或已更新时先导入价格库，再从价格库读取记录列表。
+    默认使用旧文件专用的 D1~legacy，不改动抓取的D1数据。
+    """
+    symbol = symbol or symbol_from_filename(path)
+    meta = PriceStore(root).meta(symbol, bar_type)
+    imported = meta and meta.get('sources', {}).get(os.path.basename(path))
+    if imported is None or imported < os.path.getmtime(path):
+        import_file(path, symbol, bar_type, root)
+    with PriceStore(root).load(symbol, bar_type, start, end) as bars:
+        return bars.records()
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='本地OHLCV列式价格库')
+    parser.add_argument('--root', default=DEFAULT_ROOT, help='价格库根目录')
+    sub = parser.add_subparsers(dest='command', required=True)
+    cmd_import = sub.add_parser('import', help='导入JSON/CSV价格文件')
+    cmd_import.add_argument('files', nargs='+')
+    cmd_import.add_argument('--symbol', help='标的代码(默认按文件名推断，如spy_* -> US.SPY)')
+    cmd_import.add_argument('--bar-type', default=LEGACY_BAR_TYPE)
+    cmd_info = sub.add_parser('info', help='查看价格库内容')
+    cmd_info.add_argument('symbol', nargs='?')
+    cmd_info.add_argument('--bar-type', default='D1')
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        for file_path in args.files:
+            imported_symbol, rows = import_file(file_path, args.symbol, args.bar_type, args.root)
+            print(f"📥 {file_path} → {imported_symbol} {args.bar_type}，共 {rows} 根K线")
+    else:
+        price_store = PriceStore(args.root)
+        for code in ([args.symbol] if args.symbol else price_store.symbols()):
+            info = price_store.meta(code, args.bar_type)
+            if info is None:
+                print(f"❌ {code} {args.bar_type} 不存在")
+                continue
+            began = time.perf_counter()
+            with price_store.load(code, args.bar_type) as series:
+                last_close = series.close[-1] if len(series) else None
+            elapsed = (time.perf_counter() - began) * 1000
+            print(f"📊 {code} {args.bar_type}: {info['rows']} 根K线 {info['first']} ~ {info['last']} "
+                  f"| 最新收盘 {last_close} | 映射耗时 {elapsed:.2f}ms")
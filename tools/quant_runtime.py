@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""
+Moomoo量化策略离线运行时
+在本地加载未经修改的.quant/.moo策略文件，注入平台枚举、Contract和模拟的券商API，
+用于测试、回放和性能分析。
+
+用法:
+    broker = SimBroker()
+    strategy = load_strategy('strategies/wheel_strategy/wheel_strategy.quant', broker,
+                             overrides={'dry_run_mode': False})
+    strategy.initialize()
+    strategy.handle_data()
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import contextlib
+import datetime
+import linecache
+import random
+import re
+import sys
+import time
+import types
+
+from option_pricing import bs_greeks
+
+# ========== 平台枚举 ==========
+
+def _make_enum(name, members):
+    """构造简单的枚举命名空间，成员值即成员名"""
+    return types.SimpleNamespace(**{m: m for m in members}, __enum_name__=name)
+
+
+GlobalType = _make_enum('GlobalType', ['INT', 'FLOAT', 'BOOL', 'STRING'])
+TimeZone = _make_enum('TimeZone', ['DEVICE_TIME_ZONE', 'MARKET_TIME_ZONE'])
+OptionType = _make_enum('OptionType', ['CALL', 'PUT'])
+IndexOptionType = _make_enum('IndexOptionType', ['NORMAL', 'SMALL'])
+Moneyness = _make_enum('Moneyness', ['ITM', 'OTM', 'ATM'])
+OptionClass = _make_enum('OptionClass', ['Moneyness', 'Type', 'Style'])
+OrderSide = _make_enum('OrderSide', ['BUY', 'SELL'])
+TradeSide = _make_enum('TradeSide', ['ALL', 'BUY', 'SELL'])
+TimeInForce = _make_enum('TimeInForce', ['DAY', 'GTC'])
+BarType = _make_enum('BarType', ['M1', 'M3', 'M5', 'M15', 'M30', 'H1', 'H2', 'H3', 'H4', 'D1', 'W1', 'MN1'])
+CustomType = _make_enum('CustomType', ['M1', 'M5', 'M15', 'M30', 'H1', 'H2', 'H4', 'D1', 'W1'])
+BarDataType = _make_enum('BarDataType', ['OPEN', 'HIGH', 'LOW', 'CLOSE', 'VOLUME'])
+THType = _make_enum('THType', ['FTH', 'RTH', 'ETH'])
+Currency = _make_enum('Currency', ['USD', 'HKD', 'CNH'])
+CostPriceModel = _make_enum('CostPriceModel', ['AVG', 'DILUTED'])
+OrderStatus = _make_enum('OrderStatus', [
+    'WAITING_SUBMIT', 'SUBMITTING', 'SUBMITTED', 'FILLED_PART', 'FILLED_ALL',
+    'CANCELLED_PART', 'CANCELLED_ALL', 'FAILED', 'DISABLED', 'DELETED'
+])
+
+ENUMS = {
+    'GlobalType': GlobalType, 'TimeZone': TimeZone, 'OptionType': OptionType,
+    'IndexOptionType': IndexOptionType, 'Moneyness': Moneyness, 'OptionClass': OptionClass,
+    'OrderSide': OrderSide, 'TradeSide': TradeSide, 'TimeInForce': TimeInForce,
+    'BarType': BarType, 'CustomType': CustomType, 'BarDataType': BarDataType,
+    'THType': THType, 'Currency': Currency, 'CostPriceModel': CostPriceModel,
+    'OrderStatus': OrderStatus,
+}
+
+# 策略中可能调用的平台内置API
+API_FUNCTIONS = [
+    'declare_trig_symbol', 'device_time',
+    'current_price', 'last_price', 'bid', 'ask', 'mid_price',
+    'bar_open', 'bar_high', 'bar_low', 'bar_close', 'bar_volume', 'bar_custom',
+    'total_cash', 'available_fund', 'market_value_security',
+    'position_holding_qty', 'position_cost', 'position_side', 'get_position_symbol',
+    'place_limit', 'place_market', 'place_stop_limit',
+    'cancel_order_by_symbol', 'cancel_order_by_orderid',
+    'order_status', 'order_filled_qty', 'order_filled_avg_price', 'order_side',
+    'request_orderid', 'request_executionid',
+    'execution_status', 'execution_price', 'execution_qty', 'execution_time', 'execution_side',
+    'option_screener', 'option_screener_by_date', 'option_strike_price',
+    'option_days_to_expiry', 'option_class', 'option_implied_volatility',
+    'option_delta', 'option_gamma', 'option_vega', 'option_theta', 'option_rho',
+]
+
+
+class Contract(str):
+    """平台Contract对象的离线替身，行为与字符串代码一致"""
+
+    @property
+    def symbol(self):
+        return str(self)
+
+    def __repr__(self):
+        return 'Contract("{0}")'.format(str(self))
+
+
+class StrategyBase:
+    """平台StrategyBase的离线替身"""
+
+    def register_indicator(self, indicator_name=None, script=None, param_list=None, **kwargs):
+        self._registered_indicators = getattr(self, '_registered_indicators', {})
+        self._registered_indicators[indicator_name] = script
+
+
+_SHOW_VARIABLE_PATTERN = re.compile(r'self\.(\w+)\s*=\s*show_variable\(')
+
+
+class _ShowVariable:
+    """show_variable的离线实现：按赋值目标变量名返回覆盖值，否则返回默认值"""
+
+    def __init__(self, overrides):
+        self.overrides = dict(overrides or {})
+        self.declared = {}
+
+    def __call__(self, default, var_type=None, description=None):
+        frame = sys._getframe(1)
+        line = linecache.getline(frame.f_code.co_filename, frame.f_lineno)
+        match = _SHOW_VARIABLE_PATTERN.search(line)
+        if not match:
+            return default
+        name = match.group(1)
+        value = self.overrides.get(name, default)
+        self.declared[name] = value
+        return value
+
+
+# ========== 模拟券商 ==========
+
+class SimBroker:
+    """
+    最小化的模拟券商。
+    只实现状态型API(价格、持仓、资金、订单)，期权链等数据由测试按需填充。
+    fill_model(如 fill_analytics.FillModel)存在时，市价单按校准的成交率/部分成交比例/滑点成交，
+    否则按现价全部成交。
+    """
+
+    def __init__(self, symbol='US.SPY', cash=100000.0, start_time=None, fill_model=None, seed=0):
+        self.symbol = Contract(symbol)
+        self.now = start_time or datetime.datetime(2025, 1, 2, 10, 0, 0)
+        self.prices = {}            # symbol -> 最新价
+        self.quotes = {}            # symbol -> (bid, ask)
+        self.positions = {}         # symbol -> 数量(空头为负)
+        self.cash = float(cash)
+        self.orders = {}            # order_id -> dict
+        self.options = {}           # 期权合约 -> 属性字典
+        self.bars = {}              # (symbol, bar_type) -> [bar dict], 最新在末尾
+        self._order_seq = 0
+        self.fill_model = fill_model
+        self.rng = random.Random(seed)
+
+    # ----- 时间与标的 -----
+    def declare_trig_symbol(self):
+        return self.symbol
+
+    def device_time(self, time_zone=None):
+        return self.now
+
+    def advance(self, **delta):
+        """推进模拟时钟"""
+        self.now = self.now + datetime.timedelta(**delta)
+
+    # ----- 行情 -----
+    def current_price(self, symbol, price_type=None):
+        return self.prices.get(symbol)
+
+    def last_price(self, symbol):
+        return self.prices.get(symbol)
+
+    def bid(self, symbol, level=1):
+        quote = self.quotes.get(symbol)
+        return quote[0] if quote else self.prices.get(symbol)
+
+    def ask(self, symbol, level=1):
+        quote = self.quotes.get(symbol)
+        return quote[1] if quote else self.prices.get(symbol)
+
+    def mid_price(self, symbol):
+        quote = self.quotes.get(symbol)
+        return (quote[0] + quote[1]) / 2.0 if quote else self.prices.get(symbol)
+
+    def _bar_value(self, symbol, bar_type, select, field):
+        series = self.bars.get((symbol, bar_type)) or self.bars.get((symbol, None)) or []
+        if select < 1 or select > len(series):
+            return None
+        return series[-select][field]
+
+    def bar_open(self, symbol, bar_type=None, select=1):
+        return self._bar_value(symbol, bar_type, select, 'open')
+
+    def bar_high(self, symbol, bar_type=None, select=1):
+        return self._bar_value(symbol, bar_type, select, 'high')
+
+    def bar_low(self, symbol, bar_type=None, select=1):
+        return self._bar_value(symbol, bar_type, select, 'low')
+
+    def bar_close(self, symbol, bar_type=None, select=1):
+        return self._bar_value(symbol, bar_type, select, 'close')
+
+    def bar_volume(self, symbol, bar_type=None, select=1):
+        return self._bar_value(symbol, bar_type, select, 'volume')
+
+    def bar_custom(self, symbol, data_type=None, custom_num=1, custom_type=None, select=1):
+        series = self.bars.get((symbol, BarType.D1)) or self.bars.get((symbol, None)) or []
+        window = series[-custom_num:] if series else []
+        if not window:
+            return None
+        field = (data_type or 'CLOSE').lower()
+        values = [bar[field] for bar in window]
+        if field == 'high':
+            return max(values)
+        if field == 'low':
+            return min(values)
+        return values[-1]
+
+    # ----- 账户与持仓 -----
+    def total_cash(self, currency=None):
+        return self.cash
+
+    def available_fund(self, currency=None):
+        return self.cash
+
+    def position_holding_qty(self, symbol):
+        return self.positions.get(symbol, 0)
+
+    def position_cost(self, symbol, cost_price_model=None):
+        return self.prices.get(symbol, 0.0)
+
+    def get_position_symbol(self):
+        return [s for s, q in self.positions.items() if q != 0]
+
+    # ----- 订单 -----
+    def _new_order(self, symbol, price, qty, side, order_type):
+        self._order_seq += 1
+        order_id = 'SIM{0:06d}'.format(self._order_seq)
+        self.orders[order_id] = {
+            'symbol': symbol, 'price': price, 'qty': qty, 'side': side,
+            'type': order_type, 'status': OrderStatus.SUBMITTED,
+            'filled_qty': 0, 'avg_price': None, 'submit_time': self.now,
+        }
+        return order_id
+
+    def fill_order(self, order_id, price=None, qty=None):
+        """按指定价格/数量成交订单，并同步持仓和资金"""
+        order = self.orders[order_id]
+        fill_price = price if price is not None else (order['price'] or self.prices.get(order['symbol']))
+        fill_qty = qty if qty is not None else order['qty'] - order['filled_qty']
+        sign = 1 if order['side'] == OrderSide.BUY else -1
+        multiplier = 100 if order['symbol'] in self.options else 1
+        self.positions[order['symbol']] = self.positions.get(order['symbol'], 0) + sign * fill_qty
+        self.cash -= sign * fill_qty * fill_price * multiplier
+        order['filled_qty'] += fill_qty
+        order['avg_price'] = fill_price
+        order['status'] = (OrderStatus.FILLED_ALL if order['filled_qty'] >= order['qty']
+                           else OrderStatus.FILLED_PART)
+
+    def place_limit(self, symbol, price, qty, side=None, time_in_force=None):
+        return self._new_order(symbol, price, qty, side, 'LIMIT')
+
+    def place_market(self, symbol, qty, side=None, time_in_force=None):
+        order_id = self._new_order(symbol, None, qty, side, 'MARKET')
+        if self.fill_model is None:
+            self.fill_order(order_id, price=self.prices.get(symbol))
+            return order_id
+        filled_qty, fill_price = self.fill_model.fill('MARKET', side, qty, self.prices.get(symbol), self.rng,
+                                                      when=self.now)
+        if filled_qty > 0:
+            self.fill_order(order_id, price=fill_price, qty=filled_qty)
+        if filled_qty < qty:
+            self.cancel_order_by_orderid(order_id)
+        return order_id
+
+    def cancel_order_by_orderid(self, order_id):
+        order = self.orders.get(order_id)
+        if order and order['status'] not in (OrderStatus.FILLED_ALL, OrderStatus.CANCELLED_ALL):
+            order['status'] = (OrderStatus.CANCELLED_PART if order['filled_qty'] > 0
+                               else OrderStatus.CANCELLED_ALL)
+
+    def cancel_order_by_symbol(self, symbol, side=None):
+        for order_id, order in self.orders.items():
+            if order['symbol'] == symbol:
+                self.cancel_order_by_orderid(order_id)
+
+    def order_status(self, order_id=None, orderid=None):
+        return self.orders[order_id or orderid]['status']
+
+    def order_filled_qty(self, order_id=None, orderid=None):
+        return self.orders[order_id or orderid]['filled_qty']
+
+    def order_filled_avg_price(self, order_id=None, orderid=None):
+        return self.orders[order_id or orderid]['avg_price']
+
+    # ----- 期权 -----
+    def add_option(self, contract, option_type, strike, dte, delta, bid, ask,
+                   iv=None, gamma=None, theta=None, vega=None, underlying=None):
+        """登记一个期权合约及其Greeks/报价(underlying默认为运行标的)"""
+        contract = Contract(contract)
+        self.options[contract] = {
+            'underlying': Contract(underlying or self.symbol), 'type': option_type, 'strike': strike, 'dte': dte, 'delta': delta,
+            'iv': iv, 'gamma': gamma, 'theta': theta, 'vega': vega,
+        }
+        self.quotes[contract] = (bid, ask)
+        self.prices[contract] = (bid + ask) / 2.0
+        return contract
+
+    def add_priced_option(self, contract, option_type, strike, dte, vol,
+                          spread=0.10, rate=0.0, broker_delta=None, underlying=None):
+        """按Black-Scholes定价登记期权合约，买卖价围绕理论价展开"""
+        spot = self.prices[underlying or self.symbol]
+        greeks = bs_greeks(spot, strike, dte / 365.0, rate, vol, option_type == OptionType.CALL)
+        half_spread = spread / 2.0
+        delta = greeks['delta'] if broker_delta is None else broker_delta
+        return self.add_option(contract, option_type, strike, dte, delta,
+                               bid=max(greeks['price'] - half_spread, 0.01),
+                               ask=greeks['price'] + half_spread,
+                               iv=vol, gamma=greeks['gamma'], theta=greeks['theta'],
+                               vega=greeks['vega'], underlying=underlying)
+
+    def load_chain_rows(self, rows):
+        """登记存档快照中的期权链(chain_archive记录)，同时设置标的现价"""
+        for row in rows:
+            underlying = Contract(row['underlying'])
+            self.prices[underlying] = row['spot']
+            self.add_option(row['symbol'], OptionType.CALL if row['is_call'] else OptionType.PUT,
+                            row['strike'], row['dte'], row['delta'], row['bid'], row['ask'],
+                            iv=row['iv'], gamma=row['gamma'], theta=row['theta'], vega=row['vega'],
+                            underlying=underlying)
+
+    def option_screener(self, underlying_symbol, index_option_type=None, option_type=None,
+                        moneyness=None, time_to_exp_start=0, time_to_exp_end=7,
+                        strike_to_spot_start=-0.1, strike_to_spot_end=0.1):
+        spot = self.prices.get(underlying_symbol)
+        candidates = []
+        for contract, info in self.options.items():
+            if info['underlying'] != underlying_symbol or info['type'] != option_type:
+                continue
+            if not (time_to_exp_start <= info['dte'] <= time_to_exp_end):
+                continue
+            ratio = (info['strike'] - spot) / spot if spot else 0.0
+            if not (strike_to_spot_start <= ratio <= strike_to_spot_end):
+                continue
+            if moneyness == Moneyness.OTM:
+                if option_type == OptionType.PUT and info['strike'] >= spot:
+                    continue
+                if option_type == OptionType.CALL and info['strike'] <= spot:
+                    continue
+            candidates.append((abs(ratio), contract))
+        if not candidates:
+            return None
+        candidates.sort()
+        return candidates[0][1]
+
+    def option_strike_price(self, symbol):
+        return self.options[symbol]['strike']
+
+    def option_days_to_expiry(self, symbol):
+        return self.options[symbol]['dte']
+
+    def option_delta(self, symbol):
+        return self.options[symbol]['delta']
+
+    def option_gamma(self, symbol):
+        return self.options[symbol]['gamma']
+
+    def option_theta(self, symbol):
+        return self.options[symbol]['theta']
+
+    def option_vega(self, symbol):
+        return self.options[symbol]['vega']
+
+    def option_implied_volatility(self, symbol):
+        return self.options[symbol]['iv']
+
+
+class CallCounter:
+    """统计每个API函数的调用次数（用于验证缓存效果）"""
+
+    def __init__(self):
+        self.counts = {}
+
+    def wrap(self, name, func):
+        def counted(*args, **kwargs):
+            self.counts[name] = self.counts.get(name, 0) + 1
+            return func(*args, **kwargs)
+        counted.__name__ = name
+        return counted
+
+    def total(self, names=None):
+        if names is None:
+            return sum(self.counts.values())
+        return sum(self.counts.get(n, 0) for n in names)
+
+    def reset(self):
+        self.counts = {}
+
+
+def _missing_api(name):
+    def missing(*args, **kwargs):
+        raise NotImplementedError("离线运行时未实现API: {0}".format(name))
+    missing.__name__ = name
+    return missing
+
+
+def build_namespace(broker, overrides=None, counter=None):
+    """构造执行策略源码所需的全局命名空间"""
+    namespace = {
+        '__name__': 'quant_strategy',
+        '__builtins__': __builtins__,
+        'StrategyBase': StrategyBase,
+        'Contract': Contract,
+        'show_variable': _ShowVariable(overrides),
+        'datetime': datetime,
+        'time': time,
+    }
+    namespace.update(ENUMS)
+    for name in API_FUNCTIONS:
+        func = getattr(broker, name, None)
+        func = func if callable(func) else _missing_api(name)
+        namespace[name] = counter.wrap(name, func) if counter else func
+    return namespace
+
+
+def load_strategy(path, broker, overrides=None, counter=None):
+    """
+    加载策略文件并返回Strategy实例（不自动调用initialize）。
+
+    Args:
+        path: .quant/.moo 文件路径
+        broker: 提供平台API的对象(通常为SimBroker或其子类)
+        overrides: {变量名: 值}，覆盖show_variable的默认参数
+        counter: 可选CallCounter，统计API调用次数
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        source = f.read()
+
+    filename = 'quant://{0}'.format(path)
+    lines = source.splitlines(True)
+    linecache.cache[filename] = (len(source), None, lines, filename)
+
+    namespace = build_namespace(broker, overrides, counter)
+    exec(compile(source, filename, 'exec'), namespace)
+
+    for value in list(namespace.values()):
+        if isinstance(value, type) and issubclass(value, StrategyBase) and value is not StrategyBase:
+            strategy = value()
+            strategy.__quant_namespace__ = namespace
+            return strategy
+    raise ValueError("策略文件中未找到StrategyBase子类: {0}".format(path))
+
+
+@contextlib.contextmanager
+def skip_sleep():
+    """
+    期间time.sleep直接返回，退出时恢复。策略在方法内import time拿到的是同一个模块，
+    下单后等待撮合的sleep在离线运行时不必真的等待。
+    """
+    original = time.sleep
+    time.sleep = lambda seconds: None
+    try:
+        yield
+    finally:
+        time.sleep = original
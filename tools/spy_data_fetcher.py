@@ -2,58 +2,38 @@
 """
 SPY价格数据获取工具
 用于DCA策略回测的历史数据准备
+通过 history_fetcher 增量写入本地价格库，再导出CSV/JSON
 """
 
 import json
-import urllib.request
+import os
 from datetime import datetime, timedelta
 import csv
 
-def get_spy_data(days=365):
-    """获取SPY近一年价格数据"""
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=days)
-    
-    print(f'📊 获取SPY价格数据: {start_date.strftime("%Y-%m-%d")} 到 {end_date.strftime("%Y-%m-%d")}')
-    
-    # 转换为时间戳
-    start_ts = int(start_date.timestamp())
-    end_ts = int(end_date.timestamp())
-    
-    url = f'https://query1.finance.yahoo.com/v8/finance/chart/SPY?period1={start_ts}&period2={end_ts}&interval=1d'
-    
-    try:
-        with urllib.request.urlopen(url) as response:
-            data = json.loads(response.read().decode())
-        
-        result = data['chart']['result'][0]
-        timestamps = result['timestamp']
-        quotes = result['indicators']['quote'][0]
-        
-        spy_data = []
-        for i, ts in enumerate(timestamps):
-            date_str = datetime.fromtimestamp(ts).strftime('%Y-%m-%d')
-            close_price = quotes['close'][i]
-            high_price = quotes['high'][i] 
-            low_price = quotes['low'][i]
-            open_price = quotes['open'][i]
-            volume = quotes['volume'][i]
-            
-            if close_price is not None:  # 过滤无效数据
-                spy_data.append({
-                    'date': date_str,
-                    'open': round(open_price, 2) if open_price else close_price,
-                    'high': round(high_price, 2) if high_price else close_price, 
-                    'low': round(low_price, 2) if low_price else close_price,
-                    'close': round(close_price, 2),
-                    'volume': volume if volume else 0
-                })
-        
-        return spy_data
-        
-    except Exception as e:
-        print(f'❌ 获取数据失败: {e}')
+from history_fetcher import HistoryFetcher
+from price_store import DEFAULT_ROOT, PriceStore
+
+SYMBOL = 'US.SPY'
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+def get_spy_data(days=365, root=DEFAULT_ROOT):
+    """增量获取SPY日线到本地价格库，返回窗口内全部记录"""
+    fetcher = HistoryFetcher(root)
+    result = fetcher.update([SYMBOL], 'D1', days)[SYMBOL]
+    if result['error']:
         return None
+    print(f'📊 获取SPY价格数据: 新增 {result["bars"]} 根K线')
+
+    start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+    with PriceStore(root).load(SYMBOL, 'D1', start=start_date) as bars:
+        return [{
+            'date': r['date'],
+            'open': round(r['open'], 2),
+            'high': round(r['high'], 2),
+            'low': round(r['low'], 2),
+            'close': round(r['close'], 2),
+            'volume': int(r['volume'])
+        } for r in bars.records()]
 
 def save_to_csv(data, filename):
     """保存数据到CSV文件"""
@@ -94,14 +74,10 @@ def main():
     print(f'   波动: {(max_price - min_price) / min_price * 100:.1f}%')
     
     # 保存文件
-    base_path = '/home/wuxia/projects/moomoo_custom_strategies/data/'
-    
-    # 确保目录存在
-    import os
-    os.makedirs(base_path, exist_ok=True)
+    os.makedirs(DATA_DIR, exist_ok=True)
     
-    csv_file = f'{base_path}spy_historical_data.csv'
-    json_file = f'{base_path}spy_historical_data.json'
+    csv_file = os.path.join(DATA_DIR, 'spy_historical_data.csv')
+    json_file = os.path.join(DATA_DIR, 'spy_historical_data.json')
     
     save_to_csv(spy_data, csv_file)
     save_to_json(spy_data, json_file)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+券商API记录与回放测试 (api_replay.py / 网格 v5.3.17 enable_api_record)
+测试重点：
+1. 离线记录一次网格会话，回放得到完全相同的持仓和成交，回放不等待
+2. 网格策略输出的APIREC日志导入为二进制记录后可以回放
+3. 日志只追加：多次会话追加到同一文件，末尾不完整的帧被忽略
+4. 参数改变导致调用序列不同时报告回放分歧
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import contextlib
+import datetime
+import io
+import os
+import random
+import tempfile
+import time
+from unittest import mock
+
+from api_replay import (ApiLogWriter, ApiRecorder, ReplayDivergence, decode_value, encode_value, import_log,
+                        read_log, read_sessions, replay)
+from quant_runtime import Contract, SimBroker, load_strategy
+
+GRID_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'strategies', 'grid_strategy',
+                         'grid_trading_v5.3.quant')
+OVERRIDES = {'enable_profiling': False}
+
+
+def random_walk(n, seed=1, sigma=0.02):
+    rng = random.Random(seed)
+    price, closes = 100.0, []
+    for _ in range(n):
+        price *= 1 + rng.gauss(0, sigma)
+        closes.append(round(price, 2))
+    return closes
+
+
+def run_grid(closes, overrides=None, counter=None, recorder=None):
+    broker = SimBroker()
+    broker.prices[broker.symbol] = closes[0]
+    strategy = load_strategy(GRID_PATH, broker, overrides=dict(OVERRIDES, **(overrides or {})),
+                             counter=counter or recorder)
+    if recorder is not None:
+        recorder.attach(strategy)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), mock.patch('time.sleep'):
+        strategy.trigger_symbols()
+        strategy.initialize()
+        for price in closes:
+            broker.prices[broker.symbol] = price
+            broker.advance(minutes=30)
+            strategy.handle_data()
+    return strategy, broker, output.getvalue()
+
+
+def test_record_and_replay_offline():
+    closes = random_walk(150)
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'session.apirec')
+        with ApiRecorder(path) as recorder:
+            strategy, broker, _ = run_grid(closes, recorder=recorder)
+        assert broker.orders, "测试行情应产生交易"
+        started = time.perf_counter()
+        result = replay(GRID_PATH, path)
+        elapsed = time.perf_counter() - started
+        size = os.path.getsize(path)
+    replayed = result['strategy']
+    print(f"   记录 {result['calls']} 次API调用({size:,}字节)，回放 {result['ticks']} 次运行用时 {elapsed:.2f}秒")
+    assert result['ticks'] == 150 and result['calls'] > 150
+    assert replayed.total_position == strategy.total_position
+    assert replayed.positions == strategy.positions
+    assert replayed.stock == broker.symbol
+    assert size < result['calls'] * 64        # 紧凑编码
+
+
+def test_import_grid_apirec_lines():
+    closes = random_walk(60, seed=4, sigma=0.03)
+    strategy, _, output = run_grid(closes, overrides={'enable_api_record': True})
+    lines = [line for line in output.splitlines() if line.startswith('APIREC|v1|')]
+    assert lines[0].split('|')[3] == '@init'
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'live.apirec')
+        # 平台日志行带时间前缀，并夹杂其他输出
+        summary = import_log([f"2025-01-02 09:31:00 {line}" if i % 2 else line
+                              for i, line in enumerate(output.splitlines())], path)
+        assert summary['sessions'] == 1 and summary['ticks'] == 60
+        session = read_sessions(path)[0]
+        assert session['params']['enable_api_record'] is True and session['symbol'] == 'US.SPY'
+        result = replay(GRID_PATH, path)
+        with open(path, 'ab') as f:
+            f.write(b'\x05\x01')                  # 写入中断留下的半帧
+        assert len(read_sessions(path)[0]['ticks']) == 60
+        try:
+            import_log(lines[:5] + lines[6:], os.path.join(root, 'gap.apirec'))
+            assert False, "缺行应报错"
+        except ValueError as e:
+            assert '不连续' in str(e)
+    assert result['strategy'].total_position == strategy.total_position
+    assert 'APIREC|' not in result['output']       # 回放时不再输出记录
+    print(f"   导入 {summary['calls']} 次API调用，回放持仓 {result['strategy'].total_position}")
+
+
+def test_log_append_and_codec():
+    values = [None, True, False, 0, -1, 2 ** 40, -2 ** 33, 1.5, -0.1, '网格', '',
+              datetime.datetime(2025, 1, 2, 9, 31, 5, 123456), Contract('US.SPY'),
+              [1, [2.5, 'a']], {'k': (1, 2), 3: None}]
+    for value in values:
+        out = bytearray()
+        encode_value(out, value)
+        decoded, pos = decode_value(out, 0)
+        assert pos == len(out)
+        expected = list(value['k']) if isinstance(value, dict) else value
+        assert (decoded['k'] if isinstance(value, dict) else decoded) == expected
+    assert type(decode_value(bytes([0x63, 6]) + b'US.SPY', 0)[0]) is Contract
+
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'append.apirec')
+        with ApiLogWriter(path) as writer:
+            writer.mark('@init', {'symbol': 'US.SPY', 'params': {}})
+            writer.call('current_price', ['US.SPY'], {}, 100.0)
+        with open(path, 'ab') as f:
+            f.write(b'\x20\x01\x00')              # 不完整的帧
+        with ApiLogWriter(path) as writer:        # 追加时截掉半帧并沿用名称表
+            writer.mark('@init', {'symbol': 'US.QQQ', 'params': {}})
+            writer.mark('@tick')
+            writer.call('current_price', ['US.QQQ'], {}, None, 'timeout')
+        records = list(read_log(path))
+        sessions = read_sessions(path)
+    assert [r[1] for r in records] == ['@init', 'current_price', '@init', '@tick', 'current_price']
+    assert records[4][5] == 'timeout' and records[1][4] == 100.0
+    assert [s['symbol'] for s in sessions] == ['US.SPY', 'US.QQQ']
+    assert len(sessions[1]['ticks'][0]) == 1
+
+
+def test_divergence_detected():
+    closes = random_walk(80, seed=9, sigma=0.03)
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'session.apirec')
+        with ApiRecorder(path) as recorder:
+            run_grid(closes, recorder=recorder)
+        for overrides in ({'grid_percentage': 0.05}, {'trade_quantity': 10}):
+            try:
+                replay(GRID_PATH, path, overrides=overrides)
+                assert False, f"{overrides} 应产生分歧"
+            except ReplayDivergence as e:
+                print(f"   {overrides}: {str(e)[:60]}")
+        # 分歧在出现的那次运行报告，不会一直跑到记录末尾；原参数回放无分歧
+        assert replay(GRID_PATH, path)['ticks'] == 80
+
+
+if __name__ == '__main__':
+    test_record_and_replay_offline()
+    test_import_grid_apirec_lines()
+    test_log_append_and_codec()
+    test_divergence_detected()
+    print("\n🎉 API记录与回放测试全部通过")
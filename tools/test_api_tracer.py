@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+券商API调用追踪测试 (api_tracer.py / 网格 v5.3.15 enable_api_trace)
+测试重点：
+1. 离线回放统计各API调用次数，并按调用方法归因；回放跳过sleep，结束后恢复time.sleep
+2. 单次运行超出调用预算时告警并列出调用最多的方法
+3. 网格策略内置追踪与离线追踪的次数、超预算次数一致
+4. 内置追踪关闭时不替换平台API
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import contextlib
+import io
+import os
+import random
+import time
+from unittest import mock
+
+from api_tracer import ApiTracer, replay
+from quant_runtime import SimBroker, load_strategy
+
+STRATEGY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'strategies')
+GRID_PATH = os.path.join(STRATEGY_DIR, 'grid_strategy', 'grid_trading_v5.3.quant')
+DCA_PATH = os.path.join(STRATEGY_DIR, 'dca_strategy', 'dca_free_stable.quant')
+
+
+def random_walk(n, seed=1, sigma=0.015):
+    rng = random.Random(seed)
+    price, closes = 100.0, []
+    for _ in range(n):
+        price *= 1 + rng.gauss(0, sigma)
+        closes.append(round(price, 2))
+    return closes
+
+
+def test_replay_counts_and_callers():
+    closes = random_walk(200)
+    sleep = time.sleep
+    tracer, _, broker = replay(GRID_PATH, closes, bar_minutes=30)
+    assert time.sleep is sleep
+    report = tracer.report()
+    print(f"   网格200次运行: API调用 {report['total']} 次，单次最多 {report['max_tick_calls']} 次")
+    assert report['ticks'] == 200
+    assert report['callers'][('handle_data', 'current_price')] == 200
+    assert report['callers'][('_confirm_order', 'order_status')] > 0
+    assert sum(report['callers'].values()) == report['total']
+    assert sum(tracer.tick_calls) <= report['total']     # initialize中的调用不计入单次运行
+    assert broker.orders
+
+    # DCA回测每根K线只读取一次收盘价
+    dca_tracer, _, _ = replay(DCA_PATH, closes, overrides={'version_tier': 2})
+    assert dca_tracer.callers[('_get_backtest_price', 'bar_close')] == 200
+    assert dca_tracer.report()['max_tick_calls'] <= 5
+
+
+def test_budget_warning():
+    closes = random_walk(120, seed=3, sigma=0.03)
+    tracer, _, _ = replay(GRID_PATH, closes, budget=4, bar_minutes=30)
+    over = [calls for calls in tracer.tick_calls if calls > 4]
+    assert over and len(tracer.warnings) == len(over)
+    warning = max(tracer.warnings, key=lambda item: item['calls'])
+    assert sum(count for _, count in warning['top']) <= warning['calls']
+    print(f"   预算4次: {len(over)} 次运行超出，最多 {warning['calls']} 次，首位 {warning['top'][0]}")
+
+    # verbose 时打印告警
+    loud = ApiTracer(budget=1)
+    traced = loud.wrap('current_price', lambda symbol: 1.0)
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        loud.begin_tick()
+        traced('US.SPY')
+        traced('US.SPY')
+        loud.end_tick()
+    assert '[API预算]' in buffer.getvalue() and 'current_price×2' in buffer.getvalue()
+    assert loud.wrap('place_market', len) is len
+
+
+def test_grid_builtin_trace_matches_offline():
+    closes = random_walk(150, seed=7, sigma=0.02)
+    with mock.patch('atexit.register'):
+        tracer, strategy, _ = replay(GRID_PATH, closes, budget=6, bar_minutes=30,
+                                     overrides={'enable_api_trace': True, 'api_call_budget': 6})
+    summary = strategy.api_trace_summary()
+    assert summary['ticks'] == 150
+    assert {name: row['count'] for name, row in summary['functions'].items()} == tracer.counts
+    assert summary['over_budget_ticks'] == len(tracer.warnings) > 0
+    assert summary['max_tick_calls'] == max(tracer.tick_calls)
+    # 内置追踪按真实调用方法归因
+    assert summary['callers'][('handle_data', 'current_price')] == 150
+
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        strategy.dump_api_trace(reset=True)
+    assert '_confirm_order -> order_status' in buffer.getvalue()
+    assert strategy.api_trace_summary()['functions'] == {}
+
+
+def test_builtin_trace_disabled():
+    broker = SimBroker()
+    broker.prices[broker.symbol] = 100.0
+    strategy = load_strategy(GRID_PATH, broker, overrides={'enable_profiling': False})
+    original = strategy.__quant_namespace__['current_price']
+    with contextlib.redirect_stdout(io.StringIO()), mock.patch('time.sleep'):
+        strategy.trigger_symbols()
+        strategy.initialize()
+        strategy.handle_data()
+    assert strategy.__quant_namespace__['current_price'] is original
+    assert strategy.api_trace_summary()['functions'] == {}
+
+
+if __name__ == '__main__':
+    test_replay_counts_and_callers()
+    test_budget_warning()
+    test_grid_builtin_trace_matches_offline()
+    test_builtin_trace_disabled()
+    print("\n🎉 API调用追踪测试全部通过")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+日内K线记录模式测试 (pricedata_collector.moo 仅记录模式 / bar_log_importer.py)
+测试重点：
+1. 仅记录模式不下单，每根K线只查询和记录一次
+2. K线攒批输出紧凑日志行，换日和收盘时输出剩余K线，策略中途停止时退出输出未满一批的K线
+3. H1/H2 收盘前不足一个周期的最后一根K线(15:30~16:00)同样记录并在收盘时输出
+4. 日志导入价格库后与原始K线一致
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import atexit
+import contextlib
+import datetime
+import io
+import os
+import tempfile
+from unittest import mock
+
+from bar_log_importer import import_bar_log, parse_bar_log
+from price_store import PriceStore
+from quant_runtime import BarType, CallCounter, SimBroker, load_strategy
+
+COLLECTOR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pricedata_collector.moo')
+
+
+def run_collector(days, overrides, step_minutes=10, stop_minute=390):
+    """
+    逐日模拟09:30~16:00，按所选K线周期生成K线(最后一根在16:00截止)，每step_minutes分钟触发一次；
+    最后一天只运行到开盘后stop_minute分钟(模拟盘中停止)
+    """
+    kline_type = overrides.get('kline_type', 0)
+    period = (30, 60, 120)[kline_type]
+    bar_type = (BarType.M30, BarType.H1, BarType.H2)[kline_type]
+    starts = list(range(0, 390, period))
+    ends = starts[1:] + [390]
+    broker = SimBroker(symbol='US.SPY', start_time=datetime.datetime(2025, 1, 2, 9, 30))
+    counter = CallCounter()
+    strategy = load_strategy(COLLECTOR_PATH, broker, overrides=overrides, counter=counter)
+    bars = []
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        strategy.initialize()
+        atexit.unregister(strategy.flush_bars)
+        counter.reset()
+        for day in range(days):
+            open_time = datetime.datetime(2025, 1, 2 + day, 9, 30)
+            series = broker.bars[(broker.symbol, bar_type)] = []
+            last_step = stop_minute if day == days - 1 else 390
+            for step in range(0, last_step + 1, step_minutes):
+                broker.now = open_time + datetime.timedelta(minutes=step)
+                # 刚完成的K线
+                while len(series) < len(starts) and ends[len(series)] <= step:
+                    i = len(bars)
+                    bar = {'start': open_time + datetime.timedelta(minutes=starts[len(series)]),
+                           'open': 500 + i * 0.25, 'high': 501 + i * 0.25, 'low': 499.5 + i * 0.25,
+                           'close': 500.125 + i * 0.25, 'volume': 100000 + i}
+                    series.append(bar)
+                    bars.append(bar)
+                strategy.handle_data()
+    return strategy, broker, counter, bars, output.getvalue().splitlines()
+
+
+def test_record_only_mode():
+    strategy, broker, counter, bars, lines = run_collector(2, {'record_only': True, 'flush_bar_count': 5})
+    chain_lines = [line for line in lines if line.startswith('PBARS|')]
+    print(f"   2天共 {len(bars)} 根K线 → {len(chain_lines)} 行日志")
+
+    assert broker.orders == {}
+    assert strategy.recorded_bars == len(bars) == 26
+    # 每根K线只查询一次(开高低收量各一次)
+    assert counter.counts['bar_close'] == 26
+    # 每天13根: 5 + 5 + 3(收盘时输出剩余)
+    assert [line.count(';') + 1 for line in chain_lines] == [5, 5, 3, 5, 5, 3]
+    assert chain_lines[0].startswith('PBARS|v1|US.SPY|M30|2025-01-02|570,500,501,499.5,500.125,100000;600,')
+
+
+def test_hourly_bars_include_last_half_hour():
+    """H1每天7根、H2每天4根，最后一根都从15:30开始，收盘时输出"""
+    cases = ((1, 'H1', [570, 630, 690, 750, 810, 870, 930]), (2, 'H2', [570, 690, 810, 930]))
+    for kline_type, name, day_starts in cases:
+        per_day = len(day_starts)
+        strategy, _, _, bars, lines = run_collector(2, {'record_only': True, 'kline_type': kline_type})
+        chain_lines = [line for line in lines if line.startswith('PBARS|')]
+        print(f"   {name}: 2天共 {len(bars)} 根K线 → {len(chain_lines)} 行日志")
+        assert strategy.recorded_bars == len(bars) == 2 * per_day
+        assert [line.count(';') + 1 for line in chain_lines] == [per_day, per_day]
+        series = parse_bar_log(lines)[('US.SPY', name)]
+        assert [bar['close'] for bar in series] == [b['close'] for b in bars]
+        for line in chain_lines:
+            assert [int(item.split(',')[0]) for item in line.split('|')[5].split(';')] == day_starts
+
+
+def test_flush_tail_on_exit():
+    """盘中停止：未攒满一批的K线在退出时输出，不丢失"""
+    with mock.patch('atexit.register') as register:
+        strategy, _, _, bars, lines = run_collector(1, {'record_only': True}, stop_minute=150)
+    register.assert_called_once_with(strategy.flush_bars)
+    assert len(bars) == 5 and not any(line.startswith('PBARS|') for line in lines)
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        strategy.flush_bars()                               # 平台退出时由atexit调用
+        strategy.flush_bars()
+    tail = output.getvalue().splitlines()
+    assert len(tail) == 1 and tail[0].count(';') + 1 == 5
+    assert [bar['close'] for bar in parse_bar_log(tail)[('US.SPY', 'M30')]] == [b['close'] for b in bars]
+
+
+def test_import_to_price_store():
+    _, _, _, bars, lines = run_collector(2, {'record_only': True})
+    series = parse_bar_log(['2025-01-03 16:00:00 ' + line for line in lines])
+    assert list(series) == [('US.SPY', 'M30')]
+
+    with tempfile.TemporaryDirectory() as root:
+        summary = import_bar_log(lines, root)
+        assert summary[('US.SPY', 'M30')] == (26, 26)
+        # 重复导入不产生重复K线
+        import_bar_log(lines, root)
+        with PriceStore(root).load('US.SPY', 'M30', start='2025-01-03') as stored:
+            assert len(stored) == 13
+            assert stored.dates()[0] == '2025-01-03 09:30:00'
+            assert stored.dates()[-1] == '2025-01-03 15:30:00'
+            assert list(stored.close) == [b['close'] for b in bars[13:]]
+            assert list(stored.volume) == [float(b['volume']) for b in bars[13:]]
+
+
+def test_default_mode_still_orders():
+    """默认模式保持原有的逐根K线下单行为"""
+    _, broker, _, _, lines = run_collector(1, {})
+    assert len(broker.orders) == 1
+    assert not any(line.startswith('PBARS|') for line in lines)
+
+
+if __name__ == '__main__':
+    test_record_only_mode()
+    test_hourly_bars_include_last_half_hour()
+    test_flush_tail_on_exit()
+    test_import_to_price_store()
+    test_default_mode_still_orders()
+    print("\n🎉 日内K线记录模式测试全部通过")
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+K线重采样缓存测试 (bar_resampler.py)
+测试重点：
+1. 日内周期按09:30开盘对齐，开高低收量聚合正确
+2. M1与M30两种源周期重采样得到相同的H1/H2/D1
+3. 同一周期多次请求只重采样一次，源数据更新后重新计算
+4. 周线/月线按日历聚合
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import tempfile
+
+from bar_resampler import BarCache, resample
+from price_store import PriceStore, to_ts, write_bars
+
+
+def minute_bars(dates):
+    """每个交易日09:30~15:59共390根M1，价格随分钟递增"""
+    bars = []
+    for d, date in enumerate(dates):
+        open_ts = to_ts(date + ' 09:30:00')
+        for m in range(390):
+            price = 100.0 + d + m * 0.01
+            bars.append({'ts': open_ts + m * 60, 'open': price, 'high': price + 0.05,
+                         'low': price - 0.05, 'close': price + 0.01, 'volume': 10.0 + m})
+    return bars
+
+
+DATES = ['2025-01-02', '2025-01-03', '2025-01-06', '2025-01-07', '2025-01-31', '2025-02-03']
+
+
+def build_store(root):
+    bars = minute_bars(DATES)
+    write_bars(root, 'US.SPY', 'M1', bars)
+    m30 = resample([b['ts'] for b in bars], [b['open'] for b in bars], [b['high'] for b in bars],
+                   [b['low'] for b in bars], [b['close'] for b in bars], [b['volume'] for b in bars], 'M30')
+    write_bars(root, 'US.QQQ', 'M30', m30)
+    return bars
+
+
+def test_session_aligned_buckets():
+    with tempfile.TemporaryDirectory() as root:
+        base = build_store(root)
+        cache = BarCache(PriceStore(root))
+        with cache.get('US.SPY', 'H1', start='2025-01-02', end='2025-01-02') as h1:
+            dates = h1.dates()
+            assert dates[0] == '2025-01-02 09:30:00' and dates[-1] == '2025-01-02 15:30:00'
+            assert len(h1) == 7
+            first = base[:60]
+            assert h1.open[0] == first[0]['open']
+            assert h1.close[0] == first[-1]['close']
+            assert h1.high[0] == max(b['high'] for b in first)
+            assert h1.low[0] == min(b['low'] for b in first)
+            assert h1.volume[0] == sum(b['volume'] for b in first)
+        with cache.get('US.SPY', 'H2', start='2025-01-02', end='2025-01-02') as h2:
+            assert h2.dates() == ['2025-01-02 09:30:00', '2025-01-02 11:30:00',
+                                  '2025-01-02 13:30:00', '2025-01-02 15:30:00']
+
+
+def test_m1_and_m30_sources_agree():
+    with tempfile.TemporaryDirectory() as root:
+        build_store(root)
+        # 同一份数据分别以M1(US.SPY)和M30(US.QQQ)为源
+        cache = BarCache(PriceStore(root))
+        for target in ('H1', 'H2', 'D1'):
+            with cache.get('US.SPY', target) as a, cache.get('US.QQQ', target) as b:
+                assert a.ts.tolist() == b.ts.tolist()
+                for column in ('open', 'high', 'low', 'close'):
+                    assert getattr(a, column).tolist() == getattr(b, column).tolist()
+                assert all(abs(x - y) < 1e-6 for x, y in zip(a.volume, b.volume))
+        assert PriceStore(root).meta('US.QQQ', 'D1~M30')['source'] == 'M30'
+
+
+def test_cache_reuse_and_invalidation():
+    with tempfile.TemporaryDirectory() as root:
+        build_store(root)
+        cache = BarCache(PriceStore(root))
+        for _ in range(3):
+            for target in ('M30', 'H1', 'D1'):
+                with cache.get('US.SPY', target) as bars:
+                    assert len(bars) > 0
+        print(f"   3轮 × 3个周期，重采样 {cache.resample_count} 次")
+        assert cache.resample_count == 3
+
+        # 新的进程读取已有缓存也不重算
+        fresh = BarCache(PriceStore(root))
+        with fresh.get('US.SPY', 'D1') as daily:
+            assert len(daily) == len(DATES)
+        assert fresh.resample_count == 0
+
+        # 源数据追加后缓存过期
+        write_bars(root, 'US.SPY', 'M1', minute_bars(['2025-02-04']))
+        with fresh.get('US.SPY', 'D1') as daily:
+            assert daily.dates()[-1] == '2025-02-04'
+        assert fresh.resample_count == 1
+
+
+def test_calendar_buckets():
+    with tempfile.TemporaryDirectory() as root:
+        build_store(root)
+        cache = BarCache(PriceStore(root))
+        with cache.get('US.SPY', 'W1') as weekly:
+            assert weekly.dates() == ['2024-12-30', '2025-01-06', '2025-01-27', '2025-02-03']
+        with cache.get('US.SPY', 'MN1', source='D1') as monthly:
+            assert monthly.dates() == ['2025-01-01', '2025-02-01']
+            assert monthly.close[0] == 100.0 + 4 + 389 * 0.01 + 0.01
+
+
+if __name__ == '__main__':
+    test_session_aligned_buckets()
+    test_m1_and_m30_sources_agree()
+    test_cache_reuse_and_invalidation()
+    test_calendar_buckets()
+    print("\n🎉 K线重采样缓存测试全部通过")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+期权链记录器与本地存档测试 (option_chain_recorder.moo / chain_archive.py)
+测试重点：
+1. 记录器按间隔输出分片日志行，多标的各自成快照
+2. 日志解析合并分片，丢弃不完整快照和行头损坏的行，现价为空不中断导入
+3. 按 标的/日期 分区写入，重复导入去重合并
+4. 内存映射读取只解压被访问的列，二分定位快照
+5. 回放快照交给价差评估器和模拟券商
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+
+from chain_archive import (ChainPartition, append_rows, list_partitions, load_snapshot,
+                           parse_log, partition_path)
+from option_spreads import bull_put_spreads, load_chain
+from quant_runtime import OptionType, SimBroker, load_strategy
+
+RECORDER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'option_chain_recorder.moo')
+
+
+def build_recorder():
+    broker = SimBroker(symbol='US.SPY', cash=100000.0)
+    for symbol, spot in (('US.SPY', 100.0), ('US.QQQ', 50.0)):
+        broker.prices[symbol] = spot
+        for dte in (14, 35):
+            for i in range(-6, 6):
+                strike = spot * (1 + (i + 0.5) * 0.01)
+                for option_type, tag in ((OptionType.PUT, 'P'), (OptionType.CALL, 'C')):
+                    broker.add_priced_option(f"{symbol}{dte:03d}{tag}{strike:g}", option_type, strike, dte,
+                                             0.25, spread=0.04, underlying=symbol)
+    strategy = load_strategy(RECORDER_PATH, broker, overrides={
+        'extra_underlyings': 'us.qqq', 'record_interval_min': 30, 'dte_windows': '8-21,22-45',
+        'strike_band_count': 5, 'strike_band_width': 0.01, 'rows_per_line': 7,
+    })
+    with contextlib.redirect_stdout(io.StringIO()):
+        strategy.initialize()
+    return strategy, broker
+
+
+def record(strategy, broker, checks, minutes=10):
+    """运行若干轮handle_data，返回捕获的日志"""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        for _ in range(checks):
+            strategy.handle_data()
+            broker.advance(minutes=minutes)
+    return output.getvalue().splitlines()
+
+
+def test_recorder_cadence_and_parse():
+    strategy, broker = build_recorder()
+    lines = record(strategy, broker, 6)
+    chain_lines = [line for line in lines if line.startswith('OCHAIN|')]
+
+    # 60分钟内每30分钟记录一次，两个标的
+    assert strategy.snapshot_count == 4
+    # 每个标的: 2个到期窗口 × 2类型 × 5档 = 20个合约，每行7个 → 3行
+    assert len(chain_lines) == 12
+
+    rows = parse_log(['2025-01-02 10:00:01 [INFO] ' + line for line in lines])
+    print(f"   日志{len(chain_lines)}行 → {len(rows)}条合约记录")
+    assert len(rows) == 4 * 20
+    spy = [r for r in rows if r['underlying'] == 'US.SPY']
+    assert {r['spot'] for r in spy} == {100.0}
+    sample = next(r for r in spy if not r['is_call'])
+    info = broker.options[sample['symbol']]
+    assert abs(sample['strike'] - info['strike']) < 1e-9
+    assert abs(sample['delta'] - info['delta']) < 1e-4
+    assert abs(sample['gamma'] - info['gamma']) < 1e-6
+
+    # 分片缺失的快照被丢弃
+    partial = parse_log(chain_lines[:2])
+    assert partial == []
+
+    # 无报价合约的空字段: 报价/Greeks为None，缺少行权价或到期天数的记录跳过，不中断导入
+    header = chain_lines[0].rsplit('|', 1)[0].replace('|1/3', '|1/1')
+    items = ['US.SPY250214P95000,P,95,35,,,,,,,', 'US.SPY250214P96000,P,,35,1.2,1.3,-0.3,0.02,-0.01,0.1,0.25',
+             'US.SPY250214P97000,P,97,,1.2,1.3,-0.3,0.02,-0.01,0.1,0.25',
+             'US.SPY250214P98000,P,98,35,x,1.3,-0.3,0.02,-0.01,0.1,0.25',
+             'US.SPY250214P99000,P,99,35,1.2,1.3,-0.3,0.02,-0.01,0.1,0.25']
+    sparse = parse_log([header + '|' + ';'.join(items)])
+    assert [r['symbol'] for r in sparse] == ['US.SPY250214P95000', 'US.SPY250214P99000']
+    assert sparse[0]['bid'] is None and sparse[0]['iv'] is None and sparse[0]['dte'] == 35
+
+    # 现价未取到时行头的现价为空；时间或分片序号损坏的行整行跳过
+    no_spot = parse_log(['OCHAIN|v1|US.SPY|2025-01-02 10:00:00||1/1|' + items[-1],
+                         'OCHAIN|v1|US.SPY|2025-01-02 10:05:00|100|x/1|' + items[-1],
+                         'OCHAIN|v1|US.SPY|2025-01-02 10:1|100|1/1|' + items[-1]])
+    assert len(no_spot) == 1 and no_spot[0]['spot'] is None and no_spot[0]['strike'] == 99
+
+
+def test_partition_roundtrip_and_merge():
+    strategy, broker = build_recorder()
+    rows = parse_log(record(strategy, broker, 4))
+
+    with tempfile.TemporaryDirectory() as root:
+        paths = append_rows(root, rows)
+        assert sorted(paths) == sorted([partition_path(root, 'US.QQQ', '2025-01-02'),
+                                        partition_path(root, 'US.SPY', '2025-01-02')])
+        # 重复导入不产生重复记录
+        append_rows(root, rows)
+        assert list_partitions(root, 'US.SPY') == ['2025-01-02']
+
+        with ChainPartition(partition_path(root, 'US.SPY', '2025-01-02')) as part:
+            assert len(part) == 40
+            assert len(part.timestamps()) == 2
+            stored = list(part.rows())
+        expected = sorted((r for r in rows if r['underlying'] == 'US.SPY'),
+                          key=lambda r: (r['ts'], r['is_call'], r['strike'], r['dte'], r['symbol']))
+        assert stored == expected
+
+
+def test_mmap_reads_only_requested_columns():
+    strategy, broker = build_recorder()
+    lines = record(strategy, broker, 1)
+    broker.advance(minutes=30)
+    broker.prices['US.SPY'] = 101.0
+    lines += record(strategy, broker, 1)
+    rows = parse_log(lines)
+
+    with tempfile.TemporaryDirectory() as root:
+        append_rows(root, rows)
+        with ChainPartition(partition_path(root, 'US.SPY', '2025-01-02')) as part:
+            first_ts = part.timestamps()[0]
+            snap = part.snapshot(first_ts, columns=['ts', 'symbol', 'spot', 'strike'])
+            assert {r['spot'] for r in snap} == {100.0}
+            assert sorted(part.decoded) == ['spot', 'strike', 'symbol', 'ts']
+            assert part.snapshot(first_ts - 1) == []
+
+        latest = load_snapshot(root, 'US.SPY', '2025-01-02')
+        assert {r['spot'] for r in latest} == {101.0}
+        assert len(latest) == 20
+
+
+def test_replay_into_engines():
+    strategy, broker = build_recorder()
+    rows = parse_log(record(strategy, broker, 1))
+
+    with tempfile.TemporaryDirectory() as root:
+        append_rows(root, rows)
+        snapshot = load_snapshot(root, 'US.SPY', '2025-01-02')
+
+    combos = bull_put_spreads(load_chain(snapshot), 100.0, short_delta=(0.15, 0.45), width=(1, 3))
+    assert combos
+
+    replay = SimBroker(symbol='US.SPY')
+    replay.load_chain_rows(snapshot)
+    contract = replay.option_screener('US.SPY', option_type=OptionType.PUT, time_to_exp_start=22,
+                                      time_to_exp_end=45, strike_to_spot_start=-0.03,
+                                      strike_to_spot_end=-0.02)
+    assert contract == 'US.SPY035P97.5'
+    assert replay.bid(contract) == next(r['bid'] for r in snapshot if r['symbol'] == contract)
+
+
+if __name__ == '__main__':
+    test_recorder_cadence_and_parse()
+    test_partition_roundtrip_and_merge()
+    test_mmap_reads_only_requested_columns()
+    test_replay_into_engines()
+    print("\n🎉 期权链存档测试全部通过")
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+DCA阶梯挂单模式测试 (DCA v2.12.0 ladder_mode)
+测试重点：
+1. 各层在触发价挂GTC限价单，盘中闪跌穿越触发价时按挂单价成交，收盘价回升也不会错过
+2. 挂单成交记入 _position / _total_cost / 虚拟余额，与券商持仓一致，每层每轮高点只成交一次
+3. 创新高后撤销旧挂单，按新触发价重挂，已成交的层级重新生效
+4. 关闭阶梯模式时行为不变(不挂限价单)
+5. 撤单确认前的成交照常记账；DAY单过期(DISABLED)的挂单移出后重挂
+6. 定投和加仓下单前扣除挂单占用的资金，虚拟余额不会变为负数
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import atexit
+import contextlib
+import datetime
+import io
+import os
+
+from quant_runtime import OrderSide, OrderStatus, SimBroker, load_strategy
+
+DCA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'strategies', 'dca_strategy',
+                        'dca_free_stable.quant')
+
+
+def fill_crossed(broker, low):
+    """盘中最低价穿越挂单价的买入限价单按挂单价成交"""
+    for order_id, order in broker.orders.items():
+        if order['type'] == 'LIMIT' and order['status'] == OrderStatus.SUBMITTED and \
+                order['side'] == OrderSide.BUY and low <= order['price']:
+            broker.fill_order(order_id)
+
+
+def start_dca(overrides=None, broker=None):
+    broker = broker or SimBroker(start_time=datetime.datetime(2025, 1, 6, 10, 0))
+    series = broker.bars.setdefault((broker.symbol, None), [])
+    series.append({'open': 100.0, 'high': 100.0, 'low': 100.0, 'close': 100.0, 'volume': 0})
+    broker.prices[broker.symbol] = 100.0
+    strategy = load_strategy(DCA_PATH, broker, overrides=dict(
+        {'version_tier': 2, 'enable_profiling': False, 'custom_balance': 1000000}, **(overrides or {})))
+    with contextlib.redirect_stdout(io.StringIO()):
+        strategy.initialize()
+    atexit.unregister(strategy.dump_profile)
+    return strategy, broker
+
+
+def step(strategy, broker, low, close, output=None):
+    """一根日K线: 先按盘中最低价撮合挂单，再以收盘价运行策略"""
+    fill_crossed(broker, low)
+    broker.bars[(broker.symbol, None)].append({'open': close, 'high': close, 'low': low, 'close': close, 'volume': 0})
+    broker.prices[broker.symbol] = close
+    broker.advance(days=1)
+    with contextlib.redirect_stdout(output or io.StringIO()):
+        strategy.handle_data()
+
+
+def run_dca(bars, overrides=None):
+    """bars: [(盘中最低价, 收盘价)]"""
+    strategy, broker = start_dca(overrides)
+    output = io.StringIO()
+    for low, close in bars:
+        step(strategy, broker, low, close, output)
+    return strategy, broker, output.getvalue()
+
+
+def limit_orders(broker):
+    return [order for order in broker.orders.values() if order['type'] == 'LIMIT']
+
+
+def test_flash_drop_filled_at_trigger():
+    bars = [(100.0, 100.0)] * 3 + [(88.0, 99.0)] + [(99.0, 99.0)] * 3
+    strategy, broker, log = run_dca(bars, {'ladder_mode': True})
+    plain, plain_broker, _ = run_dca(bars)
+    assert strategy._version.startswith('v2.14.0')
+    assert not limit_orders(plain_broker)                      # 非阶梯模式收盘价回撤1%，不加仓
+
+    filled = [order for order in limit_orders(broker) if order['status'] == OrderStatus.FILLED_ALL]
+    table = {entry['layer']: entry for entry in strategy.trigger_table}
+    assert sorted(order['price'] for order in filled) == [90.0, 95.0]
+    assert sorted(order['qty'] for order in filled) == sorted([table[1]['qty'], table[2]['qty']])
+    assert strategy._ladder_triggered == {1, 2} and set(strategy.ladder_orders) == {3, 4, 5}
+    # 成交记入持仓和成本，与券商一致；已成交层级不再重复挂单
+    assert strategy._position == broker.positions[broker.symbol]
+    assert abs(strategy._total_cost - sum(order['filled_qty'] * order['avg_price']
+                                          for order in broker.orders.values() if order['filled_qty'])) < 1e-6
+    assert len(limit_orders(broker)) == 5
+    assert strategy._position > plain._position
+    assert '阶梯挂单成交: 第2层' in log
+    print(f"   闪跌至88收盘99: 阶梯模式持仓 {strategy._position}股，收盘价模式 {plain._position}股")
+
+
+def test_new_peak_replaces_ladder():
+    bars = [(100.0, 100.0)] * 2 + [(94.0, 99.0), (99.0, 110.0), (110.0, 110.0)]
+    strategy, broker, log = run_dca(bars, {'ladder_mode': True})
+    orders = limit_orders(broker)
+    cancelled = [order for order in orders if order['status'] == OrderStatus.CANCELLED_ALL]
+    resting = [order for order in orders if order['status'] == OrderStatus.SUBMITTED]
+    assert [order['price'] for order in orders if order['status'] == OrderStatus.FILLED_ALL] == [95.0]
+    assert sorted(order['price'] for order in cancelled) == [50.0, 65.0, 80.0, 90.0]
+    # 新高110后第1层重新生效，五层全部按新触发价挂出
+    assert sorted(order['price'] for order in resting) == [55.0, 71.5, 88.0, 99.0, 104.5]
+    assert strategy._ladder_triggered == set() and strategy._ladder_baseline == 110.0
+    assert '撤销4笔阶梯挂单重新挂出' in log
+
+
+def test_ladder_respects_balance():
+    strategy, broker, _ = run_dca([(100.0, 100.0)] * 2, {'ladder_mode': True, 'custom_balance': 5000})
+    reserved = sum(order['qty'] * order['price'] for order in limit_orders(broker))
+    assert 0 < reserved <= strategy.virtual_balance
+    assert len(strategy.ladder_orders) < 5
+
+
+def test_fill_during_async_cancel_is_booked():
+    broker = SimBroker(start_time=datetime.datetime(2025, 1, 6, 10, 0))
+    requested = []
+    broker.cancel_order_by_orderid = requested.append          # 撤单请求先不生效，等券商确认
+    strategy, broker = start_dca({'ladder_mode': True}, broker)
+    step(strategy, broker, 100.0, 100.0)
+    step(strategy, broker, 100.0, 110.0)                        # 新高，撤销旧挂单
+    assert len(requested) == 5 and set(requested) == set(strategy._ladder_cancelling)
+    old_95 = [order for order in strategy._ladder_cancelling.values() if order['price'] == 95.0]
+    # 确认到达前旧的95挂单被闪跌成交，随后其余撤单确认
+    broker.fill_order(old_95[0]['order_id'])
+    for order_id in requested:
+        SimBroker.cancel_order_by_orderid(broker, order_id)
+    step(strategy, broker, 110.0, 110.0)
+    assert strategy._ladder_cancelling == {}
+    assert strategy._position == broker.positions[broker.symbol] > 0
+    assert abs(strategy._total_cost - sum(order['filled_qty'] * order['avg_price']
+                                          for order in broker.orders.values() if order['filled_qty'])) < 1e-6
+
+
+def test_disabled_order_replaced():
+    strategy, broker = start_dca({'ladder_mode': True})
+    step(strategy, broker, 100.0, 100.0)
+    first = strategy.ladder_orders[5]['order_id']
+    broker.orders[first]['status'] = OrderStatus.DISABLED
+    step(strategy, broker, 100.0, 100.0)
+    assert strategy.ladder_orders[5]['order_id'] != first
+    assert len(strategy.ladder_orders) == 5
+
+
+def test_scheduled_buys_respect_ladder_reservation():
+    bars = [(100.0, 100.0)] * 40 + [(45.0, 100.0), (100.0, 100.0)]
+    strategy, broker, _ = run_dca(bars, {'ladder_mode': True, 'custom_balance': 20000, 'custom_interval_min': 1440,
+                                         'interval_mode': 2})
+    filled = [order for order in limit_orders(broker) if order['status'] == OrderStatus.FILLED_ALL]
+    assert filled and strategy.virtual_balance >= 0
+    assert strategy._position == broker.positions[broker.symbol]
+
+
+if __name__ == '__main__':
+    test_flash_drop_filled_at_trigger()
+    test_new_peak_replaces_ladder()
+    test_ladder_respects_balance()
+    test_fill_during_async_cancel_is_booked()
+    test_disabled_order_replaced()
+    test_scheduled_buys_respect_ladder_reservation()
+    print("\n🎉 阶梯挂单模式测试全部通过")
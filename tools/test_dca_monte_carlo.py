@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+DCA蒙特卡洛评估引擎测试 (dca_monte_carlo.py)
+测试重点：
+1. 引擎结果与离线运行时逐日回放 dca_free_stable.quant 完全一致(免费版/付费版)
+2. 体验券一次性加仓、各回撤层级与极端回撤保护
+3. 预设股数按版本规则校验
+4. 多进程评估与单进程一致，吞吐量
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import contextlib
+import datetime
+import io
+import os
+import time
+from array import array
+
+from dca_monte_carlo import evaluate, scenario, standard_scenarios, summarize
+from path_generator import PathMatrix, generate_paths
+from quant_runtime import SimBroker, load_strategy
+
+STRATEGY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                             'strategies', 'dca_strategy', 'dca_free_stable.quant')
+
+
+def replay_strategy(prices, version_tier, qty, balance):
+    """用离线运行时逐日运行未修改的策略文件，返回 (现金, 持仓)"""
+    broker = SimBroker(cash=balance, start_time=datetime.datetime(2025, 1, 6, 10, 0))
+    bars = broker.bars.setdefault((broker.symbol, None), [])
+    bars.append({'open': prices[0], 'high': prices[0], 'low': prices[0], 'close': prices[0], 'volume': 0})
+    broker.prices[broker.symbol] = prices[0]
+    strategy = load_strategy(STRATEGY_PATH, broker, overrides={
+        'qty': qty, 'version_tier': version_tier, 'custom_balance': balance, 'enable_profiling': False})
+    with contextlib.redirect_stdout(io.StringIO()):
+        strategy.initialize()
+        for day, price in enumerate(prices):
+            if day:
+                bars.append({'open': price, 'high': price, 'low': price, 'close': price, 'volume': 0})
+                broker.advance(days=3 if broker.now.weekday() == 4 else 1)
+            broker.prices[broker.symbol] = price
+            strategy.handle_data()
+    return strategy.virtual_balance, strategy._position
+
+
+def crafted_matrix(rows):
+    matrix = PathMatrix.create(len(rows), len(rows[0]))
+    for i, prices in enumerate(rows):
+        matrix.row(i)[:] = array('d', prices)
+    return matrix
+
+
+def test_matches_strategy_replay():
+    with generate_paths('gbm', 6, 260, s0=100.0, seed=21, mu=0.0, sigma=0.35) as paths:
+        for version_tier, balance in ((1, 100000), (2, 200000)):
+            config = scenario(version_tier, qty=20, balance=balance)
+            result = evaluate(paths, config)
+            for i in range(paths.n_paths):
+                cash, position = replay_strategy(paths.row(i).tolist(), version_tier, 20, balance)
+                assert position == result['position'][i], (version_tier, i)
+                assert abs(cash - result['cash'][i]) < 1e-6
+            summary = summarize(result)
+            print(f"   {config['label']}: 回放一致 | 资金耗尽路径 {summary['exhausted_ratio']:.0%}")
+            assert summary['exhausted_ratio'] > 0
+
+
+def test_voucher_layers_and_extreme():
+    free_path = [100.0, 100.0, 89.0, 88.0, 87.0, 86.0, 85.0, 84.0]
+    paid_path = [100.0, 94.0, 88.0, 70.0, 60.0, 45.0, 39.0, 39.0]
+    with crafted_matrix([free_path]) as free, crafted_matrix([paid_path]) as paid:
+        plain = evaluate(free, scenario(1, qty=20))
+        voucher = evaluate(free, scenario(1, qty=20, voucher=True))
+        # 第0天定投20股；第2天回撤11%使用体验券加仓40股，下次定投顺延到第7天
+        assert plain['position'][0] == 40
+        assert voucher['position'][0] == 80
+        assert voucher['voucher_day'][0] == 2
+
+        result = evaluate(paid, scenario(2, qty=20, balance=1000000))
+        # 每层各触发一次，第6、7天回撤≥60%只做常规定投
+        assert [counts[0] for counts in result['layer_triggers']] == [1, 1, 1, 1, 1]
+        assert result['position'][0] == 20 + 30 + 40 + 60 + 80 + 100 + 20 + 20
+        assert result['exhausted_day'][0] == -1
+
+
+def test_preset_quantities():
+    assert [scenario(2, preset_mode=m)['base_qty'] for m in (1, 2, 3)] == [10, 15, 25]
+    # 免费版只接受10的倍数
+    assert [scenario(1, preset_mode=m)['base_qty'] for m in (1, 2, 3)] == [10, 10, 10]
+    assert scenario(1, preset_mode=3, voucher=True)['voucher_qty'] == 50
+    assert scenario(2, qty=20, aggressive_multiplier=3.0)['layers'][-1] == (50.0, 250)
+    assert scenario(2, qty=20, balance=20000)['interval_days'] == 10
+    assert len(standard_scenarios()) == 9
+
+
+def test_workers_and_throughput():
+    with generate_paths('gbm', 2000, 2500, s0=100.0, seed=3, sigma=0.25) as paths:
+        config = scenario(2, preset_mode=2, balance=1e9)
+        started = time.perf_counter()
+        single = evaluate(paths, config)
+        elapsed = time.perf_counter() - started
+        print(f"   付费版 2000条×2500天(资金充足，全程模拟) 评估 {elapsed:.2f}秒")
+        assert elapsed < 10.0
+
+        parallel = evaluate(paths, config, workers=2)
+        assert parallel['cash'].tolist() == single['cash'].tolist()
+        assert [c.tolist() for c in parallel['layer_triggers']] == [c.tolist() for c in single['layer_triggers']]
+
+        summary = summarize(single)
+        assert summary['exhausted_ratio'] == 0
+        assert summary['layers'][0]['hit_ratio'] > summary['layers'][-1]['hit_ratio']
+        assert summary['return'][5] < summary['return'][50] < summary['return'][95]
+
+
+if __name__ == '__main__':
+    test_matches_strategy_replay()
+    test_voucher_layers_and_extreme()
+    test_preset_quantities()
+    test_workers_and_throughput()
+    print("\n🎉 DCA蒙特卡洛评估测试全部通过")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+DCA数据收集序列导出测试 (DCA v2.14.0 series_chunk_bars / dca_series_importer.py)
+测试重点：
+1. 数据收集模式逐根K线写入预分配数组，攒满一批输出一行DCASER，退出时输出剩余部分
+2. 序列的价格、持仓、成本、回撤、层级与逐根K线的策略状态一致
+3. 日志导入价格库：截断行跳过，重复导入按K线序号合并，不产生重复行
+4. 状态日志只在每批序列输出后做快照，不再逐根K线输出DCAJ和逐笔成交行
+5. series_chunk_bars=0 时保持旧版每10天一行的进度输出
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import atexit
+import contextlib
+import datetime
+import io
+import os
+import tempfile
+
+from dca_series_importer import import_series_log, load_series, parse_series_log, summarize
+from dca_state_journal import latest_state
+from quant_runtime import SimBroker, load_strategy
+from test_rolling_highs import price_path
+
+DCA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'strategies', 'dca_strategy',
+                        'dca_free_stable.quant')
+
+
+def run_collection(prices, overrides=None):
+    """数据收集模式逐日运行，返回 (策略, 日志行, 逐根K线状态)"""
+    broker = SimBroker(start_time=datetime.datetime(2025, 1, 6, 10, 0))
+    series = broker.bars.setdefault((broker.symbol, None), [])
+    series.append({'open': prices[0], 'high': prices[0], 'low': prices[0], 'close': prices[0], 'volume': 0})
+    broker.prices[broker.symbol] = prices[0]
+    strategy = load_strategy(DCA_PATH, broker, overrides=dict(
+        {'version_tier': 2, 'data_collection_mode': 1, 'enable_profiling': False, 'state_journal': False,
+         'custom_balance': 100000000}, **(overrides or {})))
+    output = io.StringIO()
+    truth = []
+    with contextlib.redirect_stdout(output):
+        strategy.initialize()
+        atexit.unregister(strategy.dump_profile)
+        atexit.unregister(strategy.flush_collection_series)
+        for price in prices:
+            series.append({'open': price, 'high': price, 'low': price, 'close': price, 'volume': 0})
+            broker.prices[broker.symbol] = price
+            broker.advance(days=1)
+            strategy.handle_data()
+            truth.append((strategy.bar_index, price, strategy._position, strategy._total_cost,
+                          (strategy.run_highest_price - price) / strategy.run_highest_price * 100))
+        strategy.flush_collection_series()                  # 平台退出时由atexit调用
+    return strategy, output.getvalue().splitlines(), truth
+
+
+def test_series_matches_strategy_state():
+    prices = price_path(600, seed=5)
+    strategy, lines, truth = run_collection(prices)
+    assert strategy._version.startswith('v2.14.0')
+    chunks = [line for line in lines if line.startswith('DCASER|v1|')]
+    assert [line.split('|')[3:5] for line in chunks] == [['1', '250'], ['2', '250'], ['3', '100']]
+    assert not any(line.startswith('📊 数据收集第') for line in lines)      # 旧的逐10天进度行
+
+    columns = parse_series_log(lines)['US.SPY']
+    assert list(columns['bar']) == [row[0] for row in truth] == list(range(1, 601))
+    for i, (_, price, position, cost, drawdown) in enumerate(truth):
+        assert abs(columns['price'][i] - price) < 1e-4
+        assert columns['position'][i] == position
+        assert abs(columns['cost'][i] - cost) < 0.01
+        assert abs(columns['drawdown'][i] - drawdown) < 1e-3
+        assert columns['layer'][i] == sum(drawdown >= layer for layer in strategy.drawdown_layers)
+    assert max(columns['layer']) >= 2
+    print(f"   600根K线 → {len(chunks)} 行DCASER，最大回撤 {max(columns['drawdown']):.1f}%")
+
+
+def test_buffer_preallocated():
+    strategy, _, _ = run_collection(price_path(30), {'series_chunk_bars': 8})
+    buffers = [id(column) for column in strategy._series_columns]
+    assert [len(column) for column in strategy._series_columns] == [8] * 6
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(20):
+            strategy.handle_data()
+    assert [id(column) for column in strategy._series_columns] == buffers
+    assert [len(column) for column in strategy._series_columns] == [8] * 6
+    assert strategy._series_size == 20 % 8
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert strategy.flush_collection_series() == 4
+
+
+def test_import_and_merge():
+    _, lines, truth = run_collection(price_path(300, seed=9), {'series_chunk_bars': 100})
+    chunks = [line for line in lines if 'DCASER|v1|' in line]
+    truncated = chunks[1][:len(chunks[1]) // 2]
+    with tempfile.TemporaryDirectory() as root:
+        result = import_series_log(['2025-01-02 09:31:00 ' + chunks[0], truncated, '其他日志'], root)
+        assert result == {'US.SPY': (100, 100)}
+        # 重新导入完整日志: 与已有的前100行合并，不产生重复
+        assert import_series_log(lines, root) == {'US.SPY': (300, 300)}
+        assert import_series_log(lines, root) == {'US.SPY': (300, 300)}
+        stored = load_series('US.SPY', root)
+        assert list(stored['bar']) == list(range(1, 301))
+        assert list(stored['position']) == [row[2] for row in truth]
+        info = summarize(stored)
+        assert info['position'] == truth[-1][2] and abs(info['cost'] - truth[-1][3]) < 0.01
+        assert sum(info['layer_bars'].values()) == 300
+
+
+def test_journal_snapshots_per_chunk():
+    strategy, lines, _ = run_collection(price_path(250), {'series_chunk_bars': 100, 'state_journal': True})
+    _, state = latest_state(lines)
+    assert sum(line.startswith('DCASNAP|') for line in lines) == 1 + 3        # 初始化 + 每批一次
+    assert not any(line.startswith('DCAJ|') or line.startswith('📊 数据收集模式:') for line in lines)
+    assert state['_position'] == strategy._position and state['bar_index'] == 250
+    print(f"   250根K线共输出 {len(lines)} 行日志")
+
+
+def test_legacy_progress_when_disabled():
+    strategy, lines, _ = run_collection(price_path(30), {'series_chunk_bars': 0})
+    assert strategy._series_columns is None
+    assert not any('DCASER|' in line for line in lines)
+    assert sum(line.startswith('📊 数据收集第') for line in lines) == 3
+
+
+if __name__ == '__main__':
+    test_series_matches_strategy_state()
+    test_buffer_preallocated()
+    test_import_and_merge()
+    test_journal_snapshots_per_chunk()
+    test_legacy_progress_when_disabled()
+    print("\n🎉 DCA数据收集序列导出测试全部通过")
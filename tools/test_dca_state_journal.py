@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+DCA状态日志与快照恢复测试 (DCA v2.13.0 / dca_state_journal.py)
+测试重点：
+1. 运行中途"崩溃"后用快照重启，最终持仓、成本与不中断运行完全一致
+2. 恢复后不重复投资、不重新发放体验券，不再请求200日历史数据
+3. 日志合并：重复行、截断行、新会话快照；文件日志合并快照后可继续追加
+4. 标的不一致或快照损坏时按全新启动处理
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import atexit
+import contextlib
+import datetime
+import io
+import os
+import tempfile
+
+from dca_state_journal import StateJournal, latest_state, merge, parse_line, snapshot_line
+from quant_runtime import CallCounter, SimBroker, load_strategy
+from test_rolling_highs import price_path
+
+DCA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'strategies', 'dca_strategy',
+                        'dca_free_stable.quant')
+
+
+class Session:
+    """同一个券商账户上可多次重启的DCA策略"""
+
+    def __init__(self, prices, overrides=None):
+        self.prices = prices
+        self.overrides = dict({'enable_profiling': False, 'custom_balance': 1000000}, **(overrides or {}))
+        self.broker = SimBroker(start_time=datetime.datetime(2025, 1, 6, 10, 0))
+        self.series = self.broker.bars.setdefault((self.broker.symbol, None), [])
+        self.series.append({'open': 100.0, 'high': 100.0, 'low': 100.0, 'close': 100.0, 'volume': 0})
+        self.broker.prices[self.broker.symbol] = 100.0
+        self.bar = 0
+
+    def start(self, stream, restore=None):
+        self.counter = CallCounter()
+        overrides = dict(self.overrides, **(restore or {}))
+        self.strategy = load_strategy(DCA_PATH, self.broker, overrides=overrides, counter=self.counter)
+        with contextlib.redirect_stdout(stream):
+            self.strategy.initialize()
+        atexit.unregister(self.strategy.dump_profile)
+        return self.strategy
+
+    def run(self, stream, bars):
+        with contextlib.redirect_stdout(stream):
+            for price in self.prices[self.bar:self.bar + bars]:
+                self.series.append({'open': price, 'high': price, 'low': price, 'close': price, 'volume': 0})
+                self.broker.prices[self.broker.symbol] = price
+                self.broker.advance(days=1)
+                self.strategy.handle_data()
+        self.bar += bars
+
+
+def test_crash_and_restore_matches_continuous_run():
+    prices = price_path(60, seed=8)
+    continuous = Session(prices)
+    continuous.start(io.StringIO())
+    continuous.run(io.StringIO(), 60)
+
+    with tempfile.TemporaryDirectory() as root:
+        journal = StateJournal(root, compact_every=15)
+        crashed = Session(prices)
+        stream = journal.stream()
+        crashed.start(stream)
+        crashed.run(stream, 25)
+        before = crashed.strategy
+        # 崩溃：丢弃策略对象，按文件中的状态重启
+        restore = journal.restore_overrides()
+        stream = journal.stream()
+        restored = crashed.start(stream, restore)
+        assert crashed.counter.counts.get('bar_custom') is None       # 不再请求历史数据
+        assert '♻️ 已从快照恢复状态' in stream.output.getvalue()
+        for name in ('_position', '_total_cost', 'run_highest_price', 'last_investment_time', 'virtual_balance',
+                     'trial_voucher_used'):
+            assert getattr(restored, name) == getattr(before, name), name
+        crashed.run(stream, 35)
+        assert os.path.getsize(os.path.join(root, 'snapshot.json')) > 0
+
+    assert crashed.strategy._position == continuous.strategy._position
+    assert abs(crashed.strategy._total_cost - continuous.strategy._total_cost) < 1e-6
+    assert crashed.broker.positions == continuous.broker.positions
+    print(f"   第25根K线重启: 持仓 {crashed.strategy._position}股，与不中断运行一致")
+
+
+def test_restart_does_not_reinvest_or_reoffer_voucher():
+    prices = [100.0, 99.0, 98.0, 97.0, 96.0]
+    session = Session(prices, {'version_tier': 1})
+    output = io.StringIO()
+    session.start(output)
+    session.run(output, 1)                                          # 首日定投
+    with contextlib.redirect_stdout(output):
+        assert session.strategy.calculate_add_position_qty(11.0) > 0   # 用掉体验券
+    session.run(output, 1)
+    strategy = session.strategy
+    orders = len(session.broker.orders)
+    _, state = latest_state(output.getvalue().splitlines())
+    assert state['trial_voucher_used'] is True and state['_position'] == strategy._position > 0
+
+    # 不恢复: 立即重新定投；恢复: 周定投间隔未到，不下单，体验券保持已用
+    fresh = Session(prices, {'version_tier': 1})
+    fresh.start(io.StringIO())
+    fresh.bar = 2
+    fresh.run(io.StringIO(), 1)
+    assert len(fresh.broker.orders) == 1
+    session.start(io.StringIO(), {'restore_state': snapshot_line(*latest_state(output.getvalue().splitlines()))})
+    session.run(io.StringIO(), 3)
+    assert len(session.broker.orders) == orders
+    assert session.strategy.trial_voucher_used and session.strategy._position == strategy._position
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert not session.strategy.calculate_add_position_qty(11.0)
+
+
+def test_merge_and_file_journal():
+    lines = [
+        '2025-01-02 09:31:00 DCASNAP|v1|1|{"symbol":"US.SPY","_position":0,"run_highest_price":100.0}',
+        'DCAJ|v1|2|{"_position":20}',
+        'DCAJ|v1|2|{"_position":20}',                           # 重复行
+        '其他日志',
+        'DCAJ|v1|3|{"_position":40,"run_highest_price":101.5}',
+        'DCAJ|v1|4|{"_position":6',                             # 截断行
+    ]
+    seq, state = latest_state(lines)
+    assert seq == 3 and state['_position'] == 40 and state['run_highest_price'] == 101.5
+    assert parse_line(lines[-1]) is None and parse_line('DCAJ|v1|x') is None
+    # 新会话从序号1的快照重新开始
+    seq, state = merge([parse_line('DCASNAP|v1|1|{"_position":5}')], 3, {'_position': 40})
+    assert state == {'_position': 5}
+
+    with tempfile.TemporaryDirectory() as root:
+        journal = StateJournal(root, compact_every=2)
+        assert journal.restore_overrides() == {}
+        for line in lines[:3]:
+            journal.append(line)
+        assert os.path.getsize(journal.journal_path) > 0              # 第3行尚未合并
+        with open(journal.journal_path, 'a', encoding='utf-8') as f:
+            f.write('DCAJ|v1|3|{"_posi')                              # 崩溃时写到一半
+        journal = StateJournal(root, compact_every=2)
+        assert journal.load() == (2, {'symbol': 'US.SPY', '_position': 20, 'run_highest_price': 100.0})
+        journal.append(lines[4])
+        restore = StateJournal(root).restore_overrides()['restore_state']
+    assert restore.startswith('DCASNAP|v1|3|') and '"_position":40' in restore
+
+
+def test_invalid_snapshot_falls_back():
+    for text in ('DCASNAP|v1|4|{"symbol":"US.QQQ","run_highest_price":50.0,"_position":9}',
+                 'DCASNAP|v1|4|{"symbol":"US.SPY",',
+                 '{"symbol":"US.SPY","_position":9}'):
+        session = Session([100.0])
+        output = io.StringIO()
+        strategy = session.start(output, {'restore_state': text})
+        assert strategy._position == 0 and session.counter.counts.get('bar_custom') == 1
+        assert '♻️' not in output.getvalue()
+
+
+if __name__ == '__main__':
+    test_crash_and_restore_matches_continuous_run()
+    test_restart_does_not_reinvest_or_reoffer_voucher()
+    test_merge_and_file_journal()
+    test_invalid_snapshot_falls_back()
+    print("\n🎉 DCA状态日志与快照恢复测试全部通过")
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+订单成交分析测试 (order_analyzer.moo / fill_analytics.py / 网格 v5.3.16 部分成交比例)
+测试重点：
+1. 分析器在离线运行时中轮询订单状态，输出的OFILL日志包含受理/成交延迟、滑点和部分成交
+   收尾平仓单下单失败时记录错误和未平仓位，仍输出统计报告
+2. 日志解析(带行首前缀、重复行)、延迟直方图、按类型和时段的成交率
+3. 校准的成交模型可保存/加载，抽样频率符合校准值
+4. 回测券商按成交模型部分成交，网格使用校准比例后记录持仓与券商一致
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import contextlib
+import datetime
+import io
+import os
+import random
+import tempfile
+from unittest import mock
+
+from fill_analytics import FillModel, analyze, calibrate, format_report, latency_histogram, parse_log, time_bucket
+from quant_runtime import OrderSide, OrderStatus, SimBroker, load_strategy
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+ANALYZER_PATH = os.path.join(TOOLS_DIR, 'order_analyzer.moo')
+GRID_PATH = os.path.join(TOOLS_DIR, '..', 'strategies', 'grid_strategy', 'grid_trading_v5.3.quant')
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class LatencyBroker(SimBroker):
+    """订单提交后 ack_delay 秒受理，fill_delay 秒成交；市价单按滑点全部成交，限价单只成交一部分"""
+
+    def __init__(self, clock, ack_delay=0.3, fill_delay=0.8, slippage=0.0005, limit_fill=4):
+        super().__init__()
+        self.clock = clock
+        self.ack_delay = ack_delay
+        self.fill_delay = fill_delay
+        self.slippage = slippage
+        self.limit_fill = limit_fill
+
+    def _new_order(self, symbol, price, qty, side, order_type):
+        order_id = super()._new_order(symbol, price, qty, side, order_type)
+        self.orders[order_id].update(status=OrderStatus.SUBMITTING, placed=self.clock.now)
+        return order_id
+
+    def place_market(self, symbol, qty, side=None, time_in_force=None):
+        return self._new_order(symbol, None, qty, side, 'MARKET')
+
+    def order_status(self, order_id=None, orderid=None):
+        order = self.orders[order_id or orderid]
+        elapsed = self.clock.now - order['placed']
+        if order['status'] == OrderStatus.SUBMITTING and elapsed >= self.ack_delay:
+            order['status'] = OrderStatus.SUBMITTED
+        if order['status'] == OrderStatus.SUBMITTED and elapsed >= self.fill_delay:
+            if order['type'] == 'MARKET':
+                sign = 1 if order['side'] == OrderSide.BUY else -1
+                self.fill_order(order_id or orderid, price=self.prices[order['symbol']] * (1 + sign * self.slippage))
+            else:
+                self.fill_order(order_id or orderid, qty=self.limit_fill)
+        return order['status']
+
+
+class FailingCloseBroker(LatencyBroker):
+    """第 fail_at 笔订单下单时抛出异常"""
+
+    def __init__(self, clock, fail_at):
+        super().__init__(clock)
+        self.fail_at = fail_at
+
+    def place_market(self, symbol, qty, side=None, time_in_force=None):
+        if len(self.orders) + 1 == self.fail_at:
+            raise RuntimeError('网络中断')
+        return super().place_market(symbol, qty, side, time_in_force)
+
+
+def run_analyzer(broker=None):
+    clock = broker.clock if broker else FakeClock()
+    broker = broker or LatencyBroker(clock)
+    broker.prices[broker.symbol] = 100.0
+    strategy = load_strategy(ANALYZER_PATH, broker, overrides={
+        'orders_per_run': 6, 'test_qty': 10, 'poll_interval_sec': 0.1, 'order_timeout_sec': 2})
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), mock.patch('time.time', clock.time), \
+            mock.patch('time.sleep', clock.sleep):
+        strategy.initialize()
+        for _ in range(10):
+            strategy.handle_data()
+            broker.advance(minutes=5)
+    return strategy, broker, output.getvalue()
+
+
+def test_analyzer_records_order_flow():
+    strategy, broker, log = run_analyzer()
+    records = parse_log(log.splitlines())
+    # 6笔测试单 + 1笔收尾卖出，净持仓回到0
+    assert len(records) == 7 and strategy.complete
+    assert broker.positions[broker.symbol] == 0 and strategy.net_qty == 0
+    market = [r for r in records if r['type'] == 'MARKET']
+    limit = [r for r in records if r['type'] == 'LIMIT']
+    assert all(r['status'] == 'FILLED_ALL' and r['filled_qty'] == r['qty'] for r in market)
+    assert all(r['status'] == 'CANCELLED_PART' and r['filled_qty'] == 4 for r in limit)
+    for record in market:
+        assert 300 <= record['ack_ms'] <= 400 and 800 <= record['fill_ms'] <= 900
+    assert all(r['fill_ms'] < 2000 <= r['done_ms'] for r in limit)    # 超时撤单后完结
+    print(f"   {len(records)}笔测试单: 市价受理 {market[0]['ack_ms']}ms 成交 {market[0]['fill_ms']}ms")
+    assert '========== 订单成交分析 ==========' in log
+
+    analysis = analyze(records)
+    assert abs(analysis['by_type']['MARKET']['slippage_bps'] - 5.0) < 0.01
+    assert analysis['by_type']['MARKET']['fill_rate'] == 1.0
+    assert analysis['by_type']['LIMIT']['partial_rate'] == 1.0
+    assert abs(analysis['by_type']['LIMIT']['partial_ratio'] - 0.4) < 1e-9
+    assert '受理延迟分布' in format_report(analysis)
+
+
+def test_analyzer_close_failure_logged():
+    """收尾卖出抛异常时不中断运行：记录失败和剩余净持仓，照常输出报告并结束"""
+    strategy, broker, log = run_analyzer(FailingCloseBroker(FakeClock(), fail_at=7))
+    assert len(parse_log(log.splitlines())) == 6 and strategy.complete
+    assert '收尾平仓单失败: 网络中断' in log
+    assert f"净持仓 {strategy.net_qty}股" in log and strategy.net_qty == broker.positions[broker.symbol] > 0
+    assert '========== 订单成交分析 ==========' in log
+
+
+def test_parse_and_aggregate():
+    lines = [
+        '2025-01-02 09:31:00 OFILL|v1|2025-01-02 09:31:00|A1|US.SPY|B|M|10||100|120|450|450|10|100.02|FILLED_ALL',
+        'OFILL|v1|2025-01-02 09:31:00|A1|US.SPY|B|M|10||100|120|450|450|10|100.02|FILLED_ALL',     # 重复行
+        'OFILL|v1|2025-01-02 09:45:00|A2|US.SPY|S|L|10|100.1|100|130|||0||CANCELLED_ALL',
+        'OFILL|v1|2025-01-02 10:05:00|A3|US.SPY|S|M|10||100|90|30000|61000|5|99.99|CANCELLED_PART',
+        '其他日志行',
+        'OFILL|v1|truncated',
+    ]
+    records = parse_log(lines)
+    assert [r['order_id'] for r in records] == ['A1', 'A2', 'A3']
+    assert records[1]['avg_price'] is None and records[1]['fill_ms'] is None
+    assert time_bucket('2025-01-02 09:59:59') == '09:30'
+    assert time_bucket('2025-01-02 10:05:00', 60) == '10:00'
+
+    analysis = analyze(records)
+    market = analysis['by_type']['MARKET']
+    assert market['filled'] == 1 and market['partial'] == 1 and market['partial_ratio'] == 0.5
+    assert abs(market['slippage_bps'] - 1.5) < 1e-9      # 买入+2bp，卖出+1bp
+    assert analysis['by_time']['MARKET']['09:30']['fill_rate'] == 1.0
+    assert analysis['by_time']['MARKET']['10:00']['any_fill_rate'] == 1.0
+    assert analysis['by_type']['LIMIT']['unfilled'] == 1
+    histogram = dict(latency_histogram([5, 10, 11, 61000]))
+    assert histogram['≤10ms'] == 2 and histogram['≤25ms'] == 1 and histogram['>60000ms'] == 1
+
+
+def test_calibrated_model_sampling():
+    rng = random.Random(2)
+    lines = []
+    for i in range(400):
+        filled = 10 if i % 4 else (6 if i % 8 else 0)
+        status = 'FILLED_ALL' if filled == 10 else ('CANCELLED_PART' if filled else 'CANCELLED_ALL')
+        avg = f"{100 * (1 + rng.choice((2, 4)) / 10000):.4f}" if filled else ''
+        stamp = f"2025-01-02 {9 + i % 6:02d}:40:00"
+        lines.append(f"OFILL|v1|{stamp}|O{i}|US.SPY|B|M|10||100|50|200|200|{filled}|{avg}|{status}")
+    model = calibrate(parse_log(lines))
+    params = model.params('MARKET')
+    assert params['fill_rate'] == 0.75 and params['partial_rate'] == 0.125
+    assert abs(params['partial_ratio'] - 0.6) < 1e-9 and 2.0 < params['slippage_bps'] < 4.0
+    assert model.strategy_overrides() == {'partial_fill_ratio': 0.6, 'live_partial_fill_ratio': 0.6}
+
+    with tempfile.TemporaryDirectory() as root:
+        loaded = FillModel.load(model.save(os.path.join(root, 'fill_model.json')))
+    assert loaded.to_dict() == model.to_dict()
+
+    outcomes = {}
+    sampler = random.Random(5)
+    for _ in range(8000):
+        filled, price = loaded.fill('MARKET', OrderSide.BUY, 10, 100.0, sampler)
+        outcomes[filled] = outcomes.get(filled, 0) + 1
+    assert set(outcomes) == {0, 6, 10} and price > 100.0
+    assert abs(outcomes[10] / 8000 - 0.75) < 0.03 and abs(outcomes[6] / 8000 - 0.125) < 0.02
+    # 10:30时段的样本(奇数序号)全部成交，按时段成交率抽样
+    late = datetime.datetime(2025, 1, 3, 10, 45)
+    assert model.by_time['MARKET']['10:30']['fill_rate'] == 1.0
+    assert all(loaded.fill('MARKET', OrderSide.BUY, 10, 100.0, sampler, when=late)[0] == 10 for _ in range(200))
+    # 没有样本的订单类型按默认全部成交
+    assert FillModel().fill('LIMIT', OrderSide.SELL, 10, 50.0, sampler) == (10, 50.0)
+
+
+def test_grid_uses_calibrated_partial_ratio():
+    model = FillModel({'MARKET': {'fill_rate': 0.0, 'partial_rate': 1.0, 'partial_ratio': 0.5}})
+    results = {}
+    for label, overrides in (('默认', {}), ('校准', model.strategy_overrides())):
+        broker = SimBroker(fill_model=model)
+        broker.prices[broker.symbol] = 100.0
+        strategy = load_strategy(GRID_PATH, broker, overrides=dict(overrides, enable_profiling=False))
+        with contextlib.redirect_stdout(io.StringIO()), mock.patch('time.sleep'):
+            strategy.trigger_symbols()
+            strategy.initialize()
+            for price in (100.0, 96.9, 93.9):
+                broker.prices[broker.symbol] = price
+                broker.advance(minutes=30)
+                strategy.handle_data()
+        results[label] = (strategy.total_position, broker.positions[broker.symbol])
+        assert all(order['status'] == OrderStatus.CANCELLED_PART for order in broker.orders.values())
+    print(f"   策略记录/券商持仓: 默认80% {results['默认']} | 校准50% {results['校准']}")
+    assert results['校准'][0] == results['校准'][1] > 0
+    assert results['默认'][0] > results['默认'][1]
+
+
+if __name__ == '__main__':
+    test_analyzer_records_order_flow()
+    test_analyzer_close_failure_logged()
+    test_parse_and_aggregate()
+    test_calibrated_model_sampling()
+    test_grid_uses_calibrated_partial_ratio()
+    print("\n🎉 订单成交分析测试全部通过")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Moomoo历史订单流式导入测试 (fills_importer.py)
+测试重点：
+1. 带BOM的中文表头导出文件，跳过未成交和已撤销的行
+2. 按标的分区存储，成交按时间排序
+3. 重复导入和重叠导出按订单号去重；没有订单号的导出重新排序或拼接后重复导入也不产生重复
+4. 每日VWAP与买卖分项
+5. 大文件流式解析的内存占用和导入耗时
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import os
+import tempfile
+import time
+import tracemalloc
+
+from extract_spy_prices import extract_spy_prices
+from fills_importer import daily_vwap, import_export, iter_fills, load_fills
+
+HEADER = ['方向', '代码', '名称', '订单价格', '订单数量', '交易状态', '成交数量', '成交价格',
+          '成交金额', '下单时间', '成交时间', '订单号', '市场', '合计费用']
+
+
+def row(side, code, qty, price, filled_time, order_id, status='全部成交', fee='1.00'):
+    amount = f"{qty * price:,.2f}" if qty else ''
+    return [side, code, code, f"{price:.2f}", str(qty or 10), status, str(qty or ''), f"{price:.2f}" if qty else '',
+            f'"{amount}"' if amount else '', filled_time, filled_time if qty else '', order_id, 'US', fee]
+
+
+def write_export(path, rows):
+    """Moomoo导出为带BOM的UTF-8 CSV，最新的订单在前"""
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        f.write(','.join(HEADER) + '\r\n')
+        for r in rows:
+            f.write(','.join(r) + '\r\n')
+
+
+SAMPLE = [
+    row('卖出', 'SPY', 5, 560.00, '2024/08/02 15:00:00', 'A006'),
+    row('买入', 'QQQ', 10, 470.00, '2024/08/02 10:00:00', 'A005'),
+    row('买入', 'SPY', 10, 550.00, '2024/08/02 09:31:00', 'A004'),
+    row('买入', 'SPY', 0, 540.00, '2024/08/01 11:00:00', 'A003', status='已撤单', fee=''),
+    row('买入', 'SPY', 20, 552.00, '2024/08/01 09:30:05 (美东)', 'A002'),
+    row('买入', 'SPY', 10, 552.50, '2024/08/01 09:30:00', 'A002'),
+    row('买入', 'SPY', 10, 551.00, '2024/08/01 09:30:00', 'A001'),
+]
+
+
+def test_parse_bom_and_skip_unfilled():
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'orders_his.csv')
+        write_export(path, SAMPLE)
+        fills = list(iter_fills(path))
+        assert len(fills) == 6
+        assert {f['symbol'] for f in fills} == {'US.SPY', 'US.QQQ'}
+        assert fills[0]['side'] == -1 and fills[1]['side'] == 1
+        assert fills[3]['trade_time'].endswith('(美东)')
+        assert abs(fills[2]['amount'] - 5500.0) < 1e-9
+
+
+def test_partition_dedupe_and_vwap():
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'orders_his.csv')
+        write_export(path, SAMPLE)
+        store = os.path.join(root, 'store')
+
+        summary = import_export(path, store, chunk_rows=2)
+        assert summary['US.SPY'] == {'added': 5, 'duplicates': 0, 'rows': 5}
+        assert summary['US.QQQ']['rows'] == 1
+
+        # 重复导入整份文件，以及与之重叠的新导出
+        assert import_export(path, store)['US.SPY'] == {'added': 0, 'duplicates': 5, 'rows': 5}
+        newer = os.path.join(root, 'orders_his_new.csv')
+        write_export(newer, [row('买入', 'SPY', 10, 565.00, '2024/08/05 09:30:00', 'A007')] + SAMPLE[:3])
+        assert import_export(newer, store)['US.SPY'] == {'added': 1, 'duplicates': 2, 'rows': 6}
+
+        with load_fills('US.SPY', root=store) as fills:
+            stamps = list(fills.ts)
+            assert stamps == sorted(stamps)
+            assert list(fills.qty) == [10.0, 10.0, 20.0, 10.0, 5.0, 10.0]
+        with load_fills('US.SPY', start='2024-08-02', end='2024-08-02', root=store) as fills:
+            assert len(fills) == 2
+
+        days = daily_vwap('US.SPY', root=store)
+        print(f"   SPY每日VWAP: {[(d['date'], round(d['vwap'], 4)) for d in days]}")
+        assert [d['date'] for d in days] == ['2024-08-01', '2024-08-02', '2024-08-05']
+        first = days[0]
+        assert abs(first['vwap'] - (551.0 * 10 + 552.5 * 10 + 552.0 * 20) / 40) < 1e-9
+        assert first['fills'] == 3 and first['sell_vwap'] is None
+        second = days[1]
+        assert second['buy_qty'] == 10 and second['sell_qty'] == 5
+        assert abs(second['sell_vwap'] - 560.0) < 1e-9
+        assert abs(second['fees'] - 2.0) < 1e-9
+
+
+def test_dedupe_without_order_id():
+    """去重键不含行号：没有订单号的导出倒序、拼接后重新导入不产生重复成交"""
+    rows = [row('买入', 'SPY', 10, 550.00, '2024/8/2 09:31:00', ''),
+            row('卖出', 'SPY', 10, 550.00, '2024/8/2 09:31:00', ''),
+            row('买入', 'SPY', 10, 551.00, '2024/8/1 09:30:00', '')]
+    with tempfile.TemporaryDirectory() as root:
+        store = os.path.join(root, 'store')
+        path = os.path.join(root, 'orders_his.csv')
+        write_export(path, rows)
+        assert import_export(path, store)['US.SPY'] == {'added': 3, 'duplicates': 0, 'rows': 3}
+        resorted = os.path.join(root, 'orders_his_resorted.csv')
+        write_export(resorted, [row('买入', 'SPY', 5, 552.00, '2024/8/5 09:30:00', '')] + rows[::-1] + rows)
+        assert import_export(resorted, store)['US.SPY'] == {'added': 1, 'duplicates': 6, 'rows': 4}
+
+        # 旧脚本输出的日期保持补零的 %Y-%m-%d 格式
+        assert [d['date'] for d in extract_spy_prices(path)] == ['2024-08-02', '2024-08-02', '2024-08-01']
+
+
+def write_large_export(path, rows):
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        f.write(','.join(HEADER) + '\r\n')
+        for i in range(rows):
+            f.write(','.join(row('买入', ('SPY', 'QQQ', 'AAPL', 'TSLA')[i % 4], 1, 100 + i % 50,
+                                 f"2024/{1 + i % 12:02d}/{1 + i % 28:02d} 10:{i % 60:02d}:00",
+                                 f"B{i:07d}")) + '\r\n')
+
+
+def test_streaming_memory():
+    """逐行解析的峰值内存不随文件行数增长"""
+    peaks = []
+    with tempfile.TemporaryDirectory() as root:
+        for rows in (2000, 20000):
+            path = os.path.join(root, f'orders_{rows}.csv')
+            write_large_export(path, rows)
+            tracemalloc.start()
+            count = sum(1 for _ in iter_fills(path))
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            assert count == rows
+            peaks.append(peak)
+        print(f"   2千行峰值 {peaks[0] / 1e3:.0f}KB | 2万行峰值 {peaks[1] / 1e3:.0f}KB")
+        assert peaks[1] < peaks[0] * 1.5
+
+
+def test_import_throughput():
+    """20万行、4个标的的导出文件导入耗时"""
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'orders_his.csv')
+        write_large_export(path, 200000)
+        started = time.perf_counter()
+        summary = import_export(path, os.path.join(root, 'store'))
+        elapsed = time.perf_counter() - started
+        print(f"   导入 {os.path.getsize(path) / 1e6:.1f}MB 共 {sum(s['added'] for s in summary.values())} 笔，"
+              f"耗时 {elapsed:.2f}秒")
+        assert all(s['rows'] == 50000 for s in summary.values())
+        assert elapsed < 10.0
+
+
+if __name__ == '__main__':
+    test_parse_bom_and_skip_unfilled()
+    test_partition_dedupe_and_vwap()
+    test_dedupe_without_order_id()
+    test_streaming_memory()
+    test_import_throughput()
+    print("\n🎉 历史订单导入测试全部通过")
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+增量历史行情获取测试 (history_fetcher.py)
+使用本地HTTP服务模拟Yahoo chart接口，离线运行。
+测试重点：
+1. 首次获取整个窗口并写入价格库，记录水位线
+2. 再次运行只请求水位线(最后一根K线开始时刻)之后的区间，最后一根K线每次重新获取
+3. 多标的通过有界线程池并发获取
+4. 数据缺口检测与单个标的失败隔离
+5. 盘中获取的未完成日线在收盘后再次运行时被修正
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import datetime
+import json
+import tempfile
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from history_fetcher import HistoryFetcher, detect_gaps
+from price_store import PriceStore, to_ts
+
+GMT_OFFSET = -18000     # 美东标准时间
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def trading_days(start, end, skip=()):
+    """start~end之间的工作日(跳过skip中的日期)"""
+    day, days = start, []
+    while day <= end:
+        if day.weekday() < 5 and day.isoformat() not in skip:
+            days.append(day)
+        day += datetime.timedelta(days=1)
+    return days
+
+
+def yahoo_response(symbol, days, base_price):
+    """按Yahoo chart格式构造日线响应(时间戳为开盘时刻的UTC秒数)"""
+    timestamps = [int((datetime.datetime(d.year, d.month, d.day, 9, 30) - EPOCH).total_seconds()) - GMT_OFFSET
+                  for d in days]
+    closes = [base_price + i for i in range(len(days))]
+    return {'chart': {'result': [{
+        'meta': {'symbol': symbol, 'gmtoffset': GMT_OFFSET, 'dataGranularity': '1d'},
+        'timestamp': timestamps,
+        'indicators': {'quote': [{
+            'open': closes, 'high': [c + 1 for c in closes], 'low': [c - 1 for c in closes],
+            'close': closes, 'volume': [1000000] * len(days)}]},
+    }], 'error': None}}
+
+
+class YahooStandIn:
+    """本地Yahoo接口替身：按period1/period2过滤预先录制的日线，记录请求和并发数"""
+
+    def __init__(self, bars_by_symbol, delay=0.0):
+        self.bars = bars_by_symbol
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def handle(self, request):
+        parsed = urllib.parse.urlparse(request.path)
+        symbol = parsed.path.rsplit('/', 1)[-1]
+        query = urllib.parse.parse_qs(parsed.query)
+        period1, period2 = int(query['period1'][0]), int(query['period2'][0])
+        with self.lock:
+            self.requests.append((symbol, period1, period2))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if symbol not in self.bars:
+                request.send_response(404)
+                request.end_headers()
+                return
+            days, base = self.bars[symbol]
+            full = yahoo_response(symbol, days, base)
+            result = full['chart']['result'][0]
+            keep = [i for i, ts in enumerate(result['timestamp']) if period1 <= ts < period2]
+            result['timestamp'] = [result['timestamp'][i] for i in keep]
+            quote = result['indicators']['quote'][0]
+            for name in quote:
+                quote[name] = [quote[name][i] for i in keep]
+            body = json.dumps(full).encode()
+            request.send_response(200)
+            request.send_header('Content-Type', 'application/json')
+            request.send_header('Content-Length', str(len(body)))
+            request.end_headers()
+            request.wfile.write(body)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def clock(date_text):
+    """模拟当前时间(UTC秒数)：指定日期美东收盘后"""
+    return lambda: to_ts(date_text + ' 21:30:00')
+
+
+SPY_DAYS = trading_days(datetime.date(2024, 10, 1), datetime.date(2024, 12, 31), skip={'2024-11-28'})
+
+
+def test_incremental_watermark():
+    stand_in = YahooStandIn({'SPY': (SPY_DAYS, 500.0)})
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            first = HistoryFetcher(root, stand_in.url, now=clock('2024-11-29'))
+            result = first.update(['US.SPY'], days=30)['US.SPY']
+            assert result['error'] is None
+            assert len(stand_in.requests) == 1
+            assert result['rows'] == result['bars'] > 0
+            watermark = first.state['US.SPY/D1']['watermark']
+
+            # 新进程读取状态，只请求水位线之后的区间(含上次的最后一根K线)
+            second = HistoryFetcher(root, stand_in.url, now=clock('2024-12-06'))
+            result = second.update(['US.SPY'], days=30)['US.SPY']
+            assert stand_in.requests[-1][1] == watermark
+            assert result['bars'] == 1 + 5
+
+            with PriceStore(root).load('US.SPY') as bars:
+                dates = bars.dates()
+                assert dates[-1] == '2024-12-06'
+                assert '2024-11-28' not in dates
+                assert len(dates) == len(set(dates))
+                assert bars.close[-1] == 500.0 + SPY_DAYS.index(datetime.date(2024, 12, 6))
+
+            # 没有新数据时只重新获取最后一根K线，行数不变
+            rows = result['rows']
+            result = HistoryFetcher(root, stand_in.url, now=clock('2024-12-06')).update(['US.SPY'], days=30)
+            assert len(result['US.SPY']['ranges']) == 1
+            assert result['US.SPY']['bars'] == 1 and result['US.SPY']['rows'] == rows
+    finally:
+        stand_in.close()
+
+
+def test_concurrent_symbols_and_gaps():
+    qqq_days = trading_days(datetime.date(2024, 10, 1), datetime.date(2024, 12, 31),
+                            skip={'2024-11-12', '2024-11-13', '2024-11-14'})
+    stand_in = YahooStandIn({'SPY': (SPY_DAYS, 500.0), 'QQQ': (qqq_days, 400.0),
+                             'AAPL': (SPY_DAYS, 200.0), 'MSFT': (SPY_DAYS, 300.0)}, delay=0.1)
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            fetcher = HistoryFetcher(root, stand_in.url, max_workers=2, now=clock('2024-12-31'))
+            started = time.perf_counter()
+            results = fetcher.update(['US.SPY', 'US.QQQ', 'US.AAPL', 'US.MSFT', 'US.NOPE'], days=60)
+            elapsed = time.perf_counter() - started
+            print(f"   5个标的，最大并发 {stand_in.max_in_flight}，耗时 {elapsed:.2f}秒")
+
+            assert stand_in.max_in_flight == 2
+            assert results['US.QQQ']['gaps'] == [['2024-11-11', '2024-11-15']]
+            assert fetcher.state['US.QQQ/D1']['gaps'] == [['2024-11-11', '2024-11-15']]
+            # 单日假期不算缺口
+            assert results['US.SPY']['gaps'] == []
+
+            # 失败的标的不推进水位线，不影响其他标的
+            assert results['US.NOPE']['error'] is not None
+            assert 'US.NOPE/D1' not in fetcher.state
+            assert PriceStore(root).symbols() == ['US.AAPL', 'US.MSFT', 'US.QQQ', 'US.SPY']
+    finally:
+        stand_in.close()
+
+
+def test_partial_bar_corrected_after_close():
+    stand_in = YahooStandIn({'SPY': (SPY_DAYS, 500.0)})
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            # 12-06 美东11:00获取，当日日线尚未收盘
+            HistoryFetcher(root, stand_in.url, now=lambda: to_ts('2024-12-06 16:00:00')).update(['US.SPY'], days=30)
+            index = SPY_DAYS.index(datetime.date(2024, 12, 6))
+            with PriceStore(root).load('US.SPY') as bars:
+                assert bars.dates()[-1] == '2024-12-06' and bars.close[-1] == 500.0 + index
+
+            stand_in.bars['SPY'] = (SPY_DAYS, 510.0)                 # 收盘后的最终数据
+            HistoryFetcher(root, stand_in.url, now=clock('2024-12-06')).update(['US.SPY'], days=30)
+            with PriceStore(root).load('US.SPY') as bars:
+                assert bars.dates()[-1] == '2024-12-06'
+                assert bars.close[-1] == 510.0 + index                   # 未完成K线被覆盖
+                assert bars.close[-2] == 500.0 + index - 1               # 更早的K线不重新获取
+                assert len(bars.dates()) == len(set(bars.dates()))
+    finally:
+        stand_in.close()
+
+
+def test_detect_gaps_intraday():
+    start = to_ts('2025-01-02 09:30:00')
+    stamps = [start + i * 3600 for i in (0, 1, 2, 4, 5)] + [to_ts('2025-01-03 09:30:00')]
+    assert detect_gaps(stamps, 'H1') == [['2025-01-02 11:30', '2025-01-02 13:30']]
+
+
+if __name__ == '__main__':
+    test_incremental_watermark()
+    test_concurrent_symbols_and_gaps()
+    test_partial_bar_corrected_after_close()
+    test_detect_gaps_intraday()
+    print("\n🎉 增量历史行情获取测试全部通过")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+长期运行内存治理测试 (网格 v5.3.18 compact_state / memory_usage)
+测试重点：
+1. 定期压缩后订单记录条数不超过保留上限，压缩的订单计入汇总，总数与券商订单一致
+2. 压缩不改变交易行为(持仓与不压缩时相同)，状态结构内存不随运行次数增长
+3. 遗留的待处理订单ID和网格重置后的空网格记录被清理，当前网格和有持仓的记录保留
+4. 内存报告按结构列出条目数和字节数
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import contextlib
+import io
+import os
+import random
+from unittest import mock
+
+from quant_runtime import OrderSide, SimBroker, load_strategy
+
+GRID_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'strategies', 'grid_strategy',
+                         'grid_trading_v5.3.quant')
+
+
+def random_walk(n, seed=4, sigma=0.015):
+    rng = random.Random(seed)
+    price, closes = 100.0, []
+    for _ in range(n):
+        price *= 1 + rng.gauss(0, sigma)
+        closes.append(round(price, 2))
+    return closes
+
+
+def run_grid(closes, overrides, checkpoints=()):
+    broker = SimBroker()
+    broker.prices[broker.symbol] = closes[0]
+    strategy = load_strategy(GRID_PATH, broker, overrides=dict({'enable_profiling': False}, **overrides))
+    sizes = {}
+    with contextlib.redirect_stdout(io.StringIO()), mock.patch('time.sleep'):
+        strategy.trigger_symbols()
+        strategy.initialize()
+        for tick, price in enumerate(closes, 1):
+            broker.prices[broker.symbol] = price
+            broker.advance(minutes=30)
+            strategy.handle_data()
+            if tick in checkpoints:
+                sizes[tick] = sum(row['bytes'] for row in strategy.memory_usage().values())
+    return strategy, broker, sizes
+
+
+def test_order_history_bounded():
+    closes = random_walk(600)
+    compacted, broker, sizes = run_grid(closes, {'order_history_limit': 20, 'compact_interval_ticks': 50},
+                                        checkpoints=(300, 600))
+    unbounded, _, unbounded_sizes = run_grid(closes, {'compact_interval_ticks': 0}, checkpoints=(300, 600))
+    summary = compacted.order_summary
+    compressed = summary['buy']['orders'] + summary['sell']['orders']
+    print(f"   600次运行 {len(broker.orders)} 笔订单: 保留 {len(compacted.order_records)} 条，汇总 {compressed} 条")
+    print(f"   状态内存 300/600次: 压缩 {sizes[300]:,}/{sizes[600]:,} 字节，"
+          f"不压缩 {unbounded_sizes[300]:,}/{unbounded_sizes[600]:,} 字节")
+    assert len(unbounded.order_records) == len(broker.orders) > 60
+    assert len(compacted.order_records) <= 20 + len(broker.orders) // 6
+    assert compressed + len(compacted.order_records) == len(broker.orders)
+    bought = sum(order['qty'] for order in broker.orders.values() if order['side'] == OrderSide.BUY)
+    assert summary['buy']['qty'] + sum(r['qty'] for r in compacted.order_records.values()
+                                       if r['side'] == OrderSide.BUY) == bought
+    # 交易行为不变
+    assert compacted.positions == unbounded.positions
+    assert compacted.total_position == unbounded.total_position
+    assert unbounded_sizes[600] > unbounded_sizes[300] * 1.2
+    assert sizes[600] < sizes[300] * 1.1 and sizes[600] < unbounded_sizes[600] / 2
+
+
+def test_compact_prunes_stale_records():
+    strategy, _, _ = run_grid(random_walk(40, seed=3), {'compact_interval_ticks': 0})
+    grid = strategy.grid_prices[0]
+    strategy.position_records[1.0] = {'buy_price': 0.0, 'quantity': 0, 'update_time': 0}     # 已不在网格中
+    strategy.position_records[2.0] = {'buy_price': 2.0, 'quantity': 5, 'update_time': 0}     # 仍有数量，保留
+    strategy.position_records[grid] = {'buy_price': 0.0, 'quantity': 0, 'update_time': 0}    # 当前网格，保留
+    strategy.pending_orders.update({'LEAKED-1', 'LEAKED-2'})
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        removed = strategy.compact_state()
+    assert removed['pending_orders'] == 2 and removed['position_records'] >= 1
+    assert 1.0 not in strategy.position_records
+    assert 2.0 in strategy.position_records and grid in strategy.position_records
+    assert not strategy.pending_orders and '[内存] 压缩历史记录' in output.getvalue()
+
+    # 没有需要清理的内容时不输出
+    quiet = io.StringIO()
+    with contextlib.redirect_stdout(quiet):
+        assert not any(strategy.compact_state().values())
+    assert quiet.getvalue() == ''
+
+
+def test_memory_report():
+    with mock.patch('atexit.register'):
+        strategy, _, _ = run_grid(random_walk(30), {'enable_profiling': True, 'compact_interval_ticks': 0})
+    usage = strategy.memory_usage()
+    assert {'positions', 'position_records', 'order_records', 'pending_orders', '_profile_stats'} <= set(usage)
+    assert usage['position_records']['items'] == len(strategy.position_records)
+    assert all(row['bytes'] > 0 for row in usage.values())
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        strategy.dump_memory_report()
+    assert '[内存] 状态结构共' in output.getvalue() and 'position_records' in output.getvalue()
+
+
+if __name__ == '__main__':
+    test_order_history_bounded()
+    test_compact_prunes_stale_records()
+    test_memory_report()
+    print("\n🎉 内存治理测试全部通过")
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+期权定价引擎测试 (option_pricing.py + 滚轮策略 v2.2.0 内嵌引擎)
+测试重点：
+1. Black-Scholes价格满足看涨看跌平价，Greeks与数值差分一致
+2. 整链隐含波动率求解可还原输入波动率，异常价格返回None
+3. 滚轮策略内嵌引擎与tools模块结果一致
+4. 滚轮策略在整条期权链中选择最接近目标Delta的合约
+5. 隐含波动率按买卖中间价反推，不受过时的最新成交价影响
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import math
+import os
+import time
+
+from option_pricing import (bs_greeks, bs_price, chain_greeks, implied_vol_chain,
+                            select_by_delta)
+from quant_runtime import OptionType, SimBroker, load_strategy
+
+WHEEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          '..', 'strategies', 'wheel_strategy', 'wheel_strategy.quant')
+
+
+def test_put_call_parity_and_greeks():
+    """平价关系与Delta/Vega数值差分"""
+    spot, strike, t, rate, vol = 100.0, 95.0, 35 / 365.0, 0.04, 0.25
+    call = bs_price(spot, strike, t, rate, vol, True)
+    put = bs_price(spot, strike, t, rate, vol, False)
+    assert abs((call - put) - (spot - strike * math.exp(-rate * t))) < 1e-9
+
+    greeks = bs_greeks(spot, strike, t, rate, vol, False)
+    bump = 0.01
+    numeric_delta = (bs_price(spot + bump, strike, t, rate, vol, False) -
+                     bs_price(spot - bump, strike, t, rate, vol, False)) / (2 * bump)
+    vol_bump = 1e-5
+    numeric_vega = (bs_price(spot, strike, t, rate, vol + vol_bump, False) -
+                    bs_price(spot, strike, t, rate, vol - vol_bump, False)) / (2 * vol_bump) / 100.0
+    assert abs(greeks['delta'] - numeric_delta) < 1e-6
+    assert abs(greeks['vega'] - numeric_vega) < 1e-6
+    assert -1.0 < greeks['delta'] < 0.0
+    assert greeks['theta'] < 0.0
+    print(f"   ✅ PUT K=95 Delta {greeks['delta']:+.4f} Vega {greeks['vega']:.4f}")
+
+
+def test_implied_vol_chain_round_trip():
+    """整链IV求解还原输入波动率(含深度虚值和深度实值)"""
+    strikes = [60.0 + i for i in range(81)]
+    vols = [0.15 + 0.002 * i for i in range(81)]
+    for is_call in (True, False):
+        greeks = chain_greeks(100.0, strikes, 40, vols, is_call, rate=0.03)
+        prices = [g['price'] for g in greeks]
+        solved = implied_vol_chain(prices, 100.0, strikes, 40, is_call, rate=0.03)
+        for strike, expected, price, iv in zip(strikes, vols, prices, solved):
+            forward_strike = strike * math.exp(-0.03 * 40 / 365.0)
+            lower = max(100.0 - forward_strike, 0.0) if is_call else max(forward_strike - 100.0, 0.0)
+            if price - lower < 1e-3:
+                continue  # 时间价值低于报价精度，IV不可辨识
+            assert iv is not None, strike
+            assert abs(iv - expected) < 1e-4, (strike, iv, expected)
+
+    # 低于内在价值、非正价格、已到期的合约无解
+    bad = implied_vol_chain([1.0, 0.0, 2.0], 100.0, [80.0, 95.0, 95.0], [30, 30, 0], True)
+    assert bad == [None, None, None]
+
+
+def test_chain_performance():
+    """数千个合约一次批量求解"""
+    size = 4000
+    strikes = [50.0 + (i % 100) for i in range(size)]
+    dtes = [7 + (i // 100) for i in range(size)]
+    prices = [g['price'] for g in chain_greeks(100.0, strikes, dtes, 0.3, False)]
+    start = time.perf_counter()
+    ivs = implied_vol_chain(prices, 100.0, strikes, dtes, False)
+    elapsed = time.perf_counter() - start
+    solved = sum(1 for iv in ivs if iv is not None)
+    print(f"   ⚡ {size}个合约IV求解耗时 {elapsed:.3f}秒 (有解{solved}个)")
+    assert solved > size * 0.8
+
+
+def build_wheel(broker, overrides=None):
+    params = {'dry_run_mode': False, 'verbose_logging': False, 'risk_free_rate': 0.04}
+    params.update(overrides or {})
+    strategy = load_strategy(WHEEL_PATH, broker, overrides=params)
+    strategy.initialize()
+    return strategy
+
+
+def test_embedded_engine_matches_module():
+    """滚轮策略内嵌引擎与tools/option_pricing.py结果一致"""
+    broker = SimBroker()
+    broker.prices[broker.symbol] = 100.0
+    strategy = build_wheel(broker)
+
+    strikes = [80.0, 90.0, 95.0, 100.0, 110.0]
+    dtes = [30, 35, 40, 45, 30]
+    for is_call in (True, False):
+        prices = [g['price'] for g in chain_greeks(100.0, strikes, dtes, 0.27, is_call, 0.04)]
+        expected = implied_vol_chain(prices, 100.0, strikes, dtes, is_call, 0.04)
+        actual = strategy._implied_vol_chain(prices, 100.0, strikes, dtes, is_call, 0.04)
+        for a, b in zip(actual, expected):
+            assert (a is None and b is None) or abs(a - b) < 1e-12
+        for strike, dte in zip(strikes, dtes):
+            mine = strategy._bs_greeks(100.0, strike, dte / 365.0, 0.04, 0.27, is_call)
+            ref = bs_greeks(100.0, strike, dte / 365.0, 0.04, 0.27, is_call)
+            for key in ref:
+                assert abs(mine[key] - ref[key]) < 1e-12
+
+
+def test_wheel_selects_closest_delta_across_chain():
+    """券商Delta缺失时，本地引擎在整链中选出最接近-0.30的PUT"""
+    broker = SimBroker()
+    broker.prices[broker.symbol] = 100.0
+    for strike in range(86, 100):
+        contract = f"US.SPY250214P{strike}000"
+        # 券商Greeks故意给出无效Delta，验证策略使用的是本地计算结果
+        broker.add_priced_option(contract, OptionType.PUT, float(strike), 35, 0.25,
+                                 spread=0.04, rate=0.04, broker_delta=0.0)
+
+    # 排序只看Delta贴合度，结果即最接近目标Delta的合约
+    strategy = build_wheel(broker, {'chain_band_count': 6, 'rank_weight_yield': 0.0,
+                                    'rank_weight_distance': 0.0, 'rank_weight_spread': 0.0,
+                                    'rank_weight_delta': 1.0})
+    chosen = strategy._screen_put_options()
+    chain = strategy.chain_cache[(broker.symbol, OptionType.PUT, 30, 45)]
+
+    deltas = [chain['rows'][c]['delta'] for c in chain['contracts']]
+    expected = chain['contracts'][select_by_delta(deltas, -0.30)]
+    print(f"   🎯 {len(chain['contracts'])}个候选中选择 {chosen} "
+          f"(Delta {chain['rows'][chosen]['delta']:+.3f})")
+
+    assert len(chain['contracts']) == 6
+    assert chosen == expected
+    assert chosen != chain['contracts'][0]
+    assert abs(chain['rows'][chosen]['iv'] - 0.25) < 0.02
+    assert abs(chain['rows'][chosen]['delta'] + 0.30) < 0.1
+
+
+def test_local_iv_uses_mid_not_last_trade():
+    """最新成交价偏离买卖中间价时，隐含波动率按中间价反推；没有双边报价时回退到最新成交价"""
+    broker = SimBroker()
+    broker.prices[broker.symbol] = 100.0
+    for strike in range(86, 100):
+        contract = f"US.SPY250214P{strike}000"
+        broker.add_priced_option(contract, OptionType.PUT, float(strike), 35, 0.25,
+                                 spread=0.04, rate=0.04, broker_delta=0.0)
+        broker.prices[contract] *= 1.8                          # 过时的成交价
+    no_bid = "US.SPY250214P96000"
+    mid = broker.prices[no_bid] / 1.8
+    broker.quotes[no_bid] = (0.0, broker.quotes[no_bid][1])
+    broker.prices[no_bid] = mid                                 # 无买价时只能用成交价
+
+    strategy = build_wheel(broker, {'chain_band_count': 6})
+    strategy._screen_put_options()
+    rows = strategy.chain_cache[(broker.symbol, OptionType.PUT, 30, 45)]['rows']
+    checked = 0
+    for contract, row in rows.items():
+        if row['iv'] is not None:
+            assert abs(row['iv'] - 0.25) < 0.01, (contract, row['iv'])
+            checked += 1
+    assert checked >= 5
+    assert [row['iv'] for contract, row in rows.items() if str(contract) == no_bid][0] is not None
+
+
+if __name__ == '__main__':
+    test_put_call_parity_and_greeks()
+    test_implied_vol_chain_round_trip()
+    test_chain_performance()
+    test_embedded_engine_matches_module()
+    test_wheel_selects_closest_delta_across_chain()
+    test_local_iv_uses_mid_not_last_trade()
+    print("\n🎉 期权定价引擎测试全部通过")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+多腿期权组合评估器测试 (option_spreads.py)
+测试重点：
+1. 牛市看跌价差的净权利金、最大亏损、盈亏平衡点与设计文档示例一致
+2. 宽度和Delta约束过滤组合
+3. 铁鹰、玉蜥蜴、PMCC的组合规则
+4. 多腿下单构建器买入腿在前
+5. 数百个行权价的整链枚举耗时
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import time
+
+from option_pricing import chain_greeks
+from option_spreads import (best_combo, bear_call_spreads, build_leg_orders, bull_put_spreads,
+                            evaluate, iron_condors, jade_lizards, load_chain, pmcc_combos)
+
+SPOT = 100.0
+
+
+def synthetic_rows(strikes, dtes, vol=0.25, spread=0.04):
+    """按Black-Scholes生成期权链记录"""
+    rows = []
+    for dte in dtes:
+        for is_call in (True, False):
+            greeks = chain_greeks(SPOT, strikes, dte, vol, is_call, rate=0.03)
+            for strike, g in zip(strikes, greeks):
+                tag = 'C' if is_call else 'P'
+                rows.append({
+                    'symbol': f"US.XYZ{dte:03d}{tag}{strike:g}", 'strike': strike, 'dte': dte,
+                    'is_call': is_call, 'bid': max(g['price'] - spread / 2, 0.01),
+                    'ask': g['price'] + spread / 2, 'delta': g['delta'], 'iv': vol,
+                })
+    return rows
+
+
+def test_bull_put_matches_design_example():
+    """设计文档示例：卖95P收1.50，买90P付0.50 → 净收1.00，最大亏损4.00，盈亏平衡94"""
+    rows = [
+        {'symbol': 'P95', 'strike': 95.0, 'dte': 35, 'is_call': False,
+         'bid': 1.50, 'ask': 1.55, 'delta': -0.30, 'iv': 0.25},
+        {'symbol': 'P90', 'strike': 90.0, 'dte': 35, 'is_call': False,
+         'bid': 0.45, 'ask': 0.50, 'delta': -0.12, 'iv': 0.27},
+    ]
+    combos = bull_put_spreads(load_chain(rows), SPOT, short_delta=(0.25, 0.35), width=(5, 5))
+    assert len(combos) == 1
+    combo = combos[0]
+    assert abs(combo['credit'] - 1.00) < 1e-12
+    assert abs(combo['max_loss'] - 4.00) < 1e-12
+    assert abs(combo['breakevens'][0] - 94.0) < 1e-12
+    assert abs(combo['return_on_risk'] - 0.25) < 1e-12
+    assert 0.5 < combo['pop'] < 1.0
+
+
+def test_width_and_delta_constraints():
+    chain = load_chain(synthetic_rows([float(k) for k in range(80, 121)], [35]))
+    combos = bull_put_spreads(chain, SPOT, short_delta=(0.25, 0.35), width=(2, 4))
+    assert combos
+    for combo in combos:
+        short, long = combo['legs']
+        assert short['side'] == 'SELL' and long['side'] == 'BUY'
+        assert 2 <= short['strike'] - long['strike'] <= 4
+        assert combo['credit'] > 0
+
+    calls = bear_call_spreads(chain, SPOT, short_delta=(0.15, 0.25), width=(1, 3))
+    for combo in calls:
+        assert 1 <= combo['legs'][1]['strike'] - combo['legs'][0]['strike'] <= 3
+        assert combo['pop'] > 0.5
+
+
+def test_iron_condor_and_jade_lizard():
+    chain = load_chain(synthetic_rows([float(k) for k in range(70, 131)], [30, 45]))
+
+    condors = iron_condors(chain, SPOT, short_delta=(0.10, 0.20), width=(2, 5))
+    assert condors
+    for combo in condors:
+        put_short, _, call_short, _ = combo['legs']
+        assert put_short['strike'] < call_short['strike']
+        low_be, high_be = combo['breakevens']
+        assert low_be < SPOT < high_be
+        assert 0 < combo['pop'] < 1
+
+    lizards = jade_lizards(chain, SPOT, put_delta=(0.25, 0.35), call_delta=(0.25, 0.35),
+                           call_width=(1, 3))
+    assert lizards
+    for combo in lizards:
+        call_width = combo['legs'][2]['strike'] - combo['legs'][1]['strike']
+        # 总权利金不低于看涨价差宽度：上方无风险
+        assert combo['credit'] >= call_width
+
+
+def test_pmcc_rules():
+    chain = load_chain(synthetic_rows([float(k) for k in range(50, 141, 5)], [35, 400]))
+    combos = pmcc_combos(chain, SPOT, leaps_min_dte=365, leaps_min_delta=0.80,
+                         short_delta=(0.20, 0.30))
+    assert combos
+    for combo in combos:
+        leaps, short = combo['legs']
+        debit = -combo['credit']
+        assert leaps['side'] == 'BUY' and short['side'] == 'SELL'
+        assert short['strike'] > leaps['strike'] + debit
+        assert combo['max_loss'] == debit
+        assert combo['max_profit'] > 0
+
+
+def test_order_builder_and_evaluate():
+    chain = load_chain(synthetic_rows([float(k) for k in range(70, 131)], [35]))
+    best, orders, total = evaluate(chain, 'iron_condor', SPOT, qty=2, min_pop=0.5,
+                                   short_delta=(0.10, 0.20), width=(2, 5))
+    print(f"   铁鹰组合共{total}个，最优回报率 {best['return_on_risk']:.2f} POP {best['pop']:.1%}")
+    assert best is best_combo([best])
+    assert best['pop'] >= 0.5
+    assert [o['side'] for o in orders] == ['BUY', 'BUY', 'SELL', 'SELL']
+    assert all(o['qty'] == 2 for o in orders)
+    assert build_leg_orders(None) == []
+
+
+def test_large_chain_performance():
+    """400个行权价 × 6个到期日的整链枚举"""
+    strikes = [50.0 + 0.25 * i for i in range(400)]
+    chain = load_chain(synthetic_rows(strikes, [28, 31, 35, 38, 42, 45]))
+
+    start = time.perf_counter()
+    verticals = bull_put_spreads(chain, SPOT, short_delta=(0.15, 0.40), width=(1, 10))
+    condors = iron_condors(chain, SPOT, short_delta=(0.10, 0.25), width=(1, 10))
+    elapsed = time.perf_counter() - start
+    print(f"   ⚡ 牛市看跌价差{len(verticals)}个 + 铁鹰{len(condors)}个，耗时 {elapsed:.3f}秒")
+    assert len(verticals) > 1000
+    assert elapsed < 5.0
+
+
+if __name__ == '__main__':
+    test_bull_put_matches_design_example()
+    test_width_and_delta_constraints()
+    test_iron_condor_and_jade_lizard()
+    test_pmcc_rules()
+    test_order_builder_and_evaluate()
+    test_large_chain_performance()
+    print("\n🎉 多腿组合评估测试全部通过")
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+分阶段耗时统计测试 (网格 v5.3.14 / DCA v2.9.0)
+使用离线运行时加载未修改的策略文件。
+测试重点：
+1. 网格和DCA的handle_data各阶段都被计时，百分位单调且不超过最大值
+2. 直方图百分位估算误差在一个分桶以内
+3. 按运行次数定期输出、手动输出并重置
+4. 关闭统计时交易结果不变，计时开销足够低
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import atexit
+import contextlib
+import datetime
+import io
+import os
+import random
+import time
+from unittest import mock
+
+from quant_runtime import SimBroker, load_strategy
+
+STRATEGY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'strategies')
+GRID_PATH = os.path.join(STRATEGY_DIR, 'grid_strategy', 'grid_trading_v5.3.quant')
+DCA_PATH = os.path.join(STRATEGY_DIR, 'dca_strategy', 'dca_free_stable.quant')
+
+
+def run_grid(ticks=200, overrides=None):
+    broker = SimBroker()
+    broker.prices[broker.symbol] = 100.0
+    strategy = load_strategy(GRID_PATH, broker, overrides=overrides)
+    rng = random.Random(5)
+    price = 100.0
+    output = io.StringIO()
+    # 卖出后策略会sleep等待撮合，离线运行时跳过
+    with contextlib.redirect_stdout(output), mock.patch('time.sleep'):
+        strategy.trigger_symbols()
+        strategy.initialize()
+        atexit.unregister(strategy.dump_profile)
+        for _ in range(ticks):
+            price *= 1 + rng.gauss(0, 0.01)
+            broker.prices[broker.symbol] = round(price, 2)
+            broker.advance(minutes=30)
+            strategy.handle_data()
+    return strategy, broker, output.getvalue()
+
+
+def run_dca(bars=60, overrides=None):
+    broker = SimBroker(start_time=datetime.datetime(2025, 1, 6, 10, 0))
+    series = broker.bars.setdefault((broker.symbol, None), [])
+    rng = random.Random(9)
+    price = 100.0
+    series.append({'open': price, 'high': price, 'low': price, 'close': price, 'volume': 0})
+    broker.prices[broker.symbol] = price
+    strategy = load_strategy(DCA_PATH, broker, overrides=dict({'version_tier': 2}, **(overrides or {})))
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        strategy.initialize()
+        atexit.unregister(strategy.dump_profile)
+        for _ in range(bars):
+            price *= 1 + rng.gauss(-0.002, 0.02)
+            series.append({'open': price, 'high': price, 'low': price, 'close': price, 'volume': 0})
+            broker.prices[broker.symbol] = price
+            broker.advance(days=1)
+            strategy.handle_data()
+    return strategy, broker, output.getvalue()
+
+
+def check_monotonic(summary):
+    for phase, row in summary.items():
+        assert 0 <= row['p50'] <= row['p95'] <= row['p99'] <= row['max'], phase
+        assert row['mean'] <= row['max']
+
+
+def test_grid_phases():
+    strategy, broker, _ = run_grid()
+    summary = strategy.profile_summary()
+    print("   网格阶段: " + ', '.join(f"{k}={v['count']}" for k, v in summary.items()))
+    assert summary['handle_data']['count'] == 200
+    assert summary['check_strategy_status']['count'] == 200
+    for phase in ('_should_reset_grid', '_check_high_grid_profit', '_find_nearest_value', '_place_buy_order'):
+        assert summary[phase]['count'] > 0, phase
+    check_monotonic(summary)
+    assert broker.positions.get(broker.symbol, 0) > 0
+
+
+def test_dca_phases():
+    strategy, _, _ = run_dca()
+    summary = strategy.profile_summary()
+    assert strategy._version.startswith('v2.14.0')
+    for phase in ('handle_data', 'get_market_data', 'calculate_drawdown', 'tier_logic'):
+        assert summary[phase]['count'] == 60, phase
+    assert 0 < summary['execute_investment']['count'] <= 60
+    # 下单嵌套在分层逻辑内
+    assert summary['execute_investment']['mean'] * summary['execute_investment']['count'] <= \
+        summary['tier_logic']['mean'] * summary['tier_logic']['count']
+    check_monotonic(summary)
+
+
+def test_histogram_percentiles():
+    strategy, _, _ = run_dca(bars=1)
+    strategy.dump_profile(reset=True)
+    samples = [(i + 1) * 1e-5 for i in range(1000)]     # 10微秒 ~ 10毫秒均匀分布
+    random.Random(1).shuffle(samples)
+    for elapsed in samples:
+        strategy._profile_record('synthetic', elapsed)
+    row = strategy.profile_summary()['synthetic']
+    for pct, exact in ((50, 5.0), (95, 9.5), (99, 9.9)):
+        assert exact <= row[f'p{pct}'] <= exact * 1.2, (pct, row[f'p{pct}'])
+    assert row['max'] == 10.0
+    assert abs(row['mean'] - 5.005) < 1e-9
+
+
+def test_periodic_and_manual_dump():
+    strategy, _, output = run_grid(ticks=100, overrides={'profile_report_ticks': 25})
+    assert output.count('[耗时统计]') == 4
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        summary = strategy.dump_profile(reset=True)
+    assert 'handle_data' in buffer.getvalue() and summary['handle_data']['count'] == 100
+    assert strategy.profile_summary() == {}
+
+
+def test_disabled_and_overhead():
+    enabled, enabled_broker, _ = run_grid()
+    disabled, disabled_broker, _ = run_grid(overrides={'enable_profiling': False})
+    assert disabled.profile_summary() == {}
+    assert enabled_broker.positions == disabled_broker.positions
+    assert abs(enabled_broker.cash - disabled_broker.cash) < 1e-6
+
+    noop = int
+    calls = 20000
+    started = time.perf_counter()
+    for _ in range(calls):
+        enabled._timed('noop', noop)
+    timed = (time.perf_counter() - started) / calls
+    started = time.perf_counter()
+    for _ in range(calls):
+        noop()
+    plain = (time.perf_counter() - started) / calls
+    print(f"   每个计时阶段开销 {(timed - plain) * 1e6:.2f}微秒")
+    assert timed - plain < 5e-6
+
+
+if __name__ == '__main__':
+    test_grid_phases()
+    test_dca_phases()
+    test_histogram_percentiles()
+    test_periodic_and_manual_dump()
+    test_disabled_and_overhead()
+    print("\n🎉 分阶段耗时统计测试全部通过")
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+本地OHLCV列式价格库测试 (price_store.py)
+测试重点：
+1. 导入旧JSON/CSV文件后记录与原文件一致
+2. 按日期区间二分定位，返回内存映射上的零拷贝视图
+3. 重复导入按时间戳合并，旧文件更新后自动重新导入
+   旧文件导入到 D1~legacy，不覆盖抓取的真实日线
+4. 十年分钟线的映射加载耗时
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import json
+import mmap
+import os
+import tempfile
+import time
+
+from price_store import LEGACY_BAR_TYPE, PriceStore, import_file, load_records, to_ts, write_bars
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+SPY_JSON = os.path.join(DATA_DIR, 'spy_price_history.json')
+SPY_CSV = os.path.join(DATA_DIR, 'spy_price_history.csv')
+TSLA_CSV = os.path.join(DATA_DIR, 'tsla_price_2025_jan_mar_5tier.csv')
+
+
+def test_import_legacy_files():
+    with open(SPY_JSON, 'r', encoding='utf-8') as f:
+        legacy = json.load(f)
+
+    with tempfile.TemporaryDirectory() as root:
+        records = load_records(SPY_JSON, root=root)
+        assert [(r['date'], r['price']) for r in records] == [(r['date'], r['price']) for r in legacy]
+
+        # CSV与JSON是同一份数据，导入到同一标的后不产生重复
+        symbol, rows = import_file(SPY_CSV, root=root)
+        assert symbol == 'US.SPY' and rows == len(legacy)
+
+        symbol, rows = import_file(TSLA_CSV, root=root)
+        assert symbol == 'US.TSLA'
+        assert PriceStore(root).symbols() == ['US.SPY', 'US.TSLA']
+
+
+def test_range_views_are_zero_copy():
+    with tempfile.TemporaryDirectory() as root:
+        import_file(SPY_JSON, root=root)
+        store = PriceStore(root)
+        with store.load('US.SPY', LEGACY_BAR_TYPE, start='2024-09-01', end='2024-09-30') as bars:
+            dates = bars.dates()
+            print(f"   2024年9月: {len(bars)} 根K线 {dates[0]} ~ {dates[-1]}")
+            assert dates[0] == '2024-09-03' and dates[-1] == '2024-09-30'
+            assert all(d.startswith('2024-09') for d in dates)
+            # 视图直接引用映射内存
+            assert isinstance(bars.close.obj, mmap.mmap)
+            assert bars.close.format == 'd' and bars.ts.format == 'q'
+            assert bars.open[0] == bars.close[0]
+
+        with store.load('US.SPY', LEGACY_BAR_TYPE, start='2030-01-01') as empty:
+            assert len(empty) == 0
+
+
+def test_merge_and_reimport():
+    with tempfile.TemporaryDirectory() as root:
+        base = [{'ts': to_ts(f"2025-01-0{d}"), 'open': d, 'high': d + 1, 'low': d - 1, 'close': d,
+                 'volume': 100 * d} for d in (2, 3, 6)]
+        assert write_bars(root, 'US.XYZ', 'D1', base) == 3
+        update = [{'ts': to_ts('2025-01-03'), 'open': 9, 'high': 9, 'low': 9, 'close': 9, 'volume': 1},
+                  {'ts': to_ts('2025-01-07'), 'open': 7, 'high': 8, 'low': 6, 'close': 7, 'volume': 700}]
+        assert write_bars(root, 'US.XYZ', 'D1', update) == 4
+
+        with PriceStore(root).load('US.XYZ') as bars:
+            assert bars.dates() == ['2025-01-02', '2025-01-03', '2025-01-06', '2025-01-07']
+            assert list(bars.close) == [2.0, 9.0, 6.0, 7.0]
+            assert list(bars.volume) == [200.0, 1.0, 600.0, 700.0]
+
+        # 旧文件更新时间晚于导入记录时重新导入
+        legacy = os.path.join(root, 'xyz_prices.csv')
+        with open(legacy, 'w', encoding='utf-8') as f:
+            f.write("date,price\n2025-01-08,8.5\n")
+        assert load_records(legacy, root=root)[-1] == {
+            'date': '2025-01-08', 'price': 8.5, 'open': 8.5, 'high': 8.5, 'low': 8.5, 'close': 8.5, 'volume': 0.0}
+        with open(legacy, 'w', encoding='utf-8') as f:
+            f.write("date,price\n2025-01-08,8.75\n")
+        os.utime(legacy, (time.time() + 10, time.time() + 10))
+        assert load_records(legacy, root=root)[-1]['price'] == 8.75
+
+
+def test_legacy_import_keeps_fetched_bars():
+    """旧文件里是09:30定投成交价，导入后抓取的D1收盘价保持不变"""
+    with open(SPY_JSON, 'r', encoding='utf-8') as f:
+        legacy = json.load(f)
+    fetched = [{'ts': to_ts(r['date']), 'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5, 'volume': 1000.0}
+               for r in legacy[:5]]
+
+    with tempfile.TemporaryDirectory() as root:
+        write_bars(root, 'US.SPY', 'D1', fetched)
+        records = load_records(SPY_JSON, root=root)
+        assert [r['price'] for r in records] == [r['price'] for r in legacy]
+        store = PriceStore(root)
+        with store.load('US.SPY', 'D1') as bars:
+            assert len(bars) == 5 and list(bars.close) == [1.5] * 5
+        assert store.meta('US.SPY', 'D1')['version'] == 1
+        assert store.meta('US.SPY', LEGACY_BAR_TYPE)['rows'] == len(legacy)
+
+
+def test_decade_of_minute_bars_loads_fast():
+    """10年 × 252天 × 390分钟 ≈ 98万根K线"""
+    start = to_ts('2015-01-02 09:30:00')
+    days, minutes = 2520, 390
+    bars = ({'ts': start + day * 86400 + m * 60, 'open': 100.0, 'high': 101.0, 'low': 99.0,
+             'close': 100.0 + m * 0.01, 'volume': 1000.0}
+            for day in range(days) for m in range(minutes))
+
+    with tempfile.TemporaryDirectory() as root:
+        write_bars(root, 'US.SPY', 'M1', bars)
+        store = PriceStore(root)
+
+        began = time.perf_counter()
+        with store.load('US.SPY', 'M1', start='2020-03-01', end='2020-03-31') as march:
+            elapsed = time.perf_counter() - began
+            count = len(march)
+            last_close = march.close[-1]
+        with store.load('US.SPY', 'M1') as full:
+            total = len(full)
+        print(f"   {total:,} 根分钟线，区间映射耗时 {elapsed * 1000:.2f}ms，命中 {count:,} 根")
+        assert total == days * minutes
+        assert count == 31 * minutes
+        assert abs(last_close - (100.0 + 389 * 0.01)) < 1e-9
+        assert elapsed < 0.05
+
+
+if __name__ == '__main__':
+    test_import_legacy_files()
+    test_range_views_are_zero_copy()
+    test_merge_and_reimport()
+    test_legacy_import_keeps_fetched_bars()
+    test_decade_of_minute_bars_loads_fast()
+    print("\n🎉 价格库测试全部通过")
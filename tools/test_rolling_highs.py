@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+滚动窗口最高价测试 (DCA v2.10.0 rolling_high_windows / drawdown_window)
+测试重点：
+1. 单调队列维护的20/60/200根K线最高价与逐根暴力计算一致，队列长度不超过窗口
+2. 默认以运行时最高价计算回撤，结果与旧版一致；同时记录各窗口回撤
+3. drawdown_window=N 时以最近N根K线最高价为回撤基准，窗口未满前不低于初始化的200日最高价
+4. 历史最高价只在初始化时请求一次 bar_custom
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import atexit
+import contextlib
+import datetime
+import io
+import os
+import random
+
+from quant_runtime import CallCounter, SimBroker, load_strategy
+
+DCA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'strategies', 'dca_strategy',
+                        'dca_free_stable.quant')
+
+
+def price_path(bars, seed=21):
+    rng = random.Random(seed)
+    price, prices = 100.0, []
+    for _ in range(bars):
+        price *= 1 + rng.gauss(-0.001, 0.02)
+        prices.append(round(price, 2))
+    return prices
+
+
+def run_dca(prices, overrides=None, history=()):
+    broker = SimBroker(start_time=datetime.datetime(2025, 1, 6, 10, 0))
+    series = broker.bars.setdefault((broker.symbol, None), [])
+    for price in history or (prices[0],):
+        series.append({'open': price, 'high': price, 'low': price, 'close': price, 'volume': 0})
+    broker.prices[broker.symbol] = prices[0]
+    counter = CallCounter()
+    strategy = load_strategy(DCA_PATH, broker, counter=counter, overrides=dict(
+        {'version_tier': 2, 'enable_profiling': False}, **(overrides or {})))
+    drawdowns = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        strategy.initialize()
+        atexit.unregister(strategy.dump_profile)
+        for price in prices:
+            series.append({'open': price, 'high': price, 'low': price, 'close': price, 'volume': 0})
+            broker.prices[broker.symbol] = price
+            broker.advance(days=1)
+            strategy.handle_data()
+            drawdowns.append((strategy.run_highest_price, dict(strategy.rolling_drawdowns)))
+    return strategy, counter, drawdowns
+
+
+def test_monotonic_queue_matches_brute_force():
+    prices = price_path(500)
+    strategy, _, drawdowns = run_dca(prices)
+    assert strategy._version.startswith('v2.14.0')
+    assert strategy.rolling_windows == [20, 60, 200]
+    for index, (_, rolling) in enumerate(drawdowns):
+        for window in (20, 60, 200):
+            high = max(prices[max(0, index + 1 - window):index + 1])
+            assert abs(rolling[window] - (high - prices[index]) / high * 100) < 1e-9
+    for window in (20, 60, 200):
+        assert strategy.rolling_high(window) == max(prices[-window:])
+        assert len(strategy._rolling_queues[window]) <= window
+    assert strategy.rolling_high(30) is None
+    print(f"   500根K线: 20/60/200根最高价 {strategy.rolling_high(20)}/{strategy.rolling_high(60)}/"
+          f"{strategy.rolling_high(200)}，运行时最高价 {strategy.run_highest_price}")
+
+
+def test_default_baseline_unchanged():
+    prices = price_path(300, seed=4)
+    strategy, counter, drawdowns = run_dca(prices)
+    expected = []
+    high = prices[0]
+    for price in prices:
+        high = max(high, price)
+        expected.append(high)
+    assert [item[0] for item in drawdowns] == expected
+    assert strategy.drawdown_window == 0
+    assert strategy.calculate_drawdown(prices[-1]) == (expected[-1] - prices[-1]) / expected[-1] * 100
+    assert counter.counts.get('bar_custom') == 1
+
+    # 不跟踪滚动窗口时不维护队列
+    quiet, _, _ = run_dca(prices[:50], overrides={'rolling_high_windows': ''})
+    assert quiet.rolling_windows == [] and quiet.rolling_drawdowns == {}
+
+
+def test_rolling_drawdown_baseline():
+    history = [150.0] + [100.0] * 5              # 初始化前的200日最高价150
+    prices = [100.0] * 30 + [90.0] * 5
+    strategy, counter, _ = run_dca(prices, overrides={'drawdown_window': 20, 'rolling_high_windows': '60'},
+                                   history=history)
+    assert strategy.rolling_windows == [20, 60]
+    assert strategy._baseline_high == 150.0 and strategy.run_highest_price == 150.0
+    # 已过20根K线，基准为最近20根的最高价100，不再是150
+    assert abs(strategy.calculate_drawdown(90.0) - 10.0) < 1e-9
+    assert counter.counts.get('bar_custom') == 1
+
+    early, _, _ = run_dca([100.0] * 5, overrides={'drawdown_window': 20}, history=history)
+    # 窗口未满时仍计入初始化的200日最高价
+    assert abs(early.calculate_drawdown(90.0) - 40.0) < 1e-9
+
+
+if __name__ == '__main__':
+    test_monotonic_queue_matches_brute_force()
+    test_default_baseline_unchanged()
+    test_rolling_drawdown_baseline()
+    print("\n🎉 滚动窗口最高价测试全部通过")
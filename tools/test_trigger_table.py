@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+DCA回撤触发价表测试 (DCA v2.11.0 trigger_table / export_trigger_table)
+测试重点：
+1. 触发价表的加仓决策与按百分比逐层比较的旧逻辑一致
+2. 触发价表只在回撤基准价变化时重算
+3. 导出的DCATRIG日志行包含各层触发价和数量，可用于挂限价单
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import contextlib
+import io
+import random
+
+from test_rolling_highs import price_path, run_dca
+
+
+def threshold_walk(strategy, drawdown):
+    """v2.10.0及之前的逐层百分比比较"""
+    for i in reversed(range(len(strategy.drawdown_layers))):
+        if drawdown >= strategy.drawdown_layers[i]:
+            return int(strategy.effective_qty * strategy.drawdown_multipliers[i])
+    return 0
+
+
+def test_table_matches_threshold_walk():
+    strategy, _, _ = run_dca(price_path(10), overrides={'aggressive_multiplier': 1.7})
+    rng = random.Random(3)
+    checked = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(3000):
+            baseline = rng.uniform(50, 500)
+            price = baseline * (1 - rng.uniform(0, 0.7))
+            strategy.drawdown_baseline_price = baseline
+            drawdown = (baseline - price) / baseline * 100
+            expected = threshold_walk(strategy, drawdown)
+            assert strategy._handle_paid_tier_drawdown(drawdown, price) == expected
+            assert strategy._handle_paid_tier_drawdown(drawdown) == expected
+            checked += expected > 0
+    print(f"   3000个随机基准价/价格: {checked} 次触发加仓，与逐层比较一致")
+    assert checked > 1000
+
+
+def test_table_rebuilt_on_baseline_change():
+    strategy, _, _ = run_dca(price_path(5))
+    strategy.drawdown_baseline_price = 200.0
+    table = strategy._get_trigger_table()
+    assert [entry['layer'] for entry in table] == [1, 2, 3, 4, 5]
+    assert [round(entry['price'], 6) for entry in table] == [190.0, 180.0, 160.0, 130.0, 100.0]
+    assert table[1]['qty'] == int(strategy.effective_qty * strategy.drawdown_multipliers[1])
+    assert strategy._get_trigger_table() is table            # 基准价不变时复用
+    strategy.drawdown_baseline_price = 210.0
+    assert strategy._get_trigger_table() is not table
+    assert round(strategy.trigger_table[0]['price'], 6) == 199.5
+
+
+def test_export_trigger_table():
+    strategy, _, _ = run_dca(price_path(5))
+    strategy.drawdown_baseline_price = 100.0
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        exported = strategy.export_trigger_table()
+    lines = [line for line in output.getvalue().splitlines() if line.startswith('DCATRIG|v1|')]
+    assert len(lines) == len(exported) == len(strategy.drawdown_layers)
+    fields = lines[2].split('|')
+    assert fields[2] == 'US.SPY' and fields[3] == '3' and fields[4] == '20'
+    assert float(fields[5]) == 80.0 and int(fields[6]) == exported[2]['qty'] and float(fields[7]) == 100.0
+    exported[0]['qty'] = -1                                 # 导出的是副本
+    assert strategy.trigger_table[0]['qty'] > 0
+
+
+if __name__ == '__main__':
+    test_table_matches_threshold_walk()
+    test_table_rebuilt_on_baseline_change()
+    test_export_trigger_table()
+    print("\n🎉 回撤触发价表测试全部通过")
@@ -13,14 +13,15 @@ Version: 1.0
 
 import os
 import sys
-import csv
 import json
 from datetime import datetime, timedelta
 from collections import defaultdict
 import math
 
+from price_store import load_records
+
 # 添加策略目录到Python路径
-sys.path.append('/home/wuxia/projects/moomoo_custom_strategies/strategies')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'strategies'))
 
 class MockMoomooAPI:
     """模拟Moomoo API for v2.4.0测试"""
@@ -32,13 +33,7 @@ class MockMoomooAPI:
         
     def load_spy_data(self, file_path):
         """加载SPY历史数据"""
-        with open(file_path, 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                self.spy_data.append({
-                    'date': row['date'], 
-                    'price': float(row['price'])
-                })
+        self.spy_data = load_records(file_path)
         print(f"📊 加载SPY数据: {len(self.spy_data)}天")
     
     def bar_custom(self, symbol, data_type, custom_num, custom_type, select):
@@ -295,7 +290,7 @@ def run_comprehensive_test():
     print("🧪 v2.4.0 综合测试开始")
     print("="*80)
     
-    spy_data_file = '/home/wuxia/projects/moomoo_custom_strategies/data/spy_price_history.csv'
+    spy_data_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'spy_price_history.csv')
     
     # 测试不同激进乘数的效果
     test_cases = [
@@ -368,7 +363,9 @@ def generate_comparison_report(results):
     
     # 保存结果到文件
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    report_file = f"/home/wuxia/projects/moomoo_custom_strategies/data/v240_test_report_{timestamp}.json"
+    report_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data',
+                               f"v240_test_report_{timestamp}.json")
+    os.makedirs(os.path.dirname(report_file), exist_ok=True)
     
     with open(report_file, 'w', encoding='utf-8') as f:
         json.dump({
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+走步优化测试 (walk_forward.py)
+测试重点：
+1. 滚动窗口切分(训练/测试相邻且不重叠)
+2. 每个窗口在训练集上选出的组合不差于默认组合，并在测试集上独立打分
+3. 窗口结果缓存：重复运行不计算，数据延长只计算新窗口，价格被修正的窗口重算
+4. 多进程与单进程结果一致
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import datetime
+import os
+import tempfile
+
+from path_generator import generate_paths
+from walk_forward import CACHE_FILE, WalkForwardOptimizer, rolling_windows
+
+
+def weekdays(count, start=datetime.date(2020, 1, 6)):
+    days, day = [], start
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day.isoformat())
+        day += datetime.timedelta(days=1)
+    return days
+
+
+def history(n_days, seed=4):
+    with generate_paths('regime', 1, n_days, s0=100.0, seed=seed) as paths:
+        return weekdays(n_days), paths.row(0).tolist()
+
+
+def test_rolling_windows():
+    windows = rolling_windows(600, 252, 63)
+    assert windows[0] == (0, 252, 315)
+    assert windows[1] == (63, 315, 378)
+    assert windows[-1][2] <= 600
+    assert len(windows) == 5
+    assert len(rolling_windows(600, 252, 63, step=21)) == 14
+    assert rolling_windows(300, 252, 63) == []
+
+
+def test_optimize_and_cache():
+    dates, closes = history(700)
+    with tempfile.TemporaryDirectory() as root:
+        cache_path = os.path.join(root, CACHE_FILE)
+        first = WalkForwardOptimizer(cache_path, qty=5)
+        report = first.run('US.SPY', dates[:637], closes[:637])
+        windows = report['windows']
+        assert report['computed'] == len(windows) == 6
+        for window in windows:
+            assert window['train_score'] >= window['baseline_train']
+            assert window['train'][1] < window['test'][0]
+        summary = report['summary']
+        print(f"   {summary['windows']} 个窗口 | 样本外 {summary['mean_test']:+.2%} "
+              f"vs 默认 {summary['mean_baseline_test']:+.2%} | 胜率 {summary['win_ratio']:.0%}")
+
+        # 新进程读取缓存，不重新计算
+        again = WalkForwardOptimizer(cache_path, qty=5).run('US.SPY', dates[:637], closes[:637])
+        assert again['computed'] == 0
+        assert again['windows'] == windows
+
+        # 数据延长一个测试窗口，只计算新增窗口
+        extended = WalkForwardOptimizer(cache_path, qty=5).run('US.SPY', dates, closes)
+        assert extended['computed'] == 1
+        assert extended['windows'][:6] == windows
+
+        # 修正历史价格：包含该日的窗口重算
+        fixed = list(closes)
+        fixed[400] *= 0.9
+        corrected = WalkForwardOptimizer(cache_path, qty=5).run('US.SPY', dates, fixed)
+        affected = [w for w in rolling_windows(700, 252, 63) if w[0] <= 400 < w[2]]
+        assert corrected['computed'] == len(affected)
+
+        # 搜索空间或参数不同不复用缓存
+        assert WalkForwardOptimizer(cache_path, qty=10).run('US.SPY', dates, closes)['computed'] == 7
+
+
+def test_workers_match_serial():
+    dates, closes = history(500, seed=8)
+    with tempfile.TemporaryDirectory() as root:
+        serial = WalkForwardOptimizer(os.path.join(root, 'a.json'), qty=5).run('US.QQQ', dates, closes, 200, 50)
+        parallel = WalkForwardOptimizer(os.path.join(root, 'b.json'), workers=2, qty=5).run(
+            'US.QQQ', dates, closes, 200, 50)
+        assert serial['computed'] == parallel['computed'] == 6
+        assert serial['windows'] == parallel['windows']
+
+
+if __name__ == '__main__':
+    test_rolling_windows()
+    test_optimize_and_cache()
+    test_workers_match_serial()
+    print("\n🎉 走步优化测试全部通过")
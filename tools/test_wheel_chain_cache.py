@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+滚轮策略 v2.1.0 期权链快照缓存测试
+测试重点：
+1. TTL内重复检查复用期权链快照，不再重复调用option_screener/Greeks
+2. TTL=0时行为与v2.0.0一致(每次检查都重新筛选)
+3. 下单价格直接取自快照中的报价缓存
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import os
+
+from quant_runtime import CallCounter, OptionType, SimBroker, load_strategy
+
+WHEEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          '..', 'strategies', 'wheel_strategy', 'wheel_strategy.quant')
+
+CHAIN_APIS = ['option_screener', 'option_delta', 'option_strike_price',
+              'option_days_to_expiry', 'bid', 'current_price']
+
+
+def build_broker(put_delta):
+    """构造带一个虚值PUT的模拟券商"""
+    broker = SimBroker(symbol='US.SPY', cash=100000.0)
+    broker.prices[broker.symbol] = 100.0
+    broker.add_option('US.SPY250214P95000', OptionType.PUT, strike=95.0, dte=35,
+                      delta=put_delta, bid=1.20, ask=1.30)
+    return broker
+
+
+def run_checks(overrides, put_delta, checks=4, step_min=15):
+    """按固定间隔运行多次handle_data，返回(策略, 调用计数)"""
+    broker = build_broker(put_delta)
+    counter = CallCounter()
+    params = {'dry_run_mode': False, 'verbose_logging': False, 'trade_interval_min': step_min,
+              'chain_band_count': 1, 'use_local_greeks': False}
+    params.update(overrides)
+    strategy = load_strategy(WHEEL_PATH, broker, overrides=params, counter=counter)
+    strategy.initialize()
+    counter.reset()
+
+    for _ in range(checks):
+        strategy.handle_data()
+        broker.advance(minutes=step_min)
+
+    return strategy, broker, counter
+
+
+def test_chain_snapshot_reused_within_ttl():
+    """Delta不满足时每次检查都会重新筛选，缓存应只抓取一次"""
+    print("=" * 60)
+    print("🧪 期权链快照TTL复用测试")
+    print("=" * 60)
+
+    # Delta -0.05 远离 -0.30 目标，不会下单，每次检查都重新筛选
+    cached, _, cached_counter = run_checks({'chain_cache_ttl_min': 60}, put_delta=-0.05)
+    uncached, _, uncached_counter = run_checks({'chain_cache_ttl_min': 0}, put_delta=-0.05)
+
+    print(f"   缓存开启: option_screener调用 {cached_counter.counts.get('option_screener', 0)} 次")
+    print(f"   缓存关闭: option_screener调用 {uncached_counter.counts.get('option_screener', 0)} 次")
+    print(f"   缓存统计: {cached.cache_stats}")
+
+    assert cached_counter.counts.get('option_screener', 0) == 1
+    assert uncached_counter.counts.get('option_screener', 0) == 4
+    assert cached_counter.total(CHAIN_APIS) < uncached_counter.total(CHAIN_APIS)
+    assert cached.cache_stats['hits'] == 3
+    assert cached.cache_stats['calls_avoided'] > 0
+    assert cached.active_option_contract is None
+
+
+def test_chain_snapshot_expires_after_ttl():
+    """超过TTL后重新抓取期权链"""
+    _, _, counter = run_checks({'chain_cache_ttl_min': 20}, put_delta=-0.05, checks=4, step_min=15)
+    print(f"   TTL=20分钟，间隔15分钟×4次: option_screener调用 {counter.counts.get('option_screener', 0)} 次")
+    # t=0抓取, t=15命中, t=30过期重抓, t=45命中
+    assert counter.counts.get('option_screener', 0) == 2
+
+
+def test_order_price_from_quote_cache():
+    """满足Delta时使用快照中的买一价下单，不再单独查询报价"""
+    strategy, broker, counter = run_checks({'chain_cache_ttl_min': 60}, put_delta=-0.30, checks=1)
+
+    assert strategy.active_option_contract == 'US.SPY250214P95000'
+    assert strategy.option_entry_price == 1.20
+    assert counter.counts.get('bid', 0) == 1
+    order = list(broker.orders.values())[0]
+    assert order['price'] == 1.20
+    print(f"   ✅ 下单价格 ${order['price']:.2f} 来自期权链快照")
+
+
+if __name__ == '__main__':
+    test_chain_snapshot_reused_within_ttl()
+    test_chain_snapshot_expires_after_ttl()
+    test_order_price_from_quote_cache()
+    print("\n🎉 期权链缓存测试全部通过")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+滚轮策略 v2.4.0 多标的模式测试
+测试重点：
+1. 每轮检查只查询一次资金，所有标的共用账户快照
+2. 现金担保额度在标的之间全局分配，遵守资金缓冲和单标的仓位上限
+3. 空闲标的轮询筛选，持仓标的每轮监控
+4. 每个标的独立记录活跃合约和状态
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import os
+
+from quant_runtime import CallCounter, OptionType, SimBroker, load_strategy
+
+WHEEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          '..', 'strategies', 'wheel_strategy', 'wheel_strategy.quant')
+
+SYMBOLS = ['US.SPY', 'US.AAPL', 'US.MSFT', 'US.QQQ']
+
+
+def build_multi_wheel(cash, overrides=None, vol=0.30):
+    """四个标的(股价均为$50)，每个标的一条35天PUT链"""
+    broker = SimBroker(symbol='US.SPY', cash=cash)
+    for symbol in SYMBOLS:
+        broker.prices[symbol] = 50.0
+        for strike in range(40, 50):
+            contract = f"{symbol}250214P{strike}000"
+            broker.add_priced_option(contract, OptionType.PUT, float(strike), 35, vol,
+                                     spread=0.04, underlying=symbol)
+
+    counter = CallCounter()
+    params = {
+        'dry_run_mode': False, 'verbose_logging': False, 'trade_interval_min': 60,
+        'multi_underlying_mode': True, 'extra_underlyings': 'US.AAPL, us.msft,US.QQQ,US.AAPL',
+        'symbols_per_check': 2, 'max_position_value_pct': 0.5,
+    }
+    params.update(overrides or {})
+    strategy = load_strategy(WHEEL_PATH, broker, overrides=params, counter=counter)
+    strategy.initialize()
+    counter.reset()
+    return strategy, broker, counter
+
+
+def fill_all_orders(broker):
+    for order_id, order in broker.orders.items():
+        if order['filled_qty'] == 0:
+            broker.fill_order(order_id)
+
+
+def test_parse_underlyings():
+    """运行标的在前，附加标的去重、统一大写"""
+    strategy, _, _ = build_multi_wheel(100000.0)
+    assert [str(s) for s in strategy.underlyings] == SYMBOLS
+    assert set(strategy.symbol_states) == set(strategy.underlyings)
+
+
+def test_shared_snapshot_and_rotation():
+    """一轮检查只调用一次available_fund，轮询筛选两个标的"""
+    strategy, broker, counter = build_multi_wheel(100000.0)
+
+    strategy.handle_data()
+    assert counter.counts.get('available_fund', 0) == 1
+    assert counter.counts.get('total_cash', 0) == 1
+
+    first_round = [s for s in SYMBOLS if strategy.symbol_states[s]['active_option_contract']]
+    print(f"   第1轮开仓: {first_round}")
+    assert first_round == ['US.SPY', 'US.AAPL']
+
+    # 成交后下一轮筛选剩余两个标的，已持仓标的继续监控
+    fill_all_orders(broker)
+    broker.advance(minutes=60)
+    counter.reset()
+    strategy.handle_data()
+    assert counter.counts.get('available_fund', 0) == 1
+
+    opened = [s for s in SYMBOLS if strategy.symbol_states[s]['active_option_contract']]
+    print(f"   第2轮后持仓: {opened}")
+    assert opened == SYMBOLS
+    for symbol in SYMBOLS:
+        contract = strategy.symbol_states[symbol]['active_option_contract']
+        assert contract.startswith(symbol)
+        assert strategy.symbol_states[symbol]['option_type_active'] == 'PUT'
+
+
+def test_global_cash_allocation():
+    """资金只够两笔现金担保PUT时，同一轮内第三个标的被拒绝"""
+    # 每笔担保$5,000，缓冲=总现金10%=$1,400
+    strategy, broker, _ = build_multi_wheel(14000.0, {'symbols_per_check': 4})
+    strategy.handle_data()
+
+    opened = [s for s in SYMBOLS if strategy.symbol_states[s]['active_option_contract']]
+    print(f"   资金$14,000 开仓: {opened} | 预留担保资金 ${strategy.account_snapshot['reserved_cash']:,.0f}")
+    assert opened == ['US.SPY', 'US.AAPL']
+    assert strategy.account_snapshot['reserved_cash'] == 10000.0
+    assert len(broker.orders) == 2
+
+
+def test_position_limit():
+    """单标的担保资金超过仓位上限时不开仓"""
+    strategy, broker, _ = build_multi_wheel(14000.0, {'max_position_value_pct': 0.3})
+    strategy.handle_data()
+    assert len(broker.orders) == 0
+
+
+def test_rotation_covers_all_symbols():
+    """无法开仓时，轮询依次覆盖所有标的"""
+    strategy, _, _ = build_multi_wheel(100000.0, {'target_delta_put': -0.49, 'delta_tolerance': 0.01})
+    batches = [strategy._next_screen_batch() for _ in range(3)]
+    assert [[str(s) for s in b] for b in batches] == [SYMBOLS[:2], SYMBOLS[2:], SYMBOLS[:2]]
+
+
+def test_single_mode_unchanged():
+    """关闭多标的模式时只管理运行标的"""
+    strategy, broker, counter = build_multi_wheel(100000.0, {'multi_underlying_mode': False})
+    assert [str(s) for s in strategy.underlyings] == ['US.SPY']
+    strategy.handle_data()
+    assert counter.counts.get('total_cash', 0) == 0
+    assert strategy.active_option_contract.startswith('US.SPY')
+    assert len(broker.orders) == 1
+
+
+if __name__ == '__main__':
+    test_parse_underlyings()
+    test_shared_snapshot_and_rotation()
+    test_global_cash_allocation()
+    test_position_limit()
+    test_rotation_covers_all_symbols()
+    test_single_mode_unchanged()
+    print("\n🎉 多标的模式测试全部通过")
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+滚轮策略 v2.5.0 仓位监控测试
+测试重点：
+1. 每轮检查只查询一次期权持仓和一次报价
+2. 开仓时预先计算回购价，盈利检查为单次比较
+3. 通过正股持仓变化识别被行权，超过到期日识别到期作废
+4. 开仓订单未成交时不重复开仓，订单取消、DAY单过期(DISABLED)或长时间无回报后恢复筛选
+5. 撤单期间保持等待，撤单过程中成交照常监控；持仓快照滞后于成交时不误判仓位结束
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import os
+
+from quant_runtime import CallCounter, OptionType, OrderSide, OrderStatus, SimBroker, load_strategy
+
+WHEEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          '..', 'strategies', 'wheel_strategy', 'wheel_strategy.quant')
+
+
+def build_broker():
+    broker = SimBroker(symbol='US.SPY', cash=100000.0)
+    broker.prices[broker.symbol] = 100.0
+    for strike in range(86, 100):
+        broker.add_priced_option(f"US.SPY250214P{strike}000", OptionType.PUT, float(strike), 35, 0.25,
+                                 spread=0.04)
+    return broker
+
+
+def build_wheel(broker=None):
+    broker = broker or build_broker()
+    counter = CallCounter()
+    strategy = load_strategy(WHEEL_PATH, broker, counter=counter,
+                             overrides={'dry_run_mode': False, 'verbose_logging': False})
+    strategy.initialize()
+    return strategy, broker, counter
+
+
+def open_filled_put(strategy, broker):
+    """第一轮开仓并成交，第二轮检查确认空头持仓"""
+    strategy.handle_data()
+    order_id = list(broker.orders)[0]
+    broker.fill_order(order_id)
+    broker.advance(minutes=60)
+    strategy.handle_data()
+    broker.advance(minutes=60)
+    assert strategy.position_monitor['opened']
+    return strategy.position_monitor['contract']
+
+
+def next_check(strategy, broker, counter):
+    counter.reset()
+    strategy.handle_data()
+    broker.advance(minutes=60)
+
+
+def test_monitor_single_fetch_per_check():
+    """持仓期间每轮只查询一次持仓数量和一次报价"""
+    strategy, broker, counter = build_wheel()
+    contract = open_filled_put(strategy, broker)
+    monitor = strategy.position_monitor
+    assert abs(monitor['buyback_price'] - monitor['entry_price'] * 0.5) < 1e-12
+
+    next_check(strategy, broker, counter)
+    option_qty_calls = counter.counts.get('position_holding_qty', 0)
+    print(f"   持仓查询 {option_qty_calls} 次(含正股快照) | 报价查询 {counter.counts.get('current_price', 0)} 次")
+    # 正股快照1次 + 期权持仓1次
+    assert option_qty_calls == 2
+    # 股价快照1次 + 期权报价1次
+    assert counter.counts.get('current_price', 0) == 2
+    assert monitor['last_event'] == 'OPEN'
+    assert strategy.active_option_contract == contract
+    assert len(broker.orders) == 1
+
+
+def test_profit_target_buyback():
+    """期权价格跌破预先计算的回购价时买入平仓"""
+    strategy, broker, counter = build_wheel()
+    contract = open_filled_put(strategy, broker)
+    entry = strategy.position_monitor['entry_price']
+
+    broker.prices[contract] = entry * 0.4
+    next_check(strategy, broker, counter)
+
+    buy_orders = [o for o in broker.orders.values() if o['side'] == OrderSide.BUY]
+    assert len(buy_orders) == 1
+    assert buy_orders[0]['symbol'] == contract
+    assert strategy.winning_trades == 1
+
+
+def test_assignment_detected_from_holdings():
+    """PUT空头消失且正股增加100股，识别为被行权"""
+    strategy, broker, counter = build_wheel()
+    contract = open_filled_put(strategy, broker)
+
+    broker.positions[contract] = 0
+    broker.positions[broker.symbol] = 100
+    next_check(strategy, broker, counter)
+
+    print(f"   被行权次数: {strategy.assignment_count} | 当前状态: {strategy.current_state}")
+    assert strategy.assignment_count == 1
+    assert strategy.expired_count == 0
+    assert strategy.current_state == 'SELLING_CALLS'
+
+
+def test_expiry_detected():
+    """超过到期日且正股未变化，识别为到期作废并计入盈利"""
+    strategy, broker, counter = build_wheel()
+    contract = open_filled_put(strategy, broker)
+    entry = strategy.position_monitor['entry_price']
+
+    broker.positions[contract] = 0
+    broker.advance(days=36)
+    next_check(strategy, broker, counter)
+
+    assert strategy.expired_count == 1
+    assert strategy.assignment_count == 0
+    assert abs(strategy.total_profit - entry * 100) < 1e-9
+
+
+def test_pending_order_blocks_new_entry():
+    """开仓订单未成交时保持等待，订单取消后下一轮重新开仓"""
+    strategy, broker, counter = build_wheel()
+    strategy.handle_data()
+    broker.advance(minutes=60)
+    first_order = list(broker.orders)[0]
+
+    next_check(strategy, broker, counter)
+    assert strategy.position_monitor['last_event'] == 'PENDING'
+    assert len(broker.orders) == 1
+
+    broker.cancel_order_by_orderid(first_order)
+    next_check(strategy, broker, counter)
+    assert len(broker.orders) == 2
+    assert strategy.position_monitor['order_id'] != first_order
+
+
+def test_expired_day_order_releases_underlying():
+    """DAY开仓单收盘过期(DISABLED)视为取消，下一轮重新开仓"""
+    strategy, broker, counter = build_wheel()
+    strategy.handle_data()
+    broker.advance(minutes=60)
+    first_order = list(broker.orders)[0]
+
+    broker.orders[first_order]['status'] = OrderStatus.DISABLED
+    next_check(strategy, broker, counter)
+    assert len(broker.orders) == 2
+    assert strategy.position_monitor['order_id'] != first_order
+
+
+def test_stale_pending_order_cancelled():
+    """订单停留在非终态超过 pending_order_max_checks 轮后撤单，收到取消回报后重新筛选"""
+    strategy, broker, counter = build_wheel()
+    strategy.pending_order_max_checks = 2
+    strategy.handle_data()
+    broker.advance(minutes=60)
+    first_order = list(broker.orders)[0]
+    broker.orders[first_order]['status'] = OrderStatus.SUBMITTING      # 券商一直没有回报
+
+    for _ in range(2):
+        next_check(strategy, broker, counter)
+        assert strategy.position_monitor['last_event'] == 'PENDING'
+    next_check(strategy, broker, counter)
+    assert broker.orders[first_order]['status'] == OrderStatus.CANCELLED_ALL
+    assert strategy.position_monitor['last_event'] == 'PENDING' and len(broker.orders) == 1
+    next_check(strategy, broker, counter)
+    assert len(broker.orders) == 2
+    assert strategy.position_monitor['order_id'] != first_order
+
+
+def test_fill_during_async_cancel_tracked():
+    """撤单请求发出后订单成交：不重新开仓，继续监控这笔空头仓位"""
+    broker = build_broker()
+    requested = []
+    broker.cancel_order_by_orderid = requested.append               # 撤单已受理，回报未到
+    strategy, broker, counter = build_wheel(broker)
+    strategy.pending_order_max_checks = 1
+    strategy.handle_data()
+    broker.advance(minutes=60)
+    first_order = list(broker.orders)[0]
+    broker.orders[first_order]['status'] = OrderStatus.SUBMITTING
+
+    for _ in range(4):
+        next_check(strategy, broker, counter)
+        assert strategy.position_monitor['last_event'] == 'PENDING'
+    assert requested == [first_order] and len(broker.orders) == 1                # 只撤一次
+
+    broker.fill_order(first_order)
+    next_check(strategy, broker, counter)
+    assert strategy.position_monitor['last_event'] == 'OPEN'
+    assert strategy.position_monitor['order_id'] == first_order
+    assert len(broker.orders) == 1
+
+
+def test_fill_before_position_snapshot_waits():
+    """订单已成交但持仓尚未出现：等一轮，不立即判定为已平仓"""
+    strategy, broker, counter = build_wheel()
+    strategy.handle_data()
+    broker.advance(minutes=60)
+    first_order = list(broker.orders)[0]
+    broker.fill_order(first_order)
+    contract = broker.orders[first_order]['symbol']
+    filled_qty = broker.positions.pop(contract)                       # 持仓快照尚未更新
+
+    next_check(strategy, broker, counter)
+    assert strategy.position_monitor['last_event'] == 'PENDING'
+    broker.positions[contract] = filled_qty
+    next_check(strategy, broker, counter)
+    assert strategy.position_monitor['last_event'] == 'OPEN'
+    assert strategy.active_option_contract == contract and len(broker.orders) == 1
+
+
+if __name__ == '__main__':
+    test_monitor_single_fetch_per_check()
+    test_profit_target_buyback()
+    test_assignment_detected_from_holdings()
+    test_expiry_detected()
+    test_pending_order_blocks_new_entry()
+    test_expired_day_order_releases_underlying()
+    test_stale_pending_order_cancelled()
+    test_fill_during_async_cancel_tracked()
+    test_fill_before_position_snapshot_waits()
+    print("\n🎉 仓位监控测试全部通过")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+滚轮策略 v2.3.0 候选合约排序测试
+测试重点：
+1. 年化收益率、行权价距离、买卖价差、Delta贴合度加权评分
+2. 评分权重可配置，改变权重即改变排序结果
+3. 数千个合约的整链排序耗时在毫秒级
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import os
+import random
+import time
+
+from quant_runtime import OptionType, SimBroker, load_strategy
+
+WHEEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          '..', 'strategies', 'wheel_strategy', 'wheel_strategy.quant')
+
+
+def build_wheel(overrides=None):
+    broker = SimBroker()
+    broker.prices[broker.symbol] = 100.0
+    params = {'dry_run_mode': False, 'verbose_logging': False}
+    params.update(overrides or {})
+    strategy = load_strategy(WHEEL_PATH, broker, overrides=params)
+    strategy.initialize()
+    return strategy
+
+
+def device_time_of(strategy):
+    """策略命名空间中的device_time即模拟券商时钟"""
+    return strategy.handle_data.__globals__['device_time']()
+
+
+def make_chain(rows, spot=100.0):
+    """用(合约, 行权价, DTE, Delta, bid, ask)构造期权链快照"""
+    chain = {'spot': spot, 'contracts': [], 'rows': {}}
+    for contract, strike, dte, delta, bid_price, ask_price in rows:
+        chain['contracts'].append(contract)
+        chain['rows'][contract] = {'strike': strike, 'dte': dte, 'delta': delta,
+                                   'bid': bid_price, 'ask': ask_price, 'iv': None}
+    return chain
+
+
+SAMPLE_ROWS = [
+    # 高权利金但价差很宽
+    ('P97_WIDE', 97.0, 35, -0.36, 2.00, 2.60),
+    # 权利金适中、价差窄、Delta贴合
+    ('P95_TIGHT', 95.0, 35, -0.30, 1.20, 1.24),
+    # 更虚值，权利金低
+    ('P92_FAR', 92.0, 35, -0.22, 0.60, 0.64),
+    # Delta超出容差，不参与排序
+    ('P85_OUT', 85.0, 35, -0.08, 0.15, 0.20),
+]
+
+
+def test_rank_default_weights():
+    """默认权重下，价差窄且Delta贴合的合约排第一，超出容差的被剔除"""
+    strategy = build_wheel()
+    shortlist = strategy._rank_candidates(make_chain(SAMPLE_ROWS), OptionType.PUT, -0.30)
+
+    for item in shortlist:
+        print(f"   {item['contract']:<10} 得分{item['score']:.3f} 年化{item['annual_yield']:.1%} "
+              f"价差{item['spread']:.1%}")
+
+    names = [item['contract'] for item in shortlist]
+    assert 'P85_OUT' not in names
+    assert names[0] == 'P95_TIGHT'
+    assert len(shortlist) == 3
+    assert shortlist[0]['score'] >= shortlist[1]['score'] >= shortlist[2]['score']
+    # 年化收益率 = bid / 行权价 * 365 / DTE
+    assert abs(shortlist[0]['annual_yield'] - 1.20 / 95.0 * 365 / 35) < 1e-12
+
+
+def test_rank_weights_configurable():
+    """只看收益率时选权利金最高的合约，只看距离时选最虚值的合约"""
+    yield_only = build_wheel({'rank_weight_yield': 1.0, 'rank_weight_distance': 0.0,
+                              'rank_weight_spread': 0.0, 'rank_weight_delta': 0.0})
+    distance_only = build_wheel({'rank_weight_yield': 0.0, 'rank_weight_distance': 1.0,
+                                 'rank_weight_spread': 0.0, 'rank_weight_delta': 0.0,
+                                 'rank_shortlist_size': 1})
+    chain = make_chain(SAMPLE_ROWS)
+
+    assert yield_only._rank_candidates(chain, OptionType.PUT, -0.30)[0]['contract'] == 'P97_WIDE'
+    shortlist = distance_only._rank_candidates(chain, OptionType.PUT, -0.30)
+    assert [item['contract'] for item in shortlist] == ['P92_FAR']
+
+
+def test_rank_large_chain_performance():
+    """3000个合约的整链排序"""
+    rng = random.Random(7)
+    rows = []
+    for i in range(3000):
+        strike = 60.0 + (i % 400) * 0.1
+        delta = -0.05 - 0.45 * (strike - 60.0) / 40.0
+        bid_price = round(rng.uniform(0.1, 5.0), 2)
+        rows.append((f"P{i}", strike, 30 + i % 16, delta, bid_price, bid_price + rng.uniform(0.01, 0.3)))
+    chain = make_chain(rows)
+    strategy = build_wheel({'rank_shortlist_size': 5})
+
+    start = time.perf_counter()
+    shortlist = strategy._rank_candidates(chain, OptionType.PUT, -0.30)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"   ⚡ 3000个合约排序耗时 {elapsed_ms:.2f}ms")
+
+    assert len(shortlist) == 5
+    assert elapsed_ms < 50
+
+
+def test_screen_uses_ranked_contract():
+    """筛选流程返回排序第一的合约"""
+    strategy = build_wheel()
+    key = (strategy.underlying_stock, OptionType.PUT, strategy.dte_min, strategy.dte_max)
+    chain = make_chain(SAMPLE_ROWS)
+    chain['fetched_at'] = device_time_of(strategy)
+    chain['fetch_calls'] = 0
+    strategy.chain_cache[key] = chain
+
+    assert strategy._screen_put_options() == 'P95_TIGHT'
+
+
+if __name__ == '__main__':
+    test_rank_default_weights()
+    test_rank_weights_configurable()
+    test_rank_large_chain_performance()
+    test_screen_uses_ranked_contract()
+    print("\n🎉 候选合约排序测试全部通过")
@@ -5,10 +5,13 @@ DCA策略逻辑完整验证工具
 """
 
 import json
+import os
 import csv
 from datetime import datetime, timedelta
 from collections import deque
 
+from price_store import load_records
+
 class DCAStrategyValidator:
     """DCA策略验证器"""
     
@@ -23,8 +26,7 @@ class DCAStrategyValidator:
         
     def load_spy_data(self, file_path):
         """加载SPY价格数据"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_records(file_path)
         print(f"📊 加载了 {len(data)} 天的SPY数据")
         return data
     
@@ -308,7 +310,7 @@ class DCAStrategyValidator:
 
 def compare_versions():
     """对比不同版本的表现"""
-    spy_file = '/home/wuxia/projects/moomoo_custom_strategies/data/spy_price_history.json'
+    spy_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'spy_price_history.json')
     validator = DCAStrategyValidator(spy_file, initial_balance=50000)  # 使用5万本金测试
     
     # 测试配置
@@ -383,7 +385,8 @@ def main():
     reports = compare_versions()
     
     # 保存详细报告
-    output_file = '/home/wuxia/projects/moomoo_custom_strategies/data/dca_validation_report.json'
+    output_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'dca_validation_report.json')
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(reports, f, indent=2, ensure_ascii=False)
     
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+回撤层级/加仓倍数的走步优化
+drawdown_layers 和 base_multipliers 是手工选定的，在全部历史上扫参数必然过拟合。
+这里把历史切成滚动的 训练/测试 窗口：在每个训练窗口上搜索层级×倍数组合，
+再用选出的组合在紧随其后的测试窗口上打分，并与策略默认参数对比样本外表现。
+
+每个窗口的结果按 标的+窗口起止日期 缓存，指纹包含窗口内价格和搜索空间；
+行情数据延长后只计算新增的窗口，历史数据被修正的窗口会自动重算。
+
+缓存文件(默认在价格库根目录):
+    walk_forward_cache.json   {"US.SPY|2023-01-03|2024-03-28": {"fingerprint", "layers", "multipliers",
+                               "train_score", "test_score", "baseline_train", "baseline_test", ...}}
+
+用法:
+    optimizer = WalkForwardOptimizer(workers=4)
+    report = optimizer.run('US.SPY', dates, closes, train_days=252, test_days=63)
+
+    python tools/walk_forward.py US.SPY --train 252 --test 63 --workers 4
+
+Created: 2026-10-19
+Version: 1.0
+"""
+
+import hashlib
+import json
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from dca_monte_carlo import PAID_LAYERS, scenario, simulate
+from price_store import DEFAULT_ROOT
+
+CACHE_FILE = 'walk_forward_cache.json'
+
+# 第一项为策略默认参数，得分相同时优先保留
+LAYER_SETS = (
+    (5.0, 10.0, 20.0, 35.0, 50.0),
+    (3.0, 6.0, 12.0, 20.0, 30.0),
+    (4.0, 8.0, 16.0, 32.0, 50.0),
+    (5.0, 10.0, 15.0, 25.0, 40.0),
+    (8.0, 15.0, 25.0, 40.0, 55.0),
+)
+MULTIPLIER_SETS = (
+    (1.5, 2.0, 3.0, 4.0, 5.0),
+    (1.2, 1.5, 2.0, 2.5, 3.0),
+    (1.0, 1.5, 2.5, 4.0, 6.0),
+    (2.0, 3.0, 4.0, 5.0, 6.0),
+)
+
+OBJECTIVES = {
+    'return': lambda result, balance: result['final_value'] / balance - 1.0,            # 总资金收益率
+    'roi': lambda result, balance: ((result['final_value'] - balance) / result['cost']   # 已投入资金收益率
+                                    if result['cost'] else 0.0),
+}
+
+
+def rolling_windows(n_days, train_days, test_days, step=None):
+    """
+    按交易日索引切分滚动窗口。
+
+    Returns:
+        list: [(训练起点, 训练终点=测试起点, 测试终点)]，区间左闭右开
+    """
+    step = step or test_days
+    return [(start, start + train_days, start + train_days + test_days)
+            for start in range(0, n_days - train_days - test_days + 1, step)]
+
+
+def _score(prices, layers, multipliers, qty, balance, objective):
+    config = scenario(2, qty=qty, balance=balance, layers=layers, multipliers=multipliers)
+    return OBJECTIVES[objective](simulate(prices, config), balance)
+
+
+def _optimize_window(train, test, candidates, qty, balance, objective):
+    """在训练窗口上选出得分最高的组合，并在测试窗口上评估它和默认组合"""
+    best, best_score, baseline_train = None, None, None
+    for layers, multipliers in candidates:
+        score = _score(train, layers, multipliers, qty, balance, objective)
+        if baseline_train is None:
+            baseline_train = score
+        if best_score is None or score > best_score:
+            best, best_score = (layers, multipliers), score
+    layers, multipliers = best
+    return {
+        'layers': list(layers),
+        'multipliers': list(multipliers),
+        'train_score': best_score,
+        'test_score': _score(test, layers, multipliers, qty, balance, objective),
+        'baseline_train': baseline_train,
+        'baseline_test': _score(test, candidates[0][0], candidates[0][1], qty, balance, objective),
+    }
+
+
+class WalkForwardOptimizer:
+    """滚动窗口参数搜索，窗口结果持久化缓存"""
+
+    def __init__(self, cache_path=None, workers=1, layer_sets=LAYER_SETS, multiplier_sets=MULTIPLIER_SETS,
+                 qty=20, balance=100000.0, objective='return'):
+        if objective not in OBJECTIVES:
+            raise ValueError(f"未知目标函数: {objective}，可选 {sorted(OBJECTIVES)}")
+        self.cache_path = cache_path or os.path.join(DEFAULT_ROOT, CACHE_FILE)
+        self.workers = workers
+        self.candidates = [(tuple(layers), tuple(multipliers))
+                           for layers in layer_sets for multipliers in multiplier_sets
+                           if len(layers) == len(multipliers)]
+        default = (tuple(PAID_LAYERS[0]), tuple(PAID_LAYERS[1]))
+        if default in self.candidates:
+            self.candidates.remove(default)
+        self.candidates.insert(0, default)
+        self.qty = qty
+        self.balance = float(balance)
+        self.objective = objective
+        self.cache = self._load_cache()
+        self.computed = 0
+
+    def _load_cache(self):
+        if not os.path.exists(self.cache_path):
+            return {}
+        with open(self.cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_cache(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        tmp_path = self.cache_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.cache, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.cache_path)
+
+    def _fingerprint(self, prices):
+        digest = hashlib.sha1(array('d', prices).tobytes())
+        digest.update(json.dumps([self.candidates, self.qty, self.balance, self.objective]).encode())
+        return digest.hexdigest()
+
+    def run(self, symbol, dates, closes, train_days=252, test_days=63, step=None):
+        """
+        对整段历史做走步优化，只计算缓存中没有(或指纹不符)的窗口。
+
+        Args:
+            dates: 与closes等长的日期字符串，用作窗口缓存键
+            closes: 日线收盘价序列
+
+        Returns:
+            dict: {'windows': [每个窗口的结果], 'computed': 本次计算的窗口数, 'summary': summarize()}
+        """
+        closes = list(closes)
+        pending, windows = {}, []
+        for train_start, test_start, test_end in rolling_windows(len(closes), train_days, test_days, step):
+            key = f"{symbol}|{dates[train_start]}|{dates[test_end - 1]}"
+            fingerprint = self._fingerprint(closes[train_start:test_end])
+            window = {'key': key, 'train': [dates[train_start], dates[test_start - 1]],
+                      'test': [dates[test_start], dates[test_end - 1]]}
+            windows.append(window)
+            cached = self.cache.get(key)
+            if cached is None or cached.get('fingerprint') != fingerprint:
+                pending[key] = (fingerprint, closes[train_start:test_start], closes[test_start:test_end])
+
+        args = (self.candidates, self.qty, self.balance, self.objective)
+        if self.workers <= 1 or len(pending) < 2:
+            results = {key: _optimize_window(train, test, *args) for key, (_, train, test) in pending.items()}
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = {key: pool.submit(_optimize_window, train, test, *args)
+                           for key, (_, train, test) in pending.items()}
+                results = {key: future.result() for key, future in futures.items()}
+
+        for key, result in results.items():
+            result['fingerprint'] = pending[key][0]
+            self.cache[key] = result
+        self.computed = len(results)
+        if results:
+            self._save_cache()
+
+        for window in windows:
+            entry = self.cache[window['key']]
+            window.update({name: value for name, value in entry.items() if name != 'fingerprint'})
+        return {'windows': windows, 'computed': self.computed, 'summary': summarize(windows)}
+
+
+def summarize(windows):
+    """样本外汇总：优化组合与默认组合的平均测试得分、胜率、组合被选中次数"""
+    count = len(windows)
+    if not count:
+        return {'windows': 0}
+    picks = {}
+    for window in windows:
+        label = f"{window['layers']} × {window['multipliers']}"
+        picks[label] = picks.get(label, 0) + 1
+    return {
+        'windows': count,
+        'mean_test': sum(w['test_score'] for w in windows) / count,
+        'mean_baseline_test': sum(w['baseline_test'] for w in windows) / count,
+        'mean_train': sum(w['train_score'] for w in windows) / count,
+        'win_ratio': sum(1 for w in windows if w['test_score'] > w['baseline_test']) / count,
+        'picks': dict(sorted(picks.items(), key=lambda item: -item[1])),
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from price_store import PriceStore
+
+    parser = argparse.ArgumentParser(description='回撤层级/加仓倍数走步优化')
+    parser.add_argument('symbol')
+    parser.add_argument('--train', type=int, default=252, help='训练窗口交易日数')
+    parser.add_argument('--test', type=int, default=63, help='测试窗口交易日数')
+    parser.add_argument('--step', type=int, help='窗口滚动步长(默认等于测试窗口)')
+    parser.add_argument('--qty', type=int, default=20)
+    parser.add_argument('--balance', type=float, default=100000.0)
+    parser.add_argument('--objective', default='return', choices=sorted(OBJECTIVES))
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--root', default=DEFAULT_ROOT, help='价格库根目录')
+    args = parser.parse_args()
+
+    with PriceStore(args.root).load(args.symbol) as bars:
+        bar_dates, bar_closes = bars.dates(), bars.close.tolist()
+    optimizer = WalkForwardOptimizer(os.path.join(args.root, CACHE_FILE), args.workers,
+                                     qty=args.qty, balance=args.balance, objective=args.objective)
+    report = optimizer.run(args.symbol, bar_dates, bar_closes, args.train, args.test, args.step)
+
+    print(f"📊 {args.symbol}: {len(report['windows'])} 个窗口，本次计算 {report['computed']} 个")
+    for item in report['windows']:
+        print(f"   {item['test'][0]} ~ {item['test'][1]} | 层级 {item['layers']} 倍数 {item['multipliers']} "
+              f"| 训练 {item['train_score']:+.2%} 测试 {item['test_score']:+.2%} (默认 {item['baseline_test']:+.2%})")
+    overview = report['summary']
+    if overview['windows']:
+        print(f"🎯 样本外平均: 优化 {overview['mean_test']:+.2%} vs 默认 {overview['mean_baseline_test']:+.2%} "
+              f"| 胜率 {overview['win_ratio']:.0%} | 样本内平均 {overview['mean_train']:+.2%}")